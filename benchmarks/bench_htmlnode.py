@@ -0,0 +1,59 @@
+# Compares HTML serialization of deep and wide node trees against the old
+# concatenation-based to_html. Run from the repo root:
+#   python3 benchmarks/bench_htmlnode.py
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from htmlnode import LeafNode, ParentNode
+
+
+# The serializer as it was before write_html, kept here as the baseline
+def concat_to_html(node):
+    if isinstance(node, LeafNode):
+        if node.tag is None:
+            return node.value
+        prop_string = ""
+        if node.props is not None:
+            for prop in node.props:
+                prop_string = prop_string + " " + prop + "=\"" + node.props[prop] + "\""
+        return f"<{node.tag}{prop_string}>{node.value}</{node.tag}>"
+    html_children = ""
+    for child in node.children:
+        html_children = html_children + concat_to_html(child)
+    return f"<{node.tag}>{html_children}</{node.tag}>"
+
+
+def wide_tree(items):
+    html_items = []
+    for i in range(items):
+        html_items.append(ParentNode("li", [
+            LeafNode(None, f"item {i} with "),
+            LeafNode("b", "bold"),
+            LeafNode("a", "a link", {"href": f"/page/{i}"}),
+        ]))
+    return ParentNode("div", [ParentNode("ul", html_items)])
+
+
+def deep_tree(depth, leaves):
+    node = ParentNode("p", [LeafNode(None, "x" * 40) for _ in range(leaves)])
+    for _ in range(depth):
+        node = ParentNode("blockquote", [node, LeafNode("i", "y" * 40)])
+    return node
+
+
+def run(name, tree, number):
+    assert concat_to_html(tree) == tree.to_html()
+    old = min(timeit.repeat(lambda: concat_to_html(tree), number=number, repeat=3)) / number
+    new = min(timeit.repeat(lambda: tree.to_html(), number=number, repeat=3)) / number
+    print(f"{name:<24} concat {old * 1000:9.3f} ms   write_html {new * 1000:9.3f} ms   {old / new:5.2f}x")
+
+
+if __name__ == "__main__":
+    sys.setrecursionlimit(10000)
+    run("wide 1k items", wide_tree(1000), 50)
+    run("wide 20k items", wide_tree(20000), 3)
+    run("deep 200 levels", deep_tree(200, 100), 50)
+    run("deep 2k levels", deep_tree(2000, 1000), 3)
@@ -0,0 +1,57 @@
+# Compares the inline layer used by text_to_textnodes against the five pass split pipeline
+# and the bare single pass scanner, on plain prose and on paragraphs with markup. Also times
+# the precompiled image and link patterns against re.findall with pattern literals.
+# Run from the repo root:
+#   python3 benchmarks/bench_inline.py
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from convertnodes import extract_markdown_images, extract_markdown_links, scan_inline, split_text_to_textnodes, text_to_textnodes
+
+SENTENCE = "It is a long road from the Shire to Rivendell, and longer still to the Mountain. "
+
+PARAGRAPHS = {
+    "short prose": SENTENCE,
+    "plain prose": SENTENCE * 8,
+    "long prose": SENTENCE * 64,
+    "prose + link": SENTENCE * 8 + "See [the map](/maps/wilderland).",
+    "light markup": "Some **bold** words, an *aside* and a [link](/blog/tom) in a sentence. " * 8,
+    "heavy markup": "**b** *i* `c* [l](/u) ![i](/s.png) ".replace("`c*", "`c`") * 16,
+}
+
+
+def best(func, number):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+def run(name, text, number):
+    assert split_text_to_textnodes(text) == text_to_textnodes(text)
+    pipeline = best(lambda: split_text_to_textnodes(text), number)
+    scanner = best(lambda: scan_inline(text), number)
+    inline = best(lambda: text_to_textnodes(text), number)
+    print(
+        f"{name:<14} pipeline {pipeline * 1e6:8.2f} us   scanner {scanner * 1e6:8.2f} us   "
+        f"text_to_textnodes {inline * 1e6:8.2f} us   {pipeline / inline:6.2f}x pipeline   {scanner / inline:5.2f}x scanner"
+    )
+
+
+def run_extract(name, text, number):
+    literal = best(lambda: (
+        re.findall(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", text),
+        re.findall(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", text),
+    ), number)
+    compiled = best(lambda: (extract_markdown_images(text), extract_markdown_links(text)), number)
+    print(f"{name:<14} re.findall {literal * 1e6:8.2f} us   precompiled {compiled * 1e6:8.2f} us   {literal / compiled:5.2f}x")
+
+
+if __name__ == "__main__":
+    print("text_to_textnodes")
+    for name, text in PARAGRAPHS.items():
+        run(name, text, 2000)
+    print("extract_markdown_images + extract_markdown_links")
+    for name in ["short prose", "prose + link"]:
+        run_extract(name, PARAGRAPHS[name], 20000)
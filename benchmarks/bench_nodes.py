@@ -0,0 +1,87 @@
+# Measures memory and construction time of the __slots__ node classes against the
+# dict-backed classes they replaced, on a large synthetic document. Run from the repo root:
+#   python3 benchmarks/bench_nodes.py
+import os
+import random
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from corpus import CorpusSpec, markdown_page
+from htmlnode import LeafNode, ParentNode
+from markdown_blocks import markdown_to_html_node
+from textnode import TextNode, TextType
+
+
+# The node classes as they were before __slots__, kept here as the baseline
+class DictHTMLNode():
+    def __init__(self, tag=None, value=None, children=None, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = children
+        self.props = props
+
+class DictLeafNode(DictHTMLNode):
+    def __init__(self, tag, value, props=None):
+        super().__init__(tag, value, None, props)
+        if value is None:
+            raise ValueError("LeafNode must have a value")
+
+class DictParentNode(DictHTMLNode):
+    def __init__(self, tag, children, props=None):
+        super().__init__(tag, None, children, props)
+        if children is None:
+            raise ValueError("ParentNode must have at least one child node")
+        if tag is None:
+            raise ValueError("ParentNode must have a tag")
+
+class DictTextNode():
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+# Copies a node tree into the given classes, sharing the strings of the original
+def copy_tree(node, leaf_class, parent_class):
+    if isinstance(node, LeafNode):
+        return leaf_class(node.tag, node.value, node.props)
+    return parent_class(node.tag, [copy_tree(child, leaf_class, parent_class) for child in node.children], node.props)
+
+
+def allocated(build):
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+if __name__ == "__main__":
+    spec = CorpusSpec(page_size=20000, markup_density=0.3, list_length=20)
+    markdown = markdown_page(random.Random(0), spec, 0)
+    tree = markdown_to_html_node(markdown)
+
+    # Both copies share the strings of tree, so only the node objects are measured
+    _, slots_size = allocated(lambda: copy_tree(tree, LeafNode, ParentNode))
+    _, dict_size = allocated(lambda: copy_tree(tree, DictLeafNode, DictParentNode))
+    print(f"document tree       slots {slots_size / 2**20:8.1f} MiB   dict {dict_size / 2**20:8.1f} MiB")
+
+    count = 200000
+    _, slots_leaves = allocated(lambda: [LeafNode("b", "x") for _ in range(count)])
+    _, dict_leaves = allocated(lambda: [DictLeafNode("b", "x") for _ in range(count)])
+    print(f"{count} LeafNodes   slots {slots_leaves / 2**20:8.1f} MiB   dict {dict_leaves / 2**20:8.1f} MiB")
+    _, slots_text = allocated(lambda: [TextNode("x", TextType.TEXT) for _ in range(count)])
+    _, dict_text = allocated(lambda: [DictTextNode("x", TextType.TEXT) for _ in range(count)])
+    print(f"{count} TextNodes   slots {slots_text / 2**20:8.1f} MiB   dict {dict_text / 2**20:8.1f} MiB")
+
+    for name, new, old in (
+        ("LeafNode()", lambda: LeafNode("b", "x"), lambda: DictLeafNode("b", "x")),
+        ("ParentNode()", lambda: ParentNode("li", []), lambda: DictParentNode("li", [])),
+        ("TextNode()", lambda: TextNode("x", TextType.TEXT), lambda: DictTextNode("x", TextType.TEXT)),
+    ):
+        new_time = min(timeit.repeat(new, number=200000, repeat=5)) / 200000
+        old_time = min(timeit.repeat(old, number=200000, repeat=5)) / 200000
+        print(f"{name:<18}  slots {new_time * 1e9:6.0f} ns     dict {old_time * 1e9:6.0f} ns   {old_time / new_time:5.2f}x")
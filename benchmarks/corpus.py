@@ -0,0 +1,101 @@
+# Generates synthetic sites for benchmarking. Every knob that changes how much work
+# the parser does can be scaled independently, and the same seed always produces
+# the same site, so runs on different commits measure the same input.
+import os
+import random
+
+WORDS = (
+    "the road goes ever on and on down from the door where it began now far ahead "
+    "has gone and I must follow if I can pursuing it with eager feet until it joins "
+    "some larger way where many paths and errands meet and whither then I cannot say"
+).split()
+
+TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+    <title> {{ Title }} </title>
+</head>
+<body>
+    <article>
+        {{ Content }}
+    </article>
+</body>
+</html>
+"""
+
+
+# Settings for generate_corpus
+# pages: number of markdown files
+# page_size: number of blocks per page
+# markup_density: chance (0-1) that a word is wrapped in inline markup
+# list_length: items per list block
+# nesting_depth: directory depth of the content tree
+class CorpusSpec():
+    def __init__(self, pages=200, page_size=40, markup_density=0.1, list_length=8, nesting_depth=3, seed=0):
+        self.pages = pages
+        self.page_size = page_size
+        self.markup_density = markup_density
+        self.list_length = list_length
+        self.nesting_depth = nesting_depth
+        self.seed = seed
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+
+def inline_text(rng, words, density):
+    parts = []
+    for _ in range(words):
+        word = rng.choice(WORDS)
+        if rng.random() < density:
+            kind = rng.randrange(5)
+            if kind == 0:
+                word = f"**{word}**"
+            elif kind == 1:
+                word = f"*{word}*"
+            elif kind == 2:
+                word = f"`{word}`"
+            elif kind == 3:
+                word = f"[{word}](/blog/{rng.choice(WORDS)})"
+            else:
+                word = f"![{word}](/images/{rng.choice(WORDS)}.png)"
+        parts.append(word)
+    return " ".join(parts)
+
+
+def markdown_page(rng, spec, index):
+    blocks = [f"# Page {index}"]
+    for i in range(spec.page_size):
+        kind = rng.randrange(10)
+        if kind < 5:
+            lines = [inline_text(rng, 14, spec.markup_density) for _ in range(rng.randint(1, 4))]
+            blocks.append("\n".join(lines))
+        elif kind == 5:
+            blocks.append(f"## Section {i}")
+        elif kind == 6:
+            blocks.append("\n".join(f"- {inline_text(rng, 6, spec.markup_density)}" for _ in range(spec.list_length)))
+        elif kind == 7:
+            blocks.append("\n".join(f"{n}. {inline_text(rng, 6, spec.markup_density)}" for n in range(1, spec.list_length + 1)))
+        elif kind == 8:
+            blocks.append("\n".join(f"> {inline_text(rng, 10, spec.markup_density)}" for _ in range(3)))
+        else:
+            blocks.append("```\n" + "\n".join(" ".join(rng.choices(WORDS, k=6)) for _ in range(4)) + "\n```")
+    return "\n\n".join(blocks) + "\n"
+
+
+# Writes spec.pages markdown files under root/content and a template at root/template.html.
+# Returns (content_dir, template_path).
+def generate_corpus(root, spec):
+    rng = random.Random(spec.seed)
+    content_dir = os.path.join(root, "content")
+    for index in range(spec.pages):
+        dirs = [f"section{rng.randrange(4)}" for _ in range(rng.randint(0, spec.nesting_depth))]
+        page_dir = os.path.join(content_dir, *dirs, f"page{index}")
+        os.makedirs(page_dir, exist_ok=True)
+        with open(os.path.join(page_dir, "index.md"), "w") as file:
+            file.write(markdown_page(rng, spec, index))
+
+    template_path = os.path.join(root, "template.html")
+    with open(template_path, "w") as file:
+        file.write(TEMPLATE)
+    return content_dir, template_path
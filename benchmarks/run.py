@@ -0,0 +1,125 @@
+# Times each stage of the build on a synthetic site and saves the results as JSON so
+# they can be compared across commits. Run from the repo root:
+#   python3 benchmarks/run.py --pages 500 --output before.json
+#   python3 benchmarks/run.py --pages 500 --output after.json --compare before.json
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from corpus import CorpusSpec, generate_corpus
+from convertnodes import text_to_textnodes
+from generation import find_pages, generate_pages_recursive
+from markdown_blocks import block_to_html_node, markdown_to_blocks
+
+
+def best_of(repeat, func):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Returns {stage: seconds} for the corpus described by spec, best of repeat runs
+def run_benchmarks(spec, repeat):
+    with tempfile.TemporaryDirectory() as root:
+        content_dir, template_path = generate_corpus(root, spec)
+        documents = []
+        for from_path, _ in find_pages(content_dir, os.path.join(root, "scratch")):
+            with open(from_path) as file:
+                documents.append(file.read())
+
+        blocks = [block for document in documents for block in markdown_to_blocks(document)]
+        paragraphs = [" ".join(block.split("\n")) for block in blocks if not block.startswith(("#", "-", ">", "`", "1."))]
+        nodes = [block_to_html_node(block) for block in blocks]
+
+        def build():
+            # Keep per-page progress prints out of the timing output
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate_pages_recursive(content_dir, template_path, os.path.join(root, "public"))
+
+        return {
+            "markdown_to_blocks": best_of(repeat, lambda: [markdown_to_blocks(document) for document in documents]),
+            "text_to_textnodes": best_of(repeat, lambda: [text_to_textnodes(text) for text in paragraphs]),
+            "block_to_html_node": best_of(repeat, lambda: [block_to_html_node(block) for block in blocks]),
+            "to_html": best_of(repeat, lambda: [node.to_html() for node in nodes]),
+            "generate_pages_recursive": best_of(repeat, build),
+        }
+
+
+def print_results(results, baseline=None):
+    for stage, seconds in results.items():
+        line = f"{stage:<26} {seconds * 1000:10.2f} ms"
+        if baseline is not None and stage in baseline:
+            line += f"   was {baseline[stage] * 1000:10.2f} ms   {baseline[stage] / seconds:5.2f}x"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the site generator on a synthetic corpus.")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=40, help="blocks per page")
+    parser.add_argument("--markup-density", type=float, default=0.1, help="chance a word carries inline markup")
+    parser.add_argument("--list-length", type=int, default=8)
+    parser.add_argument("--nesting-depth", type=int, default=3, help="directory depth of the content tree")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage, the fastest is kept")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file from an earlier run to compare against")
+    parser.add_argument(
+        "--max-slowdown",
+        type=float,
+        help="with --compare, exit with status 1 if any stage is this many times slower than the baseline",
+    )
+    args = parser.parse_args()
+
+    spec = CorpusSpec(args.pages, args.page_size, args.markup_density, args.list_length, args.nesting_depth, args.seed)
+    results = run_benchmarks(spec, args.repeat)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            previous = json.load(file)
+        if previous["corpus"] != spec.to_dict():
+            print("warning: the baseline was measured on a different corpus")
+        baseline = previous["results"]
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "corpus": spec.to_dict(),
+                "repeat": args.repeat,
+                "results": results,
+            }, file, indent=1)
+
+    if baseline is not None and args.max_slowdown is not None:
+        regressed = [stage for stage in results if stage in baseline and results[stage] > baseline[stage] * args.max_slowdown]
+        if regressed:
+            print(f"regressed by more than {args.max_slowdown}x: {', '.join(regressed)}")
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
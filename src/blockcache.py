@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+import images
+from htmlnode import LeafNode
+
+# The block cache of the running build, None unless --block-cache was passed
+active = None
+
+# Modules whose code decides what HTML a block renders to. The persisted cache is
+# dropped whenever one of them changes, so stale HTML is never served after an upgrade.
+# The image catalog is part of the version too, since image blocks render its dimensions.
+RENDERER_MODULES = ["markdown_blocks.py", "convertnodes.py", "htmlnode.py", "textnode.py", "images.py"]
+
+
+def renderer_version():
+    digest = hashlib.sha256()
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in RENDERER_MODULES:
+        with open(os.path.join(src_dir, name), "rb") as file:
+            digest.update(file.read())
+    if images.active is not None:
+        digest.update(images.active.version().encode("utf-8"))
+    return digest.hexdigest()
+
+
+# Content-addressed LRU cache from markdown block text to the HTML it renders to.
+# Shared boilerplate (disclaimers, snippets, navigation lists) is parsed once per site
+# instead of once per page.
+class BlockCache():
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.added = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, block):
+        html = self.entries.get(block)
+        if html is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(block)
+        return html
+
+    def put(self, block, html):
+        self.entries[block] = html
+        self.entries.move_to_end(block)
+        if self.added is not None:
+            self.added.append((block, html))
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    # Wraps a block converter so repeated blocks come out of the cache as prerendered HTML
+    def converter(self, convert):
+        def cached_convert(block):
+            html = self.get(block)
+            if html is None:
+                html = convert(block).to_html()
+                self.put(block, html)
+            return LeafNode(None, html)
+        return cached_convert
+
+    # Starts remembering added entries so a worker process can hand them back with take_changes
+    def track_changes(self):
+        self.hits = 0
+        self.misses = 0
+        self.added = []
+
+    # Entries added and counters collected since track_changes or the last call
+    def take_changes(self):
+        changes = {"hits": self.hits, "misses": self.misses, "entries": self.added or []}
+        self.hits = 0
+        self.misses = 0
+        self.added = []
+        return changes
+
+    def merge(self, changes):
+        self.hits += changes["hits"]
+        self.misses += changes["misses"]
+        for block, html in changes["entries"]:
+            self.put(block, html)
+
+    def load(self, path):
+        if not os.path.exists(path):
+            return
+        with open(path, "r") as file:
+            data = json.load(file)
+        if data.get("version") != renderer_version():
+            return
+        for block, html in data["entries"][-self.max_entries:]:
+            self.entries[block] = html
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"version": renderer_version(), "entries": list(self.entries.items())}, file)
+        os.replace(tmp_path, path)
+
+    def __repr__(self):
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0.0
+        return f"BlockCache({len(self.entries)} entries, {self.hits} hits, {self.misses} misses, {rate:.1f}% hit rate)"
+
+
+def enable(max_entries=10000):
+    global active
+    active = BlockCache(max_entries)
+    return active
+
+
+def disable():
+    global active
+    active = None
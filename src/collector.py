@@ -0,0 +1,125 @@
+import json
+import os
+from collections import OrderedDict
+
+# Blocks whose parsed data is kept for when the block cache serves them without parsing them
+MAX_REPLAY_BLOCKS = 10000
+
+
+# Replays what parsing a block fed a collector, for blocks the block cache answers without
+# ever reaching text_to_children. What a block fed is remembered the first time it is parsed;
+# a cached block that was never seen is parsed with render just for the collector.
+class BlockReplay():
+    def __init__(self, max_blocks=MAX_REPLAY_BLOCKS):
+        self.max_blocks = max_blocks
+        # Blocks parsed so far, a block whose conversion parsed none came from the block cache
+        self.parsed = 0
+        self.blocks = OrderedDict()
+
+    # Called by the collector for every block text_to_children parses
+    def mark_parsed(self):
+        self.parsed += 1
+
+    # Wraps the block cache's converter. current returns the list the collector is filling for
+    # the page being generated, or None outside of a page.
+    def converter(self, convert, render, current):
+        def replayed_convert(block):
+            items = current()
+            if items is None:
+                return convert(block)
+            start = len(items)
+            parsed = self.parsed
+            html_node = convert(block)
+            if self.parsed == parsed:
+                remembered = self.blocks.get(block)
+                if remembered is not None:
+                    items.extend(remembered)
+                    return html_node
+                render(block)
+            self.blocks[block] = items[start:]
+            self.blocks.move_to_end(block)
+            if len(self.blocks) > self.max_blocks:
+                self.blocks.popitem(last=False)
+            return html_node
+        return replayed_convert
+
+
+# An entry per page keyed by markdown source, filled while pages are generated: the sitemap's
+# records, the search index's terms, the link checker's references. The entries of pages an
+# incremental build skips are kept in a cache file, so no page is read twice.
+class Collector():
+    def __init__(self, dir_path_public):
+        self.dir_path_public = dir_path_public
+        self.pages = {}
+        self.changes = None
+
+    # JSON form of an entry, for the cache file and for worker processes to hand back
+    def to_json(self, page):
+        return page
+
+    def from_json(self, data):
+        return data
+
+    def put(self, from_path, page):
+        self.pages[from_path] = page
+
+    def remove(self, from_path):
+        del self.pages[from_path]
+
+    def record(self, from_path, page):
+        self.put(from_path, page)
+        if self.changes is not None:
+            self.changes[from_path] = self.to_json(page)
+
+    # Like blockcache, worker processes only hand back the entries they recorded
+    def track_changes(self):
+        self.changes = {}
+
+    def take_changes(self):
+        changes, self.changes = self.changes, None
+        return changes
+
+    def merge(self, changes):
+        for from_path, page in changes.items():
+            self.put(from_path, self.from_json(page))
+
+    # Drops pages that are no longer in the content tree and returns the (from_path, dest_path)
+    # of the ones without an entry, e.g. pages an incremental build skipped before the collector
+    # was first enabled
+    def update(self, pages):
+        current = set(from_path for from_path, _ in pages)
+        for from_path in list(self.pages):
+            if from_path not in current:
+                self.remove(from_path)
+        return [(from_path, dest_path) for from_path, dest_path in pages if from_path not in self.pages and os.path.exists(dest_path)]
+
+    # Saved with the entries, a cache saved with other values is ignored
+    def cache_key(self):
+        return {"public": self.dir_path_public}
+
+    # Saved with the entries besides the key, restored by load_state
+    def cache_state(self):
+        return {}
+
+    def load_state(self, data):
+        pass
+
+    def load(self, path):
+        if not os.path.exists(path):
+            return
+        with open(path, "r") as file:
+            data = json.load(file)
+        if any(data.get(key) != value for key, value in self.cache_key().items()):
+            return
+        self.pages = {from_path: self.from_json(page) for from_path, page in data["pages"].items()}
+        self.load_state(data)
+
+    def save(self, path):
+        data = self.cache_key()
+        data.update(self.cache_state())
+        data["pages"] = {from_path: self.to_json(page) for from_path, page in self.pages.items()}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as file:
+            file.write(json.dumps(data))
+        os.replace(tmp_path, path)
@@ -0,0 +1,110 @@
+import gzip
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from writer import write_atomic
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Outputs worth precompressing, images and fonts are compressed already
+COMPRESSIBLE_EXTENSIONS = {".html", ".htm", ".css", ".js", ".mjs", ".json", ".xml", ".svg", ".txt", ".md", ".map"}
+
+# Smaller files gain nothing from compression, the headers cost more than they save
+MIN_COMPRESS_SIZE = 256
+
+
+def gzip_compress(data):
+    # mtime=0 keeps the .gz byte-identical for identical input, so deploys don't see a change
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def brotli_compress(data):
+    return brotli.compress(data, quality=11)
+
+
+# Sibling suffix -> compressor, .br only when the brotli module is installed
+ENCODINGS = {".gz": gzip_compress}
+if brotli is not None:
+    ENCODINGS[".br"] = brotli_compress
+
+
+def is_compressible(path):
+    return os.path.splitext(path)[1].lower() in COMPRESSIBLE_EXTENSIONS
+
+
+# Paths of the precompressed siblings of path
+def compressed_paths(path):
+    return [path + suffix for suffix in ENCODINGS]
+
+
+# Writes the precompressed siblings of path, or removes them when path is too small to be
+# worth compressing, so a web server never serves a sibling that no longer matches.
+# Returns the siblings written.
+def compress_file(path):
+    with open(path, "rb") as file:
+        data = file.read()
+    if len(data) < MIN_COMPRESS_SIZE:
+        for compressed_path in compressed_paths(path):
+            if os.path.exists(compressed_path):
+                os.remove(compressed_path)
+        return []
+    written = []
+    for suffix, compress in ENCODINGS.items():
+        write_atomic(path + suffix, compress(data))
+        written.append(path + suffix)
+    return written
+
+
+# Byte and file counts reported at the end of compress_outputs
+class CompressSummary():
+    def __init__(self):
+        self.files = 0
+        self.original_bytes = 0
+        self.compressed_bytes = {suffix: 0 for suffix in ENCODINGS}
+        self.added = []
+        self.modified = []
+
+    def __repr__(self):
+        sizes = ", ".join(f"{suffix} {size} bytes" for suffix, size in self.compressed_bytes.items())
+        return f"compressed {self.files} file(s), {self.original_bytes} bytes -> {sizes}"
+
+
+# Precompresses the compressible files among paths on a thread pool (zlib and brotli release
+# the GIL while compressing). Only pass outputs that changed, unchanged siblings stay valid.
+def compress_outputs(paths, workers=8):
+    summary = CompressSummary()
+    paths = sorted(set(path for path in paths if is_compressible(path)))
+    existing = set(compressed_path for path in paths for compressed_path in compressed_paths(path) if os.path.exists(compressed_path))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for path, written in zip(paths, executor.map(compress_file, paths)):
+            if not written:
+                continue
+            summary.files += 1
+            summary.original_bytes += os.path.getsize(path)
+            for compressed_path in written:
+                summary.compressed_bytes[compressed_path[len(path):]] += os.path.getsize(compressed_path)
+                (summary.modified if compressed_path in existing else summary.added).append(compressed_path)
+    return summary
+
+
+# Precompresses the outputs of a build: the ones in changed plus any output recorded in the
+# manifest whose siblings are missing (e.g. the first build with compression on). Siblings are
+# recorded in the manifest as well, so they are removed together with their output later.
+def compress_build_outputs(manifest, changed, workers=8):
+    outputs = set(entry["output"] for entry in manifest.current.values())
+    pending = set(path for path in changed if path in outputs)
+    for output in outputs:
+        if output in pending or not is_compressible(output) or not os.path.exists(output):
+            continue
+        if os.path.getsize(output) >= MIN_COMPRESS_SIZE and not all(map(os.path.exists, compressed_paths(output))):
+            pending.add(output)
+
+    summary = compress_outputs(pending, workers)
+    for output in outputs:
+        for compressed_path in compressed_paths(output):
+            if os.path.exists(compressed_path):
+                manifest.record(f"compressed:{compressed_path}", None, compressed_path)
+    return summary
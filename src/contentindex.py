@@ -0,0 +1,116 @@
+import json
+import os
+
+from frontmatter import page_title, split_front_matter
+
+
+# What the site knows about one page without rendering it
+class PageInfo():
+    def __init__(self, path, url, title, date="", tags=None, word_count=0):
+        self.path = path
+        self.url = url
+        self.title = title
+        self.date = date
+        self.tags = tags or []
+        self.word_count = word_count
+
+    def to_dict(self):
+        return {
+            "path": self.path,
+            "url": self.url,
+            "title": self.title,
+            "date": self.date,
+            "tags": self.tags,
+            "word_count": self.word_count,
+        }
+
+    def __eq__(self, other):
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"PageInfo({self.url}, {self.title}, {self.date}, {self.tags})"
+
+
+# Returns the URL a page is served at, given its output path under dir_path_public
+def page_url(dest_path, dir_path_public):
+    url = "/" + os.path.relpath(dest_path, dir_path_public).replace(os.sep, "/")
+    if url.endswith("/index.html"):
+        return url[:-len("index.html")]
+    return url
+
+
+# Whitespace separated words, ignoring bare markdown markers such as "#", "-" or ">"
+def count_words(text):
+    return sum(1 for word in text.split() if any(char.isalnum() for char in word))
+
+
+def read_page_info(from_path, dest_path, dir_path_public):
+    with open(from_path, "r") as file:
+        metadata, body = split_front_matter(file.read())
+    tags = metadata.get("tags", [])
+    if isinstance(tags, str):
+        tags = [tag.strip() for tag in tags.split(",") if tag.strip() != ""]
+    return PageInfo(
+        from_path,
+        page_url(dest_path, dir_path_public),
+        page_title(metadata, body),
+        str(metadata.get("date", "")),
+        [str(tag) for tag in tags],
+        count_words(body),
+    )
+
+
+# Site-wide index of every page, built once per build. Pages whose source is unchanged
+# since the last build (same mtime and size) are taken from the on-disk cache instead of
+# being read again.
+class ContentIndex():
+    def __init__(self):
+        self.pages = []
+
+    def build(self, pages, dir_path_public, cache_path=None):
+        cached = {}
+        if cache_path is not None and os.path.exists(cache_path):
+            with open(cache_path, "r") as file:
+                cached = json.load(file)
+
+        entries = {}
+        for from_path, dest_path in pages:
+            stat = os.stat(from_path)
+            key = [stat.st_mtime_ns, stat.st_size]
+            entry = cached.get(from_path)
+            if entry is not None and entry["key"] == key and entry["page"]["url"] == page_url(dest_path, dir_path_public):
+                info = PageInfo(**entry["page"])
+            else:
+                try:
+                    info = read_page_info(from_path, dest_path, dir_path_public)
+                except Exception as e:
+                    # The page failed to generate for the same reason, it is reported there
+                    print(f"Leaving {from_path} out of the content index: {type(e).__name__}: {e}")
+                    continue
+            self.pages.append(info)
+            entries[from_path] = {"key": key, "page": info.to_dict()}
+
+        if cache_path is not None:
+            os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+            with open(cache_path, "w") as file:
+                json.dump(entries, file)
+        return self
+
+    # Pages whose URL is below /section/, newest first
+    def section(self, section):
+        prefix = "/" + section.strip("/") + "/"
+        return sort_pages([page for page in self.pages if page.url.startswith(prefix) and page.url != prefix])
+
+    # {tag: pages with that tag, newest first}
+    def tags(self):
+        tagged = {}
+        for page in self.pages:
+            for tag in page.tags:
+                tagged.setdefault(tag, []).append(page)
+        return {tag: sort_pages(pages) for tag, pages in sorted(tagged.items())}
+
+
+# Newest first, pages without a date last, ties broken by title
+def sort_pages(pages):
+    pages = sorted(pages, key=lambda page: page.title)
+    return sorted(pages, key=lambda page: page.date, reverse=True)
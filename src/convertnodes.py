@@ -1,5 +1,6 @@
 import re
 from enum import Enum
+import images
 from htmlnode import HTMLNode, LeafNode
 from textnode import TextType, TextNode
 
@@ -17,12 +18,98 @@ def text_node_to_html_node(text_node):
         case TextType.LINK:
             return LeafNode("a", text_node.text, {"href": text_node.url})
         case TextType.IMAGE:
+            if images.active is not None:
+                return LeafNode("img", "", images.active.props(text_node.url, text_node.text))
             return LeafNode("img", "", {"src": text_node.url, "alt": text_node.text})
         case _:
             raise Exception("Not a recognized text type")
 
-# Converts raw text into TextNode using the other defined functions in sequence
+# Patterns are compiled once at import instead of on every call
+IMAGE_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_PATTERN = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+# One pattern for every inline token, so text_to_textnodes can walk a string left to right once.
+# "**" is listed before "*" so bold markers win, exactly like splitting on "**" first.
+INLINE_TOKEN_PATTERN = re.compile(r"\*\*|\*|`|" + IMAGE_PATTERN.pattern + "|" + LINK_PATTERN.pattern)
+# Characters that can start an inline token, searching for these first is much cheaper
+# than running the full alternation at every position of plain text
+INLINE_START_PATTERN = re.compile(r"[*`!\[]")
+DELIMITER_TYPES = {"**": TextType.BOLD, "*": TextType.ITALIC, "`": TextType.CODE}
+
+# Raised by scan_inline when the text nests markup in a way only the split pipeline
+# handles faithfully (unclosed or nested delimiters, markup inside links)
+class InlineScanFallback(Exception):
+    pass
+
+# Converts raw text into TextNodes in a single left to right pass. Text the scanner can't
+# handle exactly goes through the split pipeline instead, so the output is always the same.
 def text_to_textnodes(text):
+    # Most paragraphs contain no markup at all. Every token needs one of these characters
+    # (images and links need "["), and three substring checks are far cheaper than a regex search.
+    if "*" not in text and "`" not in text and "[" not in text:
+        return [TextNode(text, TextType.TEXT)]
+    try:
+        return scan_inline(text)
+    except InlineScanFallback:
+        return split_text_to_textnodes(text)
+
+# Single pass version of split_text_to_textnodes. Like the pipeline, text between two
+# delimited spans is kept even when empty, but empty text around links and images is dropped.
+def scan_inline(text):
+    nodes = []
+    segment = []
+    segment_start = 0
+    pos = 0
+
+    def flush(end):
+        if not segment:
+            nodes.append(TextNode(text[segment_start:end], TextType.TEXT))
+            return
+        start = segment_start
+        for match_start, match_end, node in segment:
+            if match_start > start:
+                nodes.append(TextNode(text[start:match_start], TextType.TEXT))
+            nodes.append(node)
+            start = match_end
+        if end > start:
+            nodes.append(TextNode(text[start:end], TextType.TEXT))
+        segment.clear()
+
+    while True:
+        candidate = INLINE_START_PATTERN.search(text, pos)
+        if candidate is None:
+            break
+        match = INLINE_TOKEN_PATTERN.match(text, candidate.start())
+        if match is None:
+            pos = candidate.start() + 1
+            continue
+        token = match.group()
+        text_type = DELIMITER_TYPES.get(token)
+        if text_type is None:
+            if "*" in token or "`" in token:
+                raise InlineScanFallback()
+            if match.group(1) is not None:
+                node = TextNode(match.group(1), TextType.IMAGE, match.group(2))
+            else:
+                node = TextNode(match.group(3), TextType.LINK, match.group(4))
+            segment.append((match.start(), match.end(), node))
+            pos = match.end()
+            continue
+
+        close = text.find(token, match.end())
+        if close == -1:
+            raise InlineScanFallback()
+        inner = text[match.end():close]
+        if "*" in inner or "`" in inner or (token == "*" and text.startswith("**", close)):
+            raise InlineScanFallback()
+        flush(match.start())
+        nodes.append(TextNode(inner, text_type))
+        pos = segment_start = close + len(token)
+
+    flush(len(text))
+    return nodes
+
+# Converts raw text into TextNode using the other defined functions in sequence
+def split_text_to_textnodes(text):
     nodes = [TextNode(text, TextType.TEXT)]
     nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
     nodes = split_nodes_delimiter(nodes, "*", TextType.ITALIC)
@@ -38,14 +125,14 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
     new_nodes = []
     
     for node in old_nodes:
-        delim_count = node.text.count(delimiter)
-        
-        if delim_count % 2 != 0:
-            raise ValueError("Invalid Markdown Syntax -- Missing Closing Delimiter")
-        
-        if node.text_type != TextType.TEXT or delim_count == 0:
+        # Only TEXT nodes are split, already converted nodes (e.g. an "*" inside bold text)
+        # are kept as they are without counting their delimiters
+        if node.text_type != TextType.TEXT or delimiter not in node.text:
             new_nodes.append(node)
             continue
+
+        if node.text.count(delimiter) % 2 != 0:
+            raise ValueError("Invalid Markdown Syntax -- Missing Closing Delimiter")
         
         split_node_text = node.text.split(delimiter)
 
@@ -60,13 +147,13 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
 # Takes raw markdown text and returns a list of tuples.
 # Each tuple contains the alt text and the URL of markdown images
 def extract_markdown_images(text):
-    image = re.findall(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    image = IMAGE_PATTERN.findall(text)
     return image
 
 # Takes raw markdown text and returns a list of tuples.
 # Each tuple contains the anchor text and URL of markdown links
 def extract_markdown_links(text):
-    link = re.findall(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    link = LINK_PATTERN.findall(text)
     return link
 
 # Splits text nodes containing image markdown into text nodes and image nodes
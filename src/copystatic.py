@@ -1,16 +1,127 @@
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 
+from discovery import scan_tree
+from manifest import hash_file
 
-def copy_files_recursive(source_dir_path, dest_dir_path):
-    if not os.path.exists(dest_dir_path):
-        os.mkdir(dest_dir_path)
 
-    for filename in os.listdir(source_dir_path):
-        from_path = os.path.join(source_dir_path, filename)
-        dest_path = os.path.join(dest_dir_path, filename)
-        print(f" * {from_path} -> {dest_path}")
-        if os.path.isfile(from_path):
-            shutil.copy(from_path, dest_path)
+# True when dest_path exists and has the same size and content hash as source_path
+def same_content(source_path, dest_path):
+    try:
+        if os.path.getsize(source_path) != os.path.getsize(dest_path):
+            return False
+    except FileNotFoundError:
+        return False
+    return hash_file(source_path) == hash_file(dest_path)
+
+
+# Linux ioctl that makes dest share the data blocks of source (btrfs, xfs, ...)
+FICLONE = 0x40049409
+
+# Ways sync_files can put a file in place, tried in this order until one works
+TRANSFER_MODES = {
+    "copy": ["copy"],
+    "hardlink": ["hardlink", "copy"],
+    "reflink": ["reflink", "copy"],
+}
+
+
+# Puts a copy of source_path at dest_path using the first mode the filesystem supports
+def transfer_file(source_path, dest_path, link="copy"):
+    if os.path.lexists(dest_path):
+        os.remove(dest_path)
+    for mode in TRANSFER_MODES[link]:
+        try:
+            if mode == "hardlink":
+                os.link(source_path, dest_path)
+            elif mode == "reflink":
+                import fcntl
+                with open(source_path, "rb") as source, open(dest_path, "wb") as dest:
+                    fcntl.ioctl(dest.fileno(), FICLONE, source.fileno())
+                shutil.copystat(source_path, dest_path)
+            else:
+                shutil.copy2(source_path, dest_path)
+            return mode
+        except (OSError, ImportError):
+            if os.path.lexists(dest_path):
+                os.remove(dest_path)
+            if mode == "copy":
+                raise
+
+
+# Decides whether dest_path already holds the content of source_path. Size and mtime are
+# compared first (copies keep the source mtime); verify_hash also compares the file contents.
+# With write_if_changed a copy with a different mtime still counts when its content is the
+# same, so a fresh checkout of the sources doesn't rewrite every file.
+def is_synced(source_path, source_stat, dest_path, verify_hash=False, write_if_changed=False):
+    try:
+        dest_stat = os.stat(dest_path)
+    except FileNotFoundError:
+        return False
+    if (dest_stat.st_dev, dest_stat.st_ino) == (source_stat.st_dev, source_stat.st_ino):
+        return True
+    if dest_stat.st_size != source_stat.st_size:
+        return False
+    if dest_stat.st_mtime_ns != source_stat.st_mtime_ns:
+        return write_if_changed and hash_file(source_path) == hash_file(dest_path)
+    return not verify_hash or hash_file(source_path) == hash_file(dest_path)
+
+
+# Byte and file counts reported at the end of sync_files, plus the destination paths
+# that were added, overwritten or left alone
+class SyncSummary():
+    def __init__(self):
+        self.copied_files = 0
+        self.copied_bytes = 0
+        self.skipped_files = 0
+        self.skipped_bytes = 0
+        self.added = []
+        self.modified = []
+        self.unchanged = []
+
+    def __repr__(self):
+        return (
+            f"copied {self.copied_files} file(s), {self.copied_bytes} bytes; "
+            f"skipped {self.skipped_files} unchanged file(s), {self.skipped_bytes} bytes"
+        )
+
+
+# Mirrors source_dir_path into dest_dir_path, only transferring files that changed.
+# Transfers run on a thread pool and use hardlinks or reflinks when link asks for them.
+# With a manifest every file is recorded, so manifest.remove_stale() later deletes copies
+# whose source is gone without touching generated pages that live in the same directory.
+# write_if_changed skips files whose copy has the same content even if its mtime differs.
+# Sizes and mtimes come from a snapshot of the source tree, taken here unless one is passed in.
+def sync_files(source_dir_path, dest_dir_path, manifest=None, link="copy", verify_hash=False, workers=8, write_if_changed=False, snapshot=None):
+    if snapshot is None:
+        snapshot = scan_tree(source_dir_path)
+    summary = SyncSummary()
+    for rel in sorted(snapshot.dirs):
+        os.makedirs(os.path.join(dest_dir_path, rel) if rel else dest_dir_path, exist_ok=True)
+    pending = []
+    for rel, stat in sorted(snapshot.files.items()):
+        from_path = snapshot.path(rel)
+        dest_path = os.path.join(dest_dir_path, rel)
+        if manifest is not None:
+            manifest.record(from_path, f"{stat.st_size}:{stat.st_mtime_ns}", dest_path)
+        if is_synced(from_path, stat, dest_path, verify_hash, write_if_changed):
+            summary.skipped_files += 1
+            summary.skipped_bytes += stat.st_size
+            summary.unchanged.append(dest_path)
         else:
-            copy_files_recursive(from_path, dest_path)
\ No newline at end of file
+            pending.append((from_path, dest_path, stat.st_size, os.path.lexists(dest_path)))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            (from_path, dest_path, size, existed, executor.submit(transfer_file, from_path, dest_path, link))
+            for from_path, dest_path, size, existed in pending
+        ]
+        for from_path, dest_path, size, existed, future in futures:
+            mode = future.result()
+            print(f" * {from_path} -> {dest_path} ({mode})")
+            summary.copied_files += 1
+            summary.copied_bytes += size
+            (summary.modified if existed else summary.added).append(dest_path)
+
+    return summary
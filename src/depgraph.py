@@ -0,0 +1,190 @@
+import json
+import os
+import posixpath
+
+import images
+from manifest import hash_file, hash_strings
+
+# References starting with one of these never point into the site
+EXTERNAL_PREFIXES = ("http://", "https://", "mailto:", "tel:", "data:", "//", "#")
+
+# Recorded instead of a fingerprint for dependencies only the existence of which matters
+EXISTS = "exists"
+
+# Files up to this size are fingerprinted by content, larger ones (images, videos)
+# by size and mtime so an incremental build never has to read gigabytes of assets
+FINGERPRINT_HASH_LIMIT = 1024 * 1024
+
+
+# Returns a value that changes whenever the file at path changes, or None if it doesn't exist
+def fingerprint(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    if stat.st_size <= FINGERPRINT_HASH_LIMIT:
+        return hash_file(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+# Maps a link or image URL found in a page to the input file it points at. Returns None for
+# external URLs. Internal URLs that point at nothing yet still map to the file that would
+# serve them, so the page is rebuilt once that file appears.
+def resolve_reference(url, page_url, dir_path_content, dir_path_static):
+    if url.startswith(EXTERNAL_PREFIXES) or url == "":
+        return None
+    url = url.split("#", 1)[0].split("?", 1)[0]
+    if not url.startswith("/"):
+        url = posixpath.join(posixpath.dirname(page_url) + "/", url)
+    rel = posixpath.normpath(url).lstrip("/")
+    if rel in ("", "."):
+        return os.path.join(dir_path_content, "index.md")
+
+    parts = rel.split("/")
+    candidates = [os.path.join(dir_path_static, *parts)]
+    if rel.endswith(".html"):
+        candidates.append(os.path.join(dir_path_content, *parts)[:-len(".html")] + ".md")
+    candidates.append(os.path.join(dir_path_content, *parts, "index.md"))
+    candidates.append(os.path.join(dir_path_content, *parts) + ".md")
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return candidate
+    if posixpath.splitext(rel)[1] not in ("", ".html"):
+        return candidates[0]
+    return os.path.join(dir_path_content, *parts, "index.md")
+
+
+# Every input the output of a page depends on: the template, its markdown source and the
+# images and pages it references, mapped to True when the output depends on the input's content
+# and False when only its existence matters. A link only puts the href in the page, so editing
+# the linked page doesn't change it. Neither does editing an image, unless --images renders its
+# dimensions into the page. references are the [type, url] pairs the reference collector
+# gathered while the page was parsed, the markdown is not read again.
+def page_dependencies(from_path, page_url, template_path, dir_path_content, dir_path_static, references):
+    dependencies = {template_path: True, from_path: True}
+    for kind, url in references:
+        path = resolve_reference(url, page_url, dir_path_content, dir_path_static)
+        if path is not None:
+            content = kind == "image" and images.active is not None
+            dependencies[path] = dependencies.get(path, False) or content
+    return dependencies
+
+
+# Records, for every page output, the inputs it was built from and their fingerprints at the
+# time, plus why it was regenerated. A later build compares the fingerprints to find exactly
+# the pages that have to be rebuilt.
+class DependencyGraph():
+    def __init__(self, path, dir_path_static):
+        self.path = path
+        self.dir_path_static = dir_path_static
+        self.pages = {}
+        self.current = {}
+        self.fingerprints = {}
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r") as file:
+            self.pages = json.load(file)["pages"]
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as file:
+            file.write(json.dumps({"pages": self.current}, sort_keys=True))
+        os.replace(tmp_path, self.path)
+
+    # Fingerprints each input once per build, the template is shared by every page
+    def fingerprint(self, path):
+        if path not in self.fingerprints:
+            self.fingerprints[path] = fingerprint(path)
+        return self.fingerprints[path]
+
+    # EXISTS or None, for dependencies recorded by existence only
+    def presence(self, path):
+        return EXISTS if os.path.exists(path) else None
+
+    # Reasons the page at output has to be rebuilt, or [] when it is up to date
+    def changes(self, output):
+        entry = self.pages.get(output)
+        if entry is None:
+            return ["no record of a previous build"]
+        if not os.path.exists(output):
+            return ["output is missing"]
+        reasons = []
+        for dependency, old in entry["dependencies"].items():
+            # A dependency that was missing counts as added whatever kind it is
+            new = self.fingerprint(dependency) if old not in (EXISTS, None) else self.presence(dependency)
+            if new == old:
+                continue
+            if old is None:
+                reasons.append(f"{dependency} was added")
+            elif new is None:
+                reasons.append(f"{dependency} was removed")
+            else:
+                reasons.append(f"{dependency} changed")
+        return reasons
+
+    # Takes the recorded fingerprints of paths instead of reading them again, for inputs a
+    # tree snapshot shows are unchanged since the last build
+    def reuse(self, paths):
+        recorded = {}
+        for entry in self.pages.values():
+            recorded.update(entry["dependencies"])
+        for path in paths:
+            if recorded.get(path) not in (EXISTS, None):
+                self.fingerprints[path] = recorded[path]
+
+    # dependencies as returned by page_dependencies
+    def record(self, output, source, dependencies, reasons):
+        self.current[output] = {
+            "source": source,
+            "dependencies": {
+                dependency: self.fingerprint(dependency) if content else self.presence(dependency)
+                for dependency, content in dependencies.items()
+            },
+            "reasons": reasons,
+        }
+
+    # Carries the entry of a page that did not need rebuilding over to this build
+    def keep(self, output):
+        entry = dict(self.pages[output])
+        entry["reasons"] = []
+        self.current[output] = entry
+
+    # A single digest of every dependency of output, suitable for the build manifest
+    def digest(self, output):
+        dependencies = self.current[output]["dependencies"]
+        return hash_strings(*[f"{path}={dependencies[path]}" for path in sorted(dependencies)])
+
+    # Finds the output matching query, which may be an output path, a source path or a URL
+    def find(self, query, dir_path_public):
+        for output, entry in self.pages.items():
+            url = "/" + os.path.relpath(output, dir_path_public).replace(os.sep, "/")
+            urls = [url, url[:-len("index.html")], url[:-len("/index.html")]]
+            if os.path.normpath(query) in (os.path.normpath(output), os.path.normpath(entry["source"])) or query in urls:
+                return output
+        return None
+
+    # Human readable answer to "why was this page regenerated?"
+    def explain(self, query, dir_path_public):
+        output = self.find(query, dir_path_public)
+        if output is None:
+            return [f"{query} is not in the dependency graph, run a build first"]
+        entry = self.pages[output]
+        lines = [f"{output} (from {entry['source']})"]
+        if entry["reasons"]:
+            lines.append("was regenerated in the last build because:")
+            lines += [f"  * {reason}" for reason in entry["reasons"]]
+        else:
+            lines.append("was not regenerated in the last build, none of its dependencies had changed")
+        pending = self.changes(output)
+        if pending:
+            lines.append("will be regenerated by the next build because:")
+            lines += [f"  * {reason}" for reason in pending]
+        lines.append("depends on:")
+        lines += [
+            f"  * {dependency}" + (" (existence only)" if old == EXISTS else "")
+            for dependency, old in entry["dependencies"].items()
+        ]
+        return lines
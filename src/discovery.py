@@ -0,0 +1,149 @@
+import json
+import os
+import time
+from collections import namedtuple
+
+# The parts of an os.stat_result the build looks at, taken from the DirEntry of a scan
+FileStat = namedtuple("FileStat", ["st_size", "st_mtime_ns", "st_ino", "st_dev"])
+
+# Entries changed within this window before a scan may change again within the same mtime
+# tick without the mtime moving, so a listing or fingerprint that recent is never trusted
+RACY_WINDOW_NS = 2 * 1000 * 1000 * 1000
+
+
+# The files under a directory tree with their size and mtime, plus the listing of every
+# directory keyed by its mtime. A later scan given this one as previous only re-lists the
+# directories whose mtime changed (adding, removing or renaming an entry changes it) and just
+# stats the files of the others, so an unchanged tree costs no readdir calls at all.
+class TreeSnapshot():
+    def __init__(self, root):
+        self.root = root
+        self.device = None
+        self.scanned_at = 0
+        # relative path -> FileStat
+        self.files = {}
+        # relative directory path ("" for the root) -> (mtime_ns, file names, subdirectory names)
+        self.dirs = {}
+
+    def path(self, rel):
+        return os.path.join(self.root, rel) if rel else self.root
+
+    # Compares this snapshot with an older one and returns (changed, removed) paths,
+    # where changed includes added files
+    def diff(self, old):
+        changed = [self.path(rel) for rel, stat in self.files.items() if old.files.get(rel, (None,))[:2] != stat[:2]]
+        removed = [self.path(rel) for rel in old.files if rel not in self.files]
+        return sorted(changed), sorted(removed)
+
+    # Paths of the files that certainly haven't changed since the old snapshot: same size and
+    # mtime, and modified long enough before it was taken that the mtime would have moved
+    def unchanged_since(self, old):
+        settled = old.scanned_at - RACY_WINDOW_NS
+        return [
+            self.path(rel) for rel, stat in self.files.items()
+            if old.files.get(rel, (None,))[:2] == stat[:2] and stat.st_mtime_ns < settled
+        ]
+
+    # A copy holding only the files for which keep(rel) is true, e.g. the files of one shard.
+    # Directory listings are shared with this snapshot, only save the complete one.
+    def subset(self, keep):
+        snapshot = TreeSnapshot(self.root)
+        snapshot.device = self.device
+        snapshot.scanned_at = self.scanned_at
+        snapshot.files = {rel: stat for rel, stat in self.files.items() if keep(rel)}
+        snapshot.dirs = self.dirs
+        return snapshot
+
+    def to_dict(self):
+        return {
+            "root": self.root,
+            "device": self.device,
+            "scanned_at": self.scanned_at,
+            "files": {rel: list(stat) for rel, stat in self.files.items()},
+            "dirs": {rel: [mtime, files, subdirs] for rel, (mtime, files, subdirs) in self.dirs.items()},
+        }
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as file:
+            file.write(json.dumps(self.to_dict()))
+        os.replace(tmp_path, path)
+
+    # Returns the snapshot saved at path, or None when there is none for root
+    @classmethod
+    def load(cls, path, root):
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as file:
+            data = json.load(file)
+        if data.get("root") != root:
+            return None
+        snapshot = cls(root)
+        snapshot.device = data["device"]
+        snapshot.scanned_at = data["scanned_at"]
+        snapshot.files = {rel: FileStat(*stat) for rel, stat in data["files"].items()}
+        snapshot.dirs = {rel: (mtime, files, subdirs) for rel, (mtime, files, subdirs) in data["dirs"].items()}
+        return snapshot
+
+    def __repr__(self):
+        return f"TreeSnapshot({self.root}, {len(self.files)} files, {len(self.dirs)} dirs)"
+
+
+# Walks the tree under root once with os.scandir, taking sizes and mtimes from the DirEntry
+# stat results. With a previous snapshot, directories whose mtime is unchanged are not listed
+# again. A root that doesn't exist gives an empty snapshot.
+def scan_tree(root, previous=None):
+    snapshot = TreeSnapshot(root)
+    snapshot.scanned_at = time.time_ns()
+    try:
+        snapshot.device = os.stat(root).st_dev
+    except FileNotFoundError:
+        return snapshot
+    if previous is not None and previous.device != snapshot.device:
+        previous = None
+
+    pending = [("", None)]
+    while pending:
+        rel, dir_mtime = pending.pop()
+        path = snapshot.path(rel)
+        if dir_mtime is None:
+            try:
+                dir_mtime = os.stat(path).st_mtime_ns
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+        listed = previous.dirs.get(rel) if previous is not None else None
+        if listed is not None and listed[0] == dir_mtime and dir_mtime < previous.scanned_at - RACY_WINDOW_NS:
+            _, file_names, subdir_names = listed
+            snapshot.dirs[rel] = listed
+            for name in file_names:
+                file_rel = os.path.join(rel, name) if rel else name
+                try:
+                    stat = os.stat(snapshot.path(file_rel))
+                except FileNotFoundError:
+                    continue
+                snapshot.files[file_rel] = FileStat(stat.st_size, stat.st_mtime_ns, stat.st_ino, stat.st_dev)
+            pending.extend((os.path.join(rel, name) if rel else name, None) for name in subdir_names)
+            continue
+
+        file_names = []
+        subdir_names = []
+        try:
+            with os.scandir(path) as iterator:
+                entries = list(iterator)
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        for entry in entries:
+            entry_rel = os.path.join(rel, entry.name) if rel else entry.name
+            try:
+                if entry.is_dir():
+                    subdir_names.append(entry.name)
+                    pending.append((entry_rel, None))
+                elif entry.is_file():
+                    stat = entry.stat()
+                    file_names.append(entry.name)
+                    snapshot.files[entry_rel] = FileStat(stat.st_size, stat.st_mtime_ns, stat.st_ino, stat.st_dev)
+            except FileNotFoundError:
+                continue
+        snapshot.dirs[rel] = (dir_mtime, sorted(file_names), sorted(subdir_names))
+    return snapshot
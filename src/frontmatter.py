@@ -0,0 +1,121 @@
+import datetime
+
+from markdown_blocks import extract_title, extract_title_from_file
+
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
+
+# Opening fence line -> format of the front matter it starts
+FENCES = {"---": "yaml", "+++": "toml"}
+
+
+# Parses the flat YAML subset used in front matter: "key: value" pairs where a value is a
+# plain or quoted string, an inline list such as [a, b], or a list of "- item" lines below the key
+def parse_yaml(lines):
+    metadata = {}
+    key = None
+    for line in lines:
+        stripped = line.strip()
+        if stripped == "" or stripped.startswith("#"):
+            continue
+        if stripped.startswith("- ") and key is not None:
+            if not isinstance(metadata[key], list):
+                metadata[key] = []
+            metadata[key].append(parse_yaml_scalar(stripped[2:]))
+            continue
+        if ":" not in stripped:
+            raise ValueError(f"Invalid front matter line: {line}")
+        key, value = stripped.split(":", 1)
+        key = key.strip()
+        value = value.strip()
+        if value.startswith("[") and value.endswith("]"):
+            items = value[1:-1].split(",")
+            metadata[key] = [parse_yaml_scalar(item) for item in items if item.strip() != ""]
+        else:
+            metadata[key] = parse_yaml_scalar(value)
+    return metadata
+
+
+def parse_yaml_scalar(value):
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    return value
+
+
+def parse_toml(lines):
+    if tomllib is None:
+        raise ValueError("TOML front matter needs Python 3.11 or newer")
+    metadata = tomllib.loads("\n".join(lines))
+    # Dates are kept as ISO strings, the same as in YAML front matter
+    for key, value in metadata.items():
+        if isinstance(value, (datetime.date, datetime.time)):
+            metadata[key] = value.isoformat()
+    return metadata
+
+
+def parse_front_matter(fence, lines):
+    if FENCES[fence] == "toml":
+        return parse_toml(lines)
+    return parse_yaml(lines)
+
+
+# Splits a markdown document into (metadata, body). Documents without front matter
+# (or with an opening fence that is never closed) return ({}, markdown).
+def split_front_matter(markdown):
+    lines = markdown.split("\n")
+    fence = lines[0].rstrip()
+    if fence not in FENCES:
+        return {}, markdown
+    for i in range(1, len(lines)):
+        if lines[i].rstrip() == fence:
+            return parse_front_matter(fence, lines[1:i]), "\n".join(lines[i + 1:])
+    return {}, markdown
+
+
+# Reads the front matter from the head of an open file without touching the body. The file
+# is left positioned at the start of the body. Returns {} when there is no front matter.
+def read_front_matter(file):
+    start = file.tell()
+    fence = file.readline().rstrip()
+    if fence not in FENCES:
+        file.seek(start)
+        return {}
+    lines = []
+    while True:
+        line = file.readline()
+        if line == "":
+            file.seek(start)
+            return {}
+        if line.rstrip() == fence:
+            return parse_front_matter(fence, lines)
+        lines.append(line.rstrip("\n"))
+
+
+# Metadata-only scan of one page: the front matter plus a title, taken from the front matter
+# or from the first h1 heading. Only the head of the file is read, never the whole body.
+def read_metadata(path):
+    with open(path, "r") as file:
+        metadata = read_front_matter(file)
+        if "title" not in metadata:
+            metadata["title"] = extract_title_from_file(file)
+    return metadata
+
+
+# Title of a page whose front matter was already split off
+def page_title(metadata, body):
+    if "title" in metadata:
+        return str(metadata["title"])
+    return extract_title(body)
+
+
+# Front matter values as template placeholders, lists are joined with commas
+def template_fields(metadata):
+    fields = {}
+    for key, value in metadata.items():
+        if isinstance(value, list):
+            value = ", ".join(str(item) for item in value)
+        fields[key] = value
+    return fields
@@ -1,44 +1,329 @@
 import os
 import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import blockcache
+import images
+import linkcheck
+import profiler
+import references
+import search
+import sitemap
+import template
+import writer
+from profiler import stage
 from markdown_blocks import *
 from htmlnode import *
+from contentindex import page_url
+from depgraph import page_dependencies
+from discovery import scan_tree
+from frontmatter import page_title, read_front_matter, split_front_matter, template_fields
+from manifest import hash_strings
+from shards import in_shard
+from template import load_template
+
+# Markdown files larger than this are streamed block by block instead of read whole
+STREAM_THRESHOLD = 8 * 1024 * 1024
 
 def generate_page(from_path, template_path, dest_path):
     print(f"Generating page from {from_path} to {dest_path} using {template_path}...")
     
     if not os.path.exists(from_path):
         raise Exception("No file found in from_path")
-   
-    with open(from_path, "r") as file:
-        markdown_file = file.read()
-    with open(template_path, "r") as template:
-        template_file = template.read()
-    
-    html = markdown_to_html_node(markdown_file).to_html()
-    title = extract_title(markdown_file)
-    full_html_page = template_file.replace("{{ Title }}", title).replace("{{ Content }}", html)
-    
+
+    start = time.perf_counter()
+    source_stat = os.stat(from_path)
+    if source_stat.st_size > STREAM_THRESHOLD:
+        generate_page_streaming(from_path, template_path, dest_path)
+    else:
+        with stage("read"):
+            with open(from_path, "r") as file:
+                markdown_file = file.read()
+        with stage("load_template"):
+            template = load_template(template_path)
+
+        with stage("front_matter"):
+            metadata, body = split_front_matter(markdown_file)
+        if search.active is not None:
+            search.active.start_page()
+        if linkcheck.active is not None:
+            linkcheck.active.start_page()
+        if references.active is not None:
+            references.active.start_page()
+        with stage("markdown_to_html_node"):
+            node = markdown_to_html_node(body)
+        with stage("to_html"):
+            html = node.to_html()
+        with stage("extract_title"):
+            title = page_title(metadata, body)
+        if search.active is not None:
+            search.active.finish_page(from_path, page_url(dest_path, search.active.dir_path_public), title)
+        if linkcheck.active is not None:
+            linkcheck.active.finish_page(from_path, page_url(dest_path, linkcheck.active.dir_path_public))
+        if references.active is not None:
+            references.active.finish_page(from_path)
+        with stage("render_template"):
+            context = template_fields(metadata)
+            context.update({"Title": title, "Content": html})
+            full_html_page = template.render(context)
+
+        with stage("write"):
+            if writer.active is not None:
+                writer.active.write(dest_path, full_html_page, from_path)
+            else:
+                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+                with open(dest_path, "w") as file:
+                    file.write(full_html_page)
+        if sitemap.active is not None:
+            sitemap.active.add(from_path, dest_path, title, metadata.get("date", ""), source_stat.st_mtime, metadata.get("author", ""))
+
+    if profiler.active is not None:
+        profiler.active.add_page(from_path, time.perf_counter() - start)
+    return True
+
+# Generates a page without holding the markdown or the HTML in memory. The title is taken from
+# the front matter or found first by a lazy scan that stops at the first h1, then the blocks are
+# read, converted and written to dest_path one at a time, so peak memory is bounded by the largest block.
+# With an output writer the page is streamed to a temp file first and only replaces dest_path
+# when its content differs.
+def generate_page_streaming(from_path, template_path, dest_path):
+    template = load_template(template_path)
+
     os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-    with open(dest_path, "w") as file:
-        file.write(full_html_page)
-    
+    out_path = dest_path
+    if writer.active is not None:
+        out_path = f"{dest_path}.{os.getpid()}.tmp"
+    with open(from_path, "r") as file:
+        with stage("front_matter"):
+            metadata = read_front_matter(file)
+            body_start = file.tell()
+        with stage("extract_title"):
+            title = metadata["title"] if "title" in metadata else extract_title_from_file(file)
+        file.seek(body_start)
+        if search.active is not None:
+            search.active.start_page()
+        if linkcheck.active is not None:
+            linkcheck.active.start_page()
+        if references.active is not None:
+            references.active.start_page()
+        with stage("stream"), open(out_path, "w") as out:
+            context = template_fields(metadata)
+            context.update({"Title": str(title), "Content": lambda write: write_markdown_html(file, write)})
+            template.render_to(out.write, context)
+    if out_path != dest_path:
+        writer.active.replace(out_path, dest_path)
+    if search.active is not None:
+        search.active.finish_page(from_path, page_url(dest_path, search.active.dir_path_public), title)
+    if linkcheck.active is not None:
+        linkcheck.active.finish_page(from_path, page_url(dest_path, linkcheck.active.dir_path_public))
+    if references.active is not None:
+        references.active.finish_page(from_path)
+    if sitemap.active is not None:
+        sitemap.active.add(from_path, dest_path, title, metadata.get("date", ""), os.stat(from_path).st_mtime, metadata.get("author", ""))
+
     return True
 
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path):
+# Adds pages that were not generated by this build to the search index and the link checker,
+# converting their markdown without rendering the template or writing anything
+def index_pages(pages, dir_path_public):
+    for from_path, dest_path in pages:
+        url = page_url(dest_path, dir_path_public)
+        try:
+            with open(from_path, "r") as file:
+                metadata, body = split_front_matter(file.read())
+            for collector in (search.active, linkcheck.active):
+                if collector is not None:
+                    collector.start_page()
+            markdown_to_html_node(body)
+            if search.active is not None:
+                search.active.finish_page(from_path, url, page_title(metadata, body))
+            if linkcheck.active is not None:
+                linkcheck.active.finish_page(from_path, url)
+        except Exception as e:
+            print(f"Leaving {from_path} out of the search index and link check: {type(e).__name__}: {e}")
+
+# Returns (from_path, dest_path) pairs for every markdown file in the content tree, creating
+# the matching directories under dest_dir_path on the way. The tree is walked once with
+# os.scandir unless a snapshot of it is passed in. With a shard given as (index, count), only
+# the pages of that shard are returned.
+def find_pages(dir_path_content, dest_dir_path, snapshot=None, shard=None):
+    if snapshot is None:
+        snapshot = scan_tree(dir_path_content)
+
+    for rel in sorted(snapshot.dirs):
+        os.makedirs(os.path.join(dest_dir_path, rel) if rel else dest_dir_path, exist_ok=True)
+    pages = []
+    for rel in sorted(snapshot.files):
+        if rel.endswith(".md") and in_shard(rel, shard):
+            dest_path = os.path.splitext(os.path.join(dest_dir_path, rel))[0] + ".html"
+            pages.append((snapshot.path(rel), dest_path))
+    return pages
+
+# Generates pages one after the other and returns the ones that failed as (from_path, error)
+# pairs instead of raising, so one bad page can't stop the build
+def generate_pages_serial(pages, template_path):
+    failures = []
+    for from_path, dest_path in pages:
+        try:
+            generate_page(from_path, template_path, dest_path)
+        except Exception as e:
+            failures.append((from_path, f"{type(e).__name__}: {e}"))
+    return failures
+
+# The build settings generate_page reads from module globals, for generate_page_batch.
+# Forked workers inherit the parent's globals, but under the spawn and forkserver start
+# methods (the defaults on macOS, and on Linux from Python 3.14) a worker imports every module
+# afresh, so the settings are passed to it explicitly. The image catalog goes along whole, it
+# decides how images render; the writer and the collectors only need what they are created with.
+def worker_settings():
+    return {
+        "profile": profiler.active is not None,
+        "minify": template.minify,
+        "images": images.active,
+        "writer": None if writer.active is None else (writer.active.threads, writer.active.max_pending),
+        "block_cache": None if blockcache.active is None else blockcache.active.max_entries,
+        "sitemap": None if sitemap.active is None else (sitemap.active.dir_path_public, sitemap.active.site_url),
+        "search": None if search.active is None else search.active.dir_path_public,
+        "linkcheck": None if linkcheck.active is None else linkcheck.active.dir_path_public,
+        "references": references.active is not None,
+    }
+
+# Sets up a worker process from worker_settings. A forked worker keeps the block cache and the
+# collectors it inherited, a spawned one starts them empty: it only hands back what it records.
+def apply_worker_settings(settings):
+    template.minify = settings["minify"]
+    images.active = settings["images"]
+    if settings["block_cache"] is not None and blockcache.active is None:
+        blockcache.enable(settings["block_cache"])
+    if settings["sitemap"] is not None and sitemap.active is None:
+        sitemap.enable(*settings["sitemap"])
+    if settings["search"] is not None and search.active is None:
+        search.enable(settings["search"])
+    if settings["linkcheck"] is not None and linkcheck.active is None:
+        linkcheck.enable(settings["linkcheck"])
+    if settings["references"] and references.active is None:
+        references.enable()
+
+# The enabled collectors of the build by name. Each records what the pages it sees add, and a
+# worker hands back what it recorded with take_changes for the parent to merge.
+def active_collectors():
+    collectors = {
+        "blockcache": blockcache.active,
+        "sitemap": sitemap.active,
+        "search": search.active,
+        "linkcheck": linkcheck.active,
+        "references": references.active,
+    }
+    return {name: collector for name, collector in collectors.items() if collector is not None}
+
+# Runs in a worker process. Applies the settings from worker_settings, then generates one shard
+# of pages with generate_pages_serial. Returns a dict with the failed pages under "failures" and,
+# for the parent to merge, what the worker's profiler measured, what its output writer wrote
+# and what each of active_collectors recorded, keyed by name.
+# The threads of the parent's output writer don't survive the fork, so the worker writes
+# through a pool of its own.
+def generate_page_batch(pages, template_path, settings):
+    apply_worker_settings(settings)
+    if settings["profile"]:
+        profiler.enable()
+    for collector in active_collectors().values():
+        collector.track_changes()
+    if settings["writer"] is not None:
+        writer.active = writer.OutputWriter(*settings["writer"])
+    results = {"failures": generate_pages_serial(pages, template_path)}
+    if writer.active is not None:
+        results["failures"].extend(writer.active.close())
+        results["writer"] = writer.active.results()
+    if profiler.active is not None:
+        results["profiler"] = profiler.active.to_dict()
+        profiler.disable()
+    for name, collector in active_collectors().items():
+        results[name] = collector.take_changes()
+    return results
+
+# Splits pages into shards and generates them across a pool of worker processes.
+# Returns the failed pages as (from_path, error) pairs.
+def generate_pages_parallel(pages, template_path, workers):
+    shard_size = max(1, len(pages) // (workers * 4))
+    shards = [pages[i:i + shard_size] for i in range(0, len(pages), shard_size)]
+
+    failures = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        settings = worker_settings()
+        futures = [(shard, executor.submit(generate_page_batch, shard, template_path, settings)) for shard in shards]
+        targets = dict(active_collectors(), profiler=profiler.active, writer=writer.active)
+        for shard, future in futures:
+            try:
+                results = future.result()
+            except Exception as e:
+                # The worker itself died, every page of its shard is unaccounted for
+                failures.extend((from_path, f"{type(e).__name__}: {e}") for from_path, _ in shard)
+                continue
+            failures.extend(results.pop("failures"))
+            for name, changes in results.items():
+                targets[name].merge(changes)
+    return failures
+
+# When a manifest is passed, pages whose markdown and template are unchanged since the
+# last build are skipped, every page seen is recorded so stale outputs can be removed later.
+# When a dependency graph is passed as well, it decides instead: a page is skipped only if
+# none of its recorded inputs (template, markdown, referenced images and pages) changed.
+# A snapshot of the content tree from discovery.scan_tree saves walking it again.
+# With workers > 1 pages are generated in a process pool. Either way failed pages are returned
+# as (from_path, error) pairs rather than raised. With an output writer enabled, its queue is
+# flushed before returning so every output is on disk. With a shard given as (index, count)
+# only that shard's pages are generated, see shards.shard_of.
+def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, manifest=None, workers=1, graph=None, snapshot=None, shard=None):
     if not os.path.exists(dir_path_content):
         raise Exception("Invalid content path")
-    
-    if not os.path.exists(dest_dir_path):
-        os.mkdir(dest_dir_path)
 
-    for content in os.listdir(dir_path_content):
-        from_path = os.path.join(dir_path_content, content)
+    with stage("find_pages"):
+        pages = find_pages(dir_path_content, dest_dir_path, snapshot, shard)
+
+    pending = []
+    digests = {}
+    reasons = {}
+    for from_path, dest_path in pages:
+        if graph is not None:
+            reasons[dest_path] = graph.changes(dest_path)
+            if not reasons[dest_path]:
+                graph.keep(dest_path)
+                if manifest is not None:
+                    manifest.record(from_path, graph.digest(dest_path), dest_path)
+                continue
+        elif manifest is not None:
+            digest = hash_strings(manifest.digest(from_path), manifest.digest(template_path))
+            if manifest.is_unchanged(from_path, digest, dest_path):
+                manifest.record(from_path, digest, dest_path)
+                continue
+            digests[from_path] = digest
+        pending.append((from_path, dest_path))
+
+    # The graph learns what the pages link to while they are parsed
+    if graph is not None:
+        references.enable()
+    if workers > 1 and len(pending) > 1:
+        failures = generate_pages_parallel(pending, template_path, workers)
+    else:
+        failures = generate_pages_serial(pending, template_path)
+    if writer.active is not None:
+        with stage("flush_writes"):
+            failures.extend(writer.active.flush())
 
-        if os.path.isfile(from_path):
-            if from_path.endswith(".md"):
-                dest_path = os.path.splitext(os.path.join(dest_dir_path, content))[0] + ".html"
-                generate_page(from_path, template_path, dest_path)
+    failed = set(from_path for from_path, _ in failures)
+    for from_path, dest_path in pending:
+        if graph is not None and from_path not in failed:
+            url = page_url(dest_path, dest_dir_path)
+            dependencies = page_dependencies(
+                from_path, url, template_path, dir_path_content, graph.dir_path_static, references.active.take(from_path)
+            )
+            graph.record(dest_path, from_path, dependencies, reasons[dest_path])
+            digests[from_path] = graph.digest(dest_path)
+        if manifest is not None:
+            # Failed pages keep an entry without a hash so their previous output is not
+            # removed as stale and the next build retries them
+            manifest.record(from_path, None if from_path in failed else digests[from_path], dest_path)
+    references.disable()
 
-        else:
-            dest_path = os.path.join(dest_dir_path, content)
-            generate_pages_recursive(from_path, template_path, dest_path)
\ No newline at end of file
+    return failures
@@ -0,0 +1,242 @@
+import json
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+from copystatic import same_content, transfer_file
+from manifest import hash_file, hash_strings
+from shards import in_shard
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# The image catalog of the running build, None unless --images was passed. Image nodes
+# look their source up here to render width, height and srcset.
+active = None
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
+
+# Widths of the resized variants, only the ones narrower than the source are generated.
+# A variant at the source width is generated too, since re-encoding alone saves a lot on PNGs.
+VARIANT_WIDTHS = [480, 960, 1600]
+VARIANT_FORMAT = "webp"
+VARIANT_QUALITY = 80
+
+
+# Reads (width, height) from the header of a PNG, GIF, JPEG or WebP file without decoding it,
+# so pages get their dimensions even without Pillow. Returns None for anything else.
+def read_image_size(path):
+    with open(path, "rb") as file:
+        head = file.read(32)
+        if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", head[6:10])
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            return read_webp_size(head)
+        if head[:2] == b"\xff\xd8":
+            file.seek(2)
+            return read_jpeg_size(file)
+    return None
+
+
+def read_webp_size(head):
+    chunk = head[12:16]
+    if chunk == b"VP8 ":
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L":
+        bits = int.from_bytes(head[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        return int.from_bytes(head[24:27], "little") + 1, int.from_bytes(head[27:30], "little") + 1
+    return None
+
+
+# Walks the JPEG markers up to the first start-of-frame, which holds the dimensions
+def read_jpeg_size(file):
+    while True:
+        marker = file.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:
+            continue
+        length = struct.unpack(">H", file.read(2))[0]
+        if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">xHH", file.read(5))
+            return width, height
+        file.seek(length - 2, os.SEEK_CUR)
+
+
+# Runs in a worker process. Resizes source_path to width, keeping the aspect ratio, and
+# re-encodes it to cache_path.
+def make_variant(source_path, cache_path, width):
+    with Image.open(source_path) as image:
+        height = max(1, round(image.height * width / image.width))
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+        resized = image.resize((width, height), Image.LANCZOS) if width != image.width else image
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        resized.save(tmp_path, VARIANT_FORMAT.upper(), quality=VARIANT_QUALITY, method=6)
+    os.replace(tmp_path, cache_path)
+    return cache_path
+
+
+# Dimensions and variants of one image, variants as [(url, width)] narrowest first
+class ImageInfo():
+    def __init__(self, url, width, height, variants=None):
+        self.url = url
+        self.width = width
+        self.height = height
+        self.variants = variants or []
+
+    def srcset(self):
+        return ", ".join(f"{url} {width}w" for url, width in self.variants)
+
+    def __repr__(self):
+        return f"ImageInfo({self.url}, {self.width}x{self.height}, {len(self.variants)} variants)"
+
+
+# File counts reported at the end of ImageCatalog.build, plus the variant paths that were
+# added, overwritten or left alone under the public directory
+class ImageSummary():
+    def __init__(self):
+        self.images = 0
+        self.generated = 0
+        self.cached = 0
+        self.added = []
+        self.modified = []
+        self.unchanged = []
+
+    def __repr__(self):
+        return f"{self.images} image(s), {self.generated} variant(s) generated, {self.cached} from cache"
+
+
+# Every image under the static directory with its dimensions and, when Pillow is installed,
+# resized and re-encoded variants. Variants are cached in cache_dir under the source's hash and
+# width, so an image is only processed again when its content changes. The hashes and sizes
+# are kept in index_path keyed by mtime and size, so unchanged images aren't even read.
+class ImageCatalog():
+    def __init__(self, dir_path_static, dir_path_public, cache_dir, index_path, widths=VARIANT_WIDTHS):
+        self.dir_path_static = dir_path_static
+        self.dir_path_public = dir_path_public
+        self.cache_dir = cache_dir
+        self.index_path = index_path
+        self.widths = widths
+        self.images = {}
+
+    def get(self, url):
+        return self.images.get(url)
+
+    # Attributes of an <img> for the image at url: its dimensions, so the browser reserves
+    # the space before it loads, and the variants to pick from
+    def props(self, url, alt):
+        props = {"src": url, "alt": alt}
+        info = self.images.get(url)
+        if info is None:
+            return props
+        props["width"] = str(info.width)
+        props["height"] = str(info.height)
+        if info.variants:
+            props["srcset"] = info.srcset()
+            props["sizes"] = f"(max-width: {info.width}px) 100vw, {info.width}px"
+        return props
+
+    # Hash and dimensions of every static image, read again only for files that changed
+    def scan(self):
+        cached = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r") as file:
+                cached = json.load(file)
+        entries = {}
+        for dir_path, _, filenames in os.walk(self.dir_path_static):
+            for filename in sorted(filenames):
+                if os.path.splitext(filename)[1].lower() not in IMAGE_EXTENSIONS:
+                    continue
+                path = os.path.join(dir_path, filename)
+                stat = os.stat(path)
+                key = [stat.st_mtime_ns, stat.st_size]
+                entry = cached.get(path)
+                if entry is None or entry["key"] != key:
+                    size = read_image_size(path)
+                    if size is None:
+                        continue
+                    entry = {"key": key, "hash": hash_file(path), "size": list(size)}
+                entries[path] = entry
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        with open(self.index_path, "w") as file:
+            json.dump(entries, file)
+        return entries
+
+    def variant_widths(self, width):
+        return [w for w in self.widths if w < width] + [width]
+
+    # Scans the images, generates missing variants on a pool of worker processes and puts them
+    # next to their source under dir_path_public, recording each one in the manifest. With a
+    # shard given as (index, count), every image is still catalogued so all pages render their
+    # srcset, but only the variants of that shard's images are generated and placed.
+    def build(self, manifest=None, workers=1, shard=None):
+        summary = ImageSummary()
+        entries = self.scan()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        jobs = []
+        placements = []
+        for path, entry in entries.items():
+            rel = os.path.relpath(path, self.dir_path_static)
+            url = "/" + rel.replace(os.sep, "/")
+            width, height = entry["size"]
+            info = ImageInfo(url, width, height)
+            self.images[url] = info
+            summary.images += 1
+            if Image is None:
+                continue
+            placed = in_shard(rel, shard)
+            for variant_width in self.variant_widths(width):
+                cache_path = os.path.join(self.cache_dir, f"{entry['hash']}-{variant_width}.{VARIANT_FORMAT}")
+                # Named after the whole file name, so a.png and a.jpg don't share a-480w.webp
+                dest_rel = f"{rel}-{variant_width}w.{VARIANT_FORMAT}"
+                info.variants.append(("/" + dest_rel.replace(os.sep, "/"), variant_width))
+                if not placed:
+                    continue
+                placements.append((cache_path, os.path.join(self.dir_path_public, dest_rel), entry["hash"]))
+                if os.path.exists(cache_path):
+                    summary.cached += 1
+                else:
+                    jobs.append((path, cache_path, variant_width))
+
+        if jobs:
+            with ProcessPoolExecutor(max_workers=max(1, workers)) as executor:
+                futures = [executor.submit(make_variant, *job) for job in jobs]
+                for future in futures:
+                    future.result()
+                    summary.generated += 1
+
+        for cache_path, dest_path, digest in placements:
+            existed = os.path.exists(dest_path)
+            if existed and (os.path.samefile(cache_path, dest_path) or same_content(cache_path, dest_path)):
+                summary.unchanged.append(dest_path)
+            else:
+                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+                transfer_file(cache_path, dest_path, "hardlink")
+                (summary.modified if existed else summary.added).append(dest_path)
+            if manifest is not None:
+                manifest.record(f"image:{dest_path}", digest, dest_path)
+        return summary
+
+    # Changes whenever an image's dimensions or variants change, rendered HTML that
+    # depends on the catalog has to be invalidated with it
+    def version(self):
+        return hash_strings(*[f"{url}={info.width}x{info.height}:{info.srcset()}" for url, info in sorted(self.images.items())])
+
+
+def enable(dir_path_static, dir_path_public, cache_dir, index_path):
+    global active
+    active = ImageCatalog(dir_path_static, dir_path_public, cache_dir, index_path)
+    return active
+
+
+def disable():
+    global active
+    active = None
@@ -0,0 +1,111 @@
+import os
+import posixpath
+from urllib.parse import unquote
+
+from collector import BlockReplay, Collector
+from depgraph import EXTERNAL_PREFIXES
+from references import REFERENCE_TYPES
+
+# The link checker of the running build, None unless --check-links was passed. Pages feed it
+# the link and image TextNodes their blocks are parsed into while they are generated. Like
+# search, this module is imported by markdown_blocks and can't import the modules built on it.
+active = None
+
+
+# Paths under the public directory, relative and with "/" separators, that a reference to url
+# from the page at page_url may be served from. None for external URLs.
+def reference_candidates(url, page_url):
+    if url.startswith(EXTERNAL_PREFIXES) or url == "":
+        return None
+    url = unquote(url.split("#", 1)[0].split("?", 1)[0])
+    if url == "":
+        return None
+    if not url.startswith("/"):
+        url = posixpath.join(posixpath.dirname(page_url) + "/", url)
+    rel = posixpath.normpath(url).lstrip("/")
+    if rel in ("", "."):
+        return ["index.html"]
+    return [rel, rel + "/index.html", rel + ".html"]
+
+
+# Returns the 1-based number of the first line below line number after that references url,
+# preferring markdown link syntax, or None when the url can't be found
+def find_line(lines, url, after=0):
+    for needle in (f"]({url})", url):
+        for number in range(after + 1, len(lines) + 1):
+            if needle in lines[number - 1]:
+                return number
+    return None
+
+
+# The internal links and images of every page, checked once per build against an index of
+# every output. References are collected from the TextNodes of each page as it is parsed, and
+# kept in a cache for the pages an incremental build skips, so nothing is parsed twice.
+class LinkChecker(Collector):
+    def __init__(self, dir_path_public):
+        super().__init__(dir_path_public)
+        # markdown source -> {"url": page url, "references": [[type, url], ...]}
+        self.pages = {}
+        self.references = None
+        self.replay = BlockReplay()
+
+    # Records the links and images among the TextNodes of a block of the page being generated
+    def add_nodes(self, nodes):
+        self.replay.mark_parsed()
+        if self.references is None:
+            return
+        for node in nodes:
+            kind = REFERENCE_TYPES.get(node.text_type)
+            if kind is not None:
+                self.references.append([kind, node.url])
+
+    def converter(self, convert, render):
+        return self.replay.converter(convert, render, lambda: self.references)
+
+    def start_page(self):
+        self.references = []
+
+    def finish_page(self, from_path, url):
+        page = {"url": url, "references": self.references}
+        self.references = None
+        self.record(from_path, page)
+
+    # Checks every reference against the outputs given, one set lookup per candidate path.
+    # Returns the broken ones as (source, error) pairs like failed pages, the source being
+    # "path:line". Lines are only looked up for broken references, reading just their pages.
+    def check(self, outputs):
+        targets = set(os.path.relpath(output, self.dir_path_public).replace(os.sep, "/") for output in outputs)
+        broken = []
+        for from_path, page in sorted(self.pages.items()):
+            missing = []
+            for kind, url in page["references"]:
+                candidates = reference_candidates(url, page["url"])
+                if candidates is not None and not any(candidate in targets for candidate in candidates):
+                    missing.append((kind, url))
+            if not missing:
+                continue
+            with open(from_path, "r") as file:
+                lines = file.read().split("\n")
+            # The same URL found twice on a page is reported at both lines
+            found = {}
+            for kind, url in missing:
+                line = find_line(lines, url, found.get(url, 0))
+                if line is not None:
+                    found[url] = line
+                source = from_path if line is None else f"{from_path}:{line}"
+                broken.append((source, f"broken {kind} {url}"))
+        return broken
+
+    def __repr__(self):
+        return f"LinkChecker({len(self.pages)} pages, {sum(len(page['references']) for page in self.pages.values())} references)"
+
+
+def enable(dir_path_public):
+    global active
+    active = LinkChecker(dir_path_public)
+    return active
+
+
+def disable():
+    global active
+    active = None
@@ -0,0 +1,119 @@
+import os
+import re
+
+import sitemap
+import writer
+from htmlnode import LeafNode, ParentNode
+from manifest import hash_strings
+from template import load_template
+
+# Number of pages linked from each listing page
+LISTING_PAGE_SIZE = 10
+
+
+# Letters and digits of any script are kept, so tags such as "été" get a readable slug too
+def slugify(text):
+    return re.sub(r"[\W_]+", "-", text.lower()).strip("-")
+
+
+# URL slug of every tag. Tags whose slugs clash ("C" and "C++" are both "c") or that have no
+# slug at all ("++") get a suffix from a hash of the tag, so every tag gets a listing of its
+# own. The first clashing tag in sorted order keeps the plain slug.
+def tag_slugs(tags):
+    slugs = {}
+    taken = set()
+    for tag in sorted(tags):
+        slug = slugify(tag)
+        if slug == "" or slug in taken:
+            suffix = hash_strings(tag)[:8]
+            slug = f"{slug}-{suffix}" if slug else suffix
+        taken.add(slug)
+        slugs[tag] = slug
+    return slugs
+
+
+# URL of page number n of a listing whose first page is at base_url
+def listing_url(base_url, number):
+    if number == 1:
+        return base_url
+    return f"{base_url}page/{number}/"
+
+
+def listing_to_html_node(pages, number, page_count, base_url):
+    items = []
+    for page in pages:
+        children = [LeafNode("a", page.title, {"href": page.url})]
+        if page.date:
+            children.append(LeafNode(None, f" {page.date}"))
+        children.append(LeafNode(None, f" ({page.word_count} words)"))
+        items.append(ParentNode("li", children))
+    children = [ParentNode("ul", items)] if items else []
+
+    links = []
+    if number > 1:
+        links.append(LeafNode("a", "Newer posts", {"href": listing_url(base_url, number - 1)}))
+    if number < page_count:
+        if links:
+            links.append(LeafNode(None, " "))
+        links.append(LeafNode("a", "Older posts", {"href": listing_url(base_url, number + 1)}))
+    if links:
+        children.append(ParentNode("p", links))
+    return ParentNode("div", children)
+
+
+# Writes the paginated listing of pages at base_url (e.g. "/blog/") under dir_path_public
+# and returns the paths written. With a manifest, a listing page is only rewritten when the
+# entries it shows or the template changed, so editing one post rewrites only the pages listing it.
+def generate_listing(title, pages, base_url, template_path, dir_path_public, manifest=None, page_size=LISTING_PAGE_SIZE):
+    template = load_template(template_path)
+    page_count = max(1, (len(pages) + page_size - 1) // page_size)
+    written = []
+    for number in range(1, page_count + 1):
+        url = listing_url(base_url, number)
+        dest_path = os.path.join(dir_path_public, *url.strip("/").split("/"), "index.html")
+        page_title = title if number == 1 else f"{title} - page {number}"
+        shown = pages[(number - 1) * page_size:number * page_size]
+        html = listing_to_html_node(shown, number, page_count, base_url).to_html()
+
+        source = f"listing:{url}"
+        if sitemap.active is not None:
+            sitemap.active.add_listing(url)
+        full_html_page = template.render({"Title": page_title, "Content": html})
+        if manifest is not None:
+            digest = hash_strings(full_html_page)
+            manifest.record(source, digest, dest_path)
+            if manifest.is_unchanged(source, digest, dest_path):
+                continue
+
+        print(f"Generating listing {url} -> {dest_path}")
+        if writer.active is not None:
+            writer.active.write(dest_path, full_html_page, source)
+        else:
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            with open(dest_path, "w") as file:
+                file.write(full_html_page)
+        written.append(dest_path)
+    return written
+
+
+# Generates a listing for each section (e.g. "blog") plus one listing per tag under /tags/.
+# A section that already has its own index page in the content tree keeps it.
+def generate_listings(index, sections, template_path, dir_path_public, manifest=None, page_size=LISTING_PAGE_SIZE):
+    content_urls = set(page.url for page in index.pages)
+    written = []
+    for section in sections:
+        section = section.strip("/")
+        if f"/{section}/" in content_urls:
+            print(f"Skipping listing /{section}/, the content tree already has a page there")
+            continue
+        title = section.replace("-", " ").replace("/", " / ").title()
+        written += generate_listing(
+            title, index.section(section), f"/{section}/", template_path, dir_path_public, manifest, page_size
+        )
+    tags = index.tags()
+    slugs = tag_slugs(tags)
+    for tag, pages in tags.items():
+        written += generate_listing(
+            f"Tagged {tag}", pages, f"/tags/{slugs[tag]}/", template_path, dir_path_public, manifest, page_size
+        )
+    return written
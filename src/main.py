@@ -1,24 +1,511 @@
+import argparse
+import json
 import os
 import shutil
 
-from copystatic import copy_files_recursive
+from compress import ENCODINGS, compress_build_outputs
+from copystatic import TRANSFER_MODES, sync_files
 from markdown_blocks import *
 from htmlnode import *
-from generation import generate_page, generate_pages_recursive
+from contentindex import ContentIndex
+from depgraph import DependencyGraph
+from discovery import TreeSnapshot, scan_tree
+from generation import find_pages, generate_page, generate_pages_recursive, index_pages
+from listings import LISTING_PAGE_SIZE, generate_listings
+from manifest import Manifest, write_changes
+from shards import find_shards, in_shard, merge_shards, parse_shard, read_shard_pages, shard_dirs
+import blockcache
+import images
+import linkcheck
+import profiler
+import search
+import sitemap
+import template
+import writer
+from serve import serve
 
 
 dir_path_static = "./static"
 dir_path_public = "./public"
+dir_path_content = "./content"
+template_path = "./template.html"
+dir_path_cache = "./.cache"
+image_cache_dir = os.path.join(dir_path_cache, "images")
+dir_path_shards = "./shards"
 
 
-def main():
-    print("Deleting public directory...")
-    if os.path.exists(dir_path_public):
-        shutil.rmtree(dir_path_public)
+# Where a build writes its outputs and keeps its state between builds. A shard build gets the
+# public and cache directories of its own under the shards directory, so shards can be built
+# side by side on one machine as well as on separate ones. The resized image cache is shared,
+# its files are named after their content and written atomically.
+class BuildPaths():
+    def __init__(self, dir_path_public, dir_path_cache):
+        self.dir_path_public = dir_path_public
+        self.dir_path_cache = dir_path_cache
+        self.manifest_path = os.path.join(dir_path_cache, "manifest.json")
+        self.profile_path = os.path.join(dir_path_cache, "profile.json")
+        self.block_cache_path = os.path.join(dir_path_cache, "blocks.json")
+        self.content_index_path = os.path.join(dir_path_cache, "content_index.json")
+        self.depgraph_path = os.path.join(dir_path_cache, "depgraph.json")
+        self.changes_path = os.path.join(dir_path_cache, "changes.json")
+        self.options_path = os.path.join(dir_path_cache, "options.json")
+        self.image_index_path = os.path.join(dir_path_cache, "images.json")
+        self.content_tree_path = os.path.join(dir_path_cache, "tree-content.json")
+        self.static_tree_path = os.path.join(dir_path_cache, "tree-static.json")
+        self.pages_path = os.path.join(dir_path_cache, "pages.json")
+        self.search_index_path = os.path.join(dir_path_cache, "search.json")
+        self.links_path = os.path.join(dir_path_cache, "links.json")
 
+
+# The paths of the build of shard (index, count), or of the whole site when shard is None
+def build_paths(shard=None):
+    if shard is None:
+        return BuildPaths(dir_path_public, dir_path_cache)
+    return BuildPaths(*shard_dirs(dir_path_shards, *shard))
+
+
+# Compares the options that change every page's output with the ones saved by the last
+# build. Returns True when they differ.
+def options_changed(path, options):
+    if not os.path.exists(path):
+        return False
+    with open(path, "r") as file:
+        return json.load(file) != options
+
+
+# Saved together with the manifest and the dependency graph at the end of a build, so a build
+# that stops halfway leaves the options of the outputs the graph describes
+def save_options(path, options):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(options, file)
+    os.replace(tmp_path, path)
+
+
+# What the stages of a build produced, for the stages after them and the final report
+class BuildResult():
+    def __init__(self):
+        # SyncSummary of the static files, or of the shard outputs for merge
+        self.summary = None
+        self.images = None
+        self.compressed = None
+        self.failures = []
+        self.broken = []
+        self.removed = []
+
+
+# Parses the command line and returns (args, paths). Flags that depend on the paths of the
+# build, such as --write-if-changed given without a file, are resolved here once --shard is known.
+def parse_arguments(argv=None):
+    defaults = build_paths()
+    parser = argparse.ArgumentParser(description="Build the static site into the public directory.")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        choices=["build", "serve", "why-rebuild", "merge"],
+        default="build",
+        help="build the site once, build it and then serve it while rebuilding on changes, "
+        "explain why a page was regenerated by the last build, or merge the shard builds "
+        f"in {dir_path_shards} into the public directory (default: build)",
+    )
+    parser.add_argument(
+        "page",
+        nargs="?",
+        help="for why-rebuild: the page, given as its output path, markdown source or URL",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only rebuild pages and static files that changed since the last build",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="number of processes used to generate pages, 0 uses every CPU (default: 1)",
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        metavar="I/N",
+        help=f"build only shard I of N, the pages and static files whose path hashes to I, into "
+        f"{dir_path_shards}/I-of-N; listings, the sitemap, the search index and the link check are "
+        "produced by the merge command once every shard is built",
+    )
+    parser.add_argument(
+        "--link",
+        choices=sorted(TRANSFER_MODES),
+        default="copy",
+        help="how static files are put in public, falling back to copy when unsupported (default: copy)",
+    )
+    parser.add_argument(
+        "--verify-hash",
+        action="store_true",
+        help="compare file contents, not just size and mtime, before skipping a static file",
+    )
+    parser.add_argument(
+        "--writer-threads",
+        type=int,
+        default=0,
+        help="write pages from a pool of this many background threads, atomically and only when "
+        "their content changed; 0 writes each page as soon as it is rendered (default: 0)",
+    )
+    parser.add_argument(
+        "--write-if-changed",
+        nargs="?",
+        const=True,
+        metavar="CHANGES",
+        help="keep the public directory and only write outputs whose content changed, then list what was "
+        f"added, modified and removed as JSON for deploy tooling (default: {defaults.changes_path}, "
+        "or the shard's own with --shard)",
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="remove the formatting whitespace of the page template from every page",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="write precompressed " + " and ".join(ENCODINGS) + " siblings of changed text outputs for the web server"
+        + ("" if ".br" in ENCODINGS else " (.br needs the brotli module)"),
+    )
+    parser.add_argument(
+        "--images",
+        action="store_true",
+        help="render images with width, height and srcset; with Pillow installed, also generate resized "
+        f"WebP variants, cached in {image_cache_dir}",
+    )
+    parser.add_argument(
+        "--site-url",
+        metavar="URL",
+        help="absolute URL the site is served from, e.g. https://example.com; writes sitemap.xml "
+        "(split under a sitemap index past 50000 URLs) plus feed.xml (RSS) and atom.xml with the newest dated pages",
+    )
+    parser.add_argument(
+        "--feed-author",
+        metavar="NAME",
+        help="author of the site named in atom.xml (default: the author in the home page's front matter, "
+        "or the site's title); pages with an author in their front matter name it in their own entry",
+    )
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help=f"build a search index from the parsed pages, written as JSON shards under public/{search.SEARCH_DIR}/ "
+        "that the browser loads per term prefix; only shards whose terms changed are rewritten",
+    )
+    parser.add_argument(
+        "--check-links",
+        action="store_true",
+        help="check every internal link and image of the content against the outputs of the build and "
+        "fail the build on broken ones, reported with their file and line",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=True,
+        metavar="REPORT",
+        help=f"time every build stage and block type, write a JSON report (default: {defaults.profile_path}, "
+        "or the shard's own with --shard) and print the slowest pages",
+    )
+    parser.add_argument(
+        "--block-cache",
+        choices=["memory", "disk"],
+        help=f"render repeated markdown blocks once, keeping the cache in memory or also in {defaults.block_cache_path}",
+    )
+    parser.add_argument(
+        "--block-cache-size",
+        type=int,
+        default=10000,
+        help="maximum number of blocks kept in the block cache (default: 10000)",
+    )
+    parser.add_argument(
+        "--listing",
+        action="append",
+        default=[],
+        metavar="SECTION",
+        help="generate paginated listing pages for a content directory such as blog, plus per-tag pages (repeatable)",
+    )
+    parser.add_argument(
+        "--listing-page-size",
+        type=int,
+        default=LISTING_PAGE_SIZE,
+        help=f"pages linked from each listing page (default: {LISTING_PAGE_SIZE})",
+    )
+    parser.add_argument("--port", type=int, default=8888, help="port used by serve (default: 8888)")
+    args = parser.parse_args(argv)
+    if args.shard is not None and args.command != "build":
+        parser.error(f"--shard only applies to build, not {args.command}")
+    if args.command == "why-rebuild" and args.page is None:
+        parser.error("why-rebuild needs a page")
+    args.workers = args.workers or os.cpu_count() or 1
+    paths = build_paths(args.shard)
+    # Flags given without a file write to the build's own cache directory
+    if args.write_if_changed is True:
+        args.write_if_changed = paths.changes_path
+    if args.profile is True:
+        args.profile = paths.profile_path
+    return args, paths
+
+
+# Turns on the optional stages the flags ask for
+def enable_features(args, paths):
+    if args.profile:
+        profiler.enable()
+    if args.block_cache:
+        blockcache.enable(args.block_cache_size)
+    if args.writer_threads > 0 or args.write_if_changed or args.compress:
+        writer.enable(args.writer_threads)
+    if args.site_url:
+        sitemap.enable(paths.dir_path_public, args.site_url, args.feed_author)
+    if args.search:
+        search.enable(paths.dir_path_public)
+    if args.check_links:
+        linkcheck.enable(paths.dir_path_public)
+    # A build without the sitemap or the search index doesn't keep its cache up to date, so the
+    # next build that has them reads every page again rather than trusting an outdated cache
+    for enabled, path in ((args.site_url, paths.pages_path), (args.search, paths.search_index_path), (args.check_links, paths.links_path)):
+        if not enabled and os.path.exists(path):
+            os.remove(path)
+    template.minify = args.minify
+
+
+# Loads what the last build left for an incremental one, or clears the public directory
+# for a full one
+def load_state(args, paths, manifest, graph, options):
+    if args.incremental:
+        # The manifest is still loaded when the options changed so stale outputs are removed,
+        # without the dependency graph every page counts as changed
+        manifest.load()
+        if sitemap.active is not None:
+            sitemap.active.load(paths.pages_path)
+        if search.active is not None:
+            search.active.load(paths.search_index_path)
+        if linkcheck.active is not None:
+            linkcheck.active.load(paths.links_path)
+        if options_changed(paths.options_path, options):
+            print("Build options changed since the last build, regenerating every page...")
+            # Pages are rewritten from here on, a build that stops halfway must not leave a
+            # graph that vouches for them to the next one
+            if os.path.exists(paths.depgraph_path):
+                os.remove(paths.depgraph_path)
+        else:
+            graph.load()
+    elif args.write_if_changed:
+        print("Keeping public directory, only changed files will be written...")
+    else:
+        print("Deleting public directory...")
+        if os.path.exists(paths.dir_path_public):
+            shutil.rmtree(paths.dir_path_public)
+
+
+# Snapshots of the input trees, only directories that changed since the last build are
+# listed again. Inputs they show unchanged keep the fingerprint the graph recorded for them.
+# Returns (content tree, static tree).
+def scan_inputs(paths, graph):
+    with profiler.stage("scan_tree"):
+        previous_content = TreeSnapshot.load(paths.content_tree_path, dir_path_content)
+        previous_static = TreeSnapshot.load(paths.static_tree_path, dir_path_static)
+        content_tree = scan_tree(dir_path_content, previous_content)
+        static_tree = scan_tree(dir_path_static, previous_static)
+        if graph.pages and previous_content is not None and previous_static is not None:
+            graph.reuse(content_tree.unchanged_since(previous_content) + static_tree.unchanged_since(previous_static))
+    return content_tree, static_tree
+
+
+# Copies the outputs of every shard build into the public directory and hands the collectors
+# what the shards' pages contribute to the site-wide artifacts
+def merge_outputs(args, paths, manifest, result):
+    print(f"Copying the shard outputs in {dir_path_shards} to public directory...")
+    with profiler.stage("merge_shards"):
+        result.summary = merge_shards(dir_path_shards, paths.dir_path_public, manifest, args.link, bool(args.write_if_changed))
+    print(f"Shard outputs: {result.summary}")
+    for collector, path in ((sitemap.active, paths.pages_path), (search.active, paths.search_index_path), (linkcheck.active, paths.links_path)):
+        if collector is not None:
+            for pages in read_shard_pages(dir_path_shards, os.path.basename(path)):
+                collector.merge(pages)
+
+
+# Syncs the static files, builds the image catalog and generates the pages, only the ones
+# of the shard for a --shard build
+def build_outputs(args, paths, manifest, graph, content_tree, static_tree, result):
     print("Copying static files to public directory...")
-    copy_files_recursive(dir_path_static, dir_path_public)
+    with profiler.stage("sync_files"):
+        static_files = static_tree
+        if args.shard is not None:
+            static_files = static_tree.subset(lambda rel: in_shard(rel, args.shard))
+        result.summary = sync_files(
+            dir_path_static, paths.dir_path_public, manifest, args.link, args.verify_hash,
+            write_if_changed=bool(args.write_if_changed), snapshot=static_files,
+        )
+    print(f"Static files: {result.summary}")
+
+    if args.images:
+        if images.Image is None:
+            print("Pillow is not installed, images get their dimensions but no resized variants")
+        with profiler.stage("images"):
+            catalog = images.enable(dir_path_static, paths.dir_path_public, image_cache_dir, paths.image_index_path)
+            result.images = catalog.build(manifest, args.workers, args.shard)
+        print(f"Images: {result.images}")
+    # Loaded after the image catalog is built, the catalog is part of the cache version
+    if args.block_cache == "disk":
+        blockcache.active.load(paths.block_cache_path)
+
+    result.failures = generate_pages_recursive(
+        dir_path_content, template_path, paths.dir_path_public, manifest, args.workers, graph, content_tree, args.shard
+    )
+
+
+# The listings, sitemap, search index and link check, which need every page of the site.
+# A shard only saves what its own pages contribute and leaves the rest to the merge.
+def build_site_artifacts(args, paths, manifest, content_tree, result):
+    if args.listing and args.shard is None:
+        with profiler.stage("listings"):
+            index = ContentIndex().build(find_pages(dir_path_content, paths.dir_path_public, content_tree), paths.dir_path_public, paths.content_index_path)
+            generate_listings(index, args.listing, template_path, paths.dir_path_public, manifest, args.listing_page_size)
+
+    if sitemap.active is not None:
+        with profiler.stage("sitemap"):
+            sitemap.active.update(find_pages(dir_path_content, paths.dir_path_public, content_tree, args.shard))
+            if args.shard is None:
+                sitemap.active.write(manifest)
+            sitemap.active.save(paths.pages_path)
+        print(f"Sitemap and feeds: {sitemap.active}")
+
+    if search.active is not None or linkcheck.active is not None:
+        # Pages the search index or the link checker have no entry for yet are parsed once for both
+        pages = find_pages(dir_path_content, paths.dir_path_public, content_tree, args.shard)
+        missing = set()
+        for collector in (search.active, linkcheck.active):
+            if collector is not None:
+                missing.update(collector.update(pages))
+        index_pages(sorted(missing), paths.dir_path_public)
+
+    if search.active is not None:
+        with profiler.stage("search"):
+            written = search.active.write(manifest) if args.shard is None else []
+            search.active.save(paths.search_index_path)
+        print(f"Search index: {search.active}, {len(written)} file(s) written")
+
+    if linkcheck.active is not None:
+        with profiler.stage("check_links"):
+            if args.shard is None:
+                result.broken = linkcheck.active.check(entry["output"] for entry in manifest.current.values())
+            linkcheck.active.save(paths.links_path)
+        print(f"Link check: {linkcheck.active}, {len(result.broken)} broken")
+
+
+# Waits for the pending writes, precompresses what changed and removes stale outputs
+def finish_outputs(args, paths, manifest, result):
+    if writer.active is not None:
+        result.failures += writer.active.flush()
+
+    if args.compress:
+        with profiler.stage("compress"):
+            changed = writer.active.written + result.summary.added + result.summary.modified
+            result.compressed = compress_build_outputs(manifest, changed, workers=max(args.workers, 4))
+        print(f"Precompressed outputs: {result.compressed}")
+
+    result.removed = manifest.remove_stale()
+    if args.write_if_changed:
+        result.removed += manifest.remove_untracked(paths.dir_path_public)
+    for path in result.removed:
+        print(f"Removed stale output {path}")
+
+
+# Saves what the next incremental build starts from
+def save_state(args, paths, manifest, graph, options, content_tree, static_tree):
+    manifest.save()
+    graph.save()
+    save_options(paths.options_path, options)
+    content_tree.save(paths.content_tree_path)
+    static_tree.save(paths.static_tree_path)
+    if args.block_cache == "disk":
+        blockcache.active.save(paths.block_cache_path)
+
+
+# Prints the summaries of the build, writes the changes file for --write-if-changed and the
+# profile report, and lists the failed pages and broken references
+def report_build(args, paths, manifest, result):
+    if writer.active is not None:
+        print(f"Output writer: {writer.active}")
+        if args.write_if_changed:
+            added_pages = set(writer.active.added)
+            added = writer.active.added + result.summary.added
+            modified = [path for path in writer.active.written if path not in added_pages] + result.summary.modified
+            for extra in (result.compressed, result.images):
+                if extra is not None:
+                    added += extra.added
+                    modified += extra.modified
+            outputs = set(entry["output"] for entry in manifest.current.values())
+            changes = write_changes(
+                args.write_if_changed, paths.dir_path_public, added, modified, result.removed, len(outputs) - len(added) - len(modified)
+            )
+            print(
+                f"Changes: {len(changes['added'])} added, {len(changes['modified'])} modified, "
+                f"{len(changes['removed'])} removed, {changes['unchanged']} unchanged; written to {args.write_if_changed}"
+            )
+        writer.disable()
+
+    if blockcache.active is not None:
+        print(f"Block cache: {blockcache.active}")
+
+    if profiler.active is not None:
+        profiler.active.write_report(args.profile)
+        print(profiler.active.format_table())
+        print(f"Profile report written to {args.profile}")
+        profiler.disable()
+
+    if result.failures:
+        print(f"{len(result.failures)} page(s) failed to generate:")
+        for from_path, error in result.failures:
+            print(f" * {from_path}: {error}")
+    if result.broken:
+        print(f"{len(result.broken)} broken reference(s):")
+        for source, error in result.broken:
+            print(f" * {source}: {error}")
+
+
+def main(argv=None):
+    args, paths = parse_arguments(argv)
+    if args.shard is not None:
+        print(f"Building shard {args.shard[0]}/{args.shard[1]} into {paths.dir_path_public}...")
+    if args.command == "merge":
+        # Fails before the public directory is touched when a shard is missing
+        print(f"Merging {len(find_shards(dir_path_shards))} shard builds")
+
+    graph = DependencyGraph(paths.depgraph_path, dir_path_static)
+    if args.command == "why-rebuild":
+        graph.load()
+        print("\n".join(graph.explain(args.page, paths.dir_path_public)))
+        return
+
+    enable_features(args, paths)
+    manifest = Manifest(paths.manifest_path)
+    options = {"minify": args.minify, "images": args.images}
+    load_state(args, paths, manifest, graph, options)
+    content_tree, static_tree = scan_inputs(paths, graph)
+
+    result = BuildResult()
+    if args.command == "merge":
+        merge_outputs(args, paths, manifest, result)
+    else:
+        build_outputs(args, paths, manifest, graph, content_tree, static_tree, result)
+    build_site_artifacts(args, paths, manifest, content_tree, result)
+    finish_outputs(args, paths, manifest, result)
+    save_state(args, paths, manifest, graph, options, content_tree, static_tree)
+    report_build(args, paths, manifest, result)
+
+    if args.command == "serve":
+        serve(
+            dir_path_content, dir_path_static, template_path, paths.dir_path_public, args.port, link=args.link,
+            listings=args.listing, listing_page_size=args.listing_page_size,
+            content_index_path=paths.content_index_path, manifest_path=paths.manifest_path,
+        )
+    elif result.failures or result.broken:
+        raise SystemExit(1)
 
-    generate_pages_recursive("content", "template.html", "public")
 
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
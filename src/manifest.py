@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+
+# Size of the chunks read when hashing files, so large static assets are never loaded whole
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+# Returns the sha256 hex digest of the file at path
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Returns the sha256 hex digest of one or more strings joined together
+def hash_strings(*values):
+    digest = hashlib.sha256()
+    for value in values:
+        digest.update(value.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+# Keeps track of the inputs that went into the last build and the outputs they produced.
+# Each entry maps a source path to {"hash": <input digest>, "output": <output path>}.
+# Entries loaded from disk describe the previous build, entries recorded during this build
+# describe the current one; anything left over from the previous build is stale.
+class Manifest():
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.current = {}
+        self.digests = {}
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r") as file:
+            data = json.load(file)
+        self.entries = data.get("entries", {})
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as file:
+            # json.dumps runs the C encoder, json.dump and indent fall back to the pure Python one
+            file.write(json.dumps({"entries": self.current}, sort_keys=True))
+        os.replace(tmp_path, self.path)
+
+    # Hashes a file once per build, shared inputs such as the template are only read once
+    def digest(self, path):
+        if path not in self.digests:
+            self.digests[path] = hash_file(path)
+        return self.digests[path]
+
+    def is_unchanged(self, source, digest, output):
+        entry = self.entries.get(source)
+        if entry is None:
+            return False
+        return entry["hash"] == digest and entry["output"] == output and os.path.exists(output)
+
+    def record(self, source, digest, output):
+        self.current[source] = {"hash": digest, "output": output}
+
+    # Deletes outputs whose sources were not seen during this build and returns their paths
+    def remove_stale(self):
+        live_outputs = set(entry["output"] for entry in self.current.values())
+        removed = []
+        for source, entry in self.entries.items():
+            if source in self.current or entry["output"] in live_outputs:
+                continue
+            if os.path.isfile(entry["output"]):
+                os.remove(entry["output"])
+                removed.append(entry["output"])
+        return removed
+
+    # Deletes files under dir_path that no source produced during this build, such as
+    # leftovers of a previous build that was not recorded, and returns their paths
+    def remove_untracked(self, dir_path):
+        live_outputs = set(os.path.normpath(entry["output"]) for entry in self.current.values())
+        removed = []
+        for root, dir_names, file_names in os.walk(dir_path, topdown=False):
+            for file_name in file_names:
+                path = os.path.join(root, file_name)
+                if os.path.normpath(path) not in live_outputs:
+                    os.remove(path)
+                    removed.append(path)
+            if root != dir_path and not os.listdir(root):
+                os.rmdir(root)
+        return removed
+
+
+# Writes the changes a build made under dir_path_public as JSON, for deploy tooling: added and
+# modified files need uploading, removed ones deleting, unchanged ones (counted) can be left alone.
+# Paths are relative to dir_path_public and use forward slashes.
+def write_changes(path, dir_path_public, added, modified, removed, unchanged):
+    def relative(paths):
+        return sorted(os.path.relpath(path, dir_path_public).replace(os.sep, "/") for path in paths)
+
+    changes = {
+        "root": dir_path_public,
+        "added": relative(added),
+        "modified": relative(modified),
+        "removed": relative(removed),
+        "unchanged": unchanged,
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(changes, file, indent=1)
+    os.replace(tmp_path, path)
+    return changes
@@ -1,3 +1,10 @@
+import time
+
+import blockcache
+import linkcheck
+import profiler
+import references
+import search
 from htmlnode import ParentNode
 from convertnodes import text_to_textnodes, text_node_to_html_node
 # 
@@ -8,6 +15,9 @@ block_type_quote = "quote"
 block_type_olist = "ordered_list"
 block_type_ulist = "unordered_list"
 
+# Amount of text read at a time by iter_markdown_blocks
+BLOCK_READ_SIZE = 64 * 1024
+
 def markdown_to_blocks(markdown):
     blocks = markdown.split("\n\n")
     filtered_blocks = []
@@ -18,6 +28,27 @@ def markdown_to_blocks(markdown):
         filtered_blocks.append(block)
     return filtered_blocks
 
+# Lazily reads markdown from an open file and yields the same blocks as
+# markdown_to_blocks(file.read()), holding at most one block and one read in memory
+def iter_markdown_blocks(file, read_size=BLOCK_READ_SIZE):
+    buffer = ""
+    for chunk in iter(lambda: file.read(read_size), ""):
+        # A separator can straddle the previous read, so look one character back
+        search_from = max(len(buffer) - 1, 0)
+        buffer += chunk
+        start = 0
+        while True:
+            end = buffer.find("\n\n", max(start, search_from))
+            if end == -1:
+                break
+            block = buffer[start:end]
+            if block != "":
+                yield block.strip()
+            start = end + 2
+        buffer = buffer[start:]
+    if buffer != "":
+        yield buffer.strip()
+
 def block_to_block_type(block):
     lines = block.split("\n")
 
@@ -49,14 +80,50 @@ def block_to_block_type(block):
         return block_type_olist
     return block_type_paragraph
 
+# Streams the HTML for markdown read lazily from an open file to write, producing the same
+# output as markdown_to_html_node(file.read()).to_html() one block at a time
+def write_markdown_html(file, write):
+    convert = block_converter()
+    write("<div>")
+    for block in iter_markdown_blocks(file):
+        convert(block).write_html(write)
+    write("</div>")
+
 def markdown_to_html_node(markdown):
     blocks = markdown_to_blocks(markdown)
+    convert = block_converter()
     children = []
     for block in blocks:
-        html_node = block_to_html_node(block)
+        html_node = convert(block)
         children.append(html_node)
     return ParentNode("div", children, None)
 
+# Returns the function used to convert each block of a page, going through the block
+# cache, the search index, the link checker, the reference collector and the profiler when
+# they are turned on
+def block_converter():
+    convert = block_to_html_node
+    if blockcache.active is not None:
+        convert = blockcache.active.converter(convert)
+        if search.active is not None:
+            convert = search.active.converter(convert, block_to_html_node)
+        if linkcheck.active is not None:
+            convert = linkcheck.active.converter(convert, block_to_html_node)
+        if references.active is not None:
+            convert = references.active.converter(convert, block_to_html_node)
+    if profiler.active is not None:
+        convert = profiled(convert)
+    return convert
+
+# Wraps a block converter so its wall time is recorded under the block's type in the active profiler
+def profiled(convert):
+    def profiled_convert(block):
+        start = time.perf_counter()
+        html_node = convert(block)
+        profiler.active.add_block(block_to_block_type(block), time.perf_counter() - start)
+        return html_node
+    return profiled_convert
+
 
 def block_to_html_node(block):
     block_type = block_to_block_type(block)
@@ -77,6 +144,12 @@ def block_to_html_node(block):
 
 def text_to_children(text):
     text_nodes = text_to_textnodes(text)
+    if search.active is not None:
+        search.active.add_nodes(text_nodes)
+    if linkcheck.active is not None:
+        linkcheck.active.add_nodes(text_nodes)
+    if references.active is not None:
+        references.active.add_nodes(text_nodes)
     children = []
     for text_node in text_nodes:
         html_node = text_node_to_html_node(text_node)
@@ -146,9 +219,15 @@ def quote_to_html_node(block):
     return ParentNode("blockquote", children)
 
 def extract_title(markdown):
-    split_lines = markdown.split("\n")
-    
-    for line in split_lines:
+    return title_from_lines(markdown.split("\n"))
+
+# Reads an open markdown file line by line and stops at the first h1 heading, so
+# the title of a huge document is found without loading it
+def extract_title_from_file(file):
+    return title_from_lines(line[:-1] if line.endswith("\n") else line for line in file)
+
+def title_from_lines(lines):
+    for line in lines:
         if len(line) > 0:
             if line.strip().startswith("#") and not line.startswith("##"):
                 return line.strip().lstrip("#").strip()
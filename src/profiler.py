@@ -0,0 +1,96 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+
+# The profiler of the running build, None unless --profile was passed.
+# Instrumented code checks this before measuring anything, so it costs nothing when off.
+active = None
+
+
+# Wall time and call counts per build stage, per markdown block type and per page
+class Profiler():
+    def __init__(self):
+        self.stages = {}
+        self.blocks = {}
+        self.pages = {}
+
+    def add(self, table, name, seconds, calls=1):
+        entry = table.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += calls
+
+    def add_stage(self, name, seconds):
+        self.add(self.stages, name, seconds)
+
+    def add_block(self, block_type, seconds):
+        self.add(self.blocks, block_type, seconds)
+
+    def add_page(self, path, seconds):
+        self.pages[path] = seconds
+
+    # Adds the measurements of another profiler, e.g. one returned by a worker process
+    def merge(self, data):
+        for name, entry in data["stages"].items():
+            self.add(self.stages, name, entry["seconds"], entry["calls"])
+        for name, entry in data["blocks"].items():
+            self.add(self.blocks, name, entry["seconds"], entry["calls"])
+        for page in data["pages"]:
+            self.pages[page["path"]] = page["seconds"]
+
+    def slowest_pages(self, limit=None):
+        ranked = sorted(self.pages.items(), key=lambda item: item[1], reverse=True)
+        return ranked if limit is None else ranked[:limit]
+
+    def to_dict(self):
+        def table(entries):
+            return {
+                name: {"seconds": seconds, "calls": calls}
+                for name, (seconds, calls) in sorted(entries.items(), key=lambda item: item[1][0], reverse=True)
+            }
+        return {
+            "stages": table(self.stages),
+            "blocks": table(self.blocks),
+            "pages": [{"path": path, "seconds": seconds} for path, seconds in self.slowest_pages()],
+        }
+
+    def write_report(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, indent=1)
+
+    def format_table(self, limit=10):
+        lines = []
+        for title, entries in (("stage", self.stages), ("block type", self.blocks)):
+            lines.append(f"{title:<40} {'seconds':>10} {'calls':>8}")
+            for name, (seconds, calls) in sorted(entries.items(), key=lambda item: item[1][0], reverse=True):
+                lines.append(f"{name:<40} {seconds:>10.4f} {calls:>8}")
+            lines.append("")
+        lines.append(f"{'slowest pages':<40} {'seconds':>10}")
+        for path, seconds in self.slowest_pages(limit):
+            lines.append(f"{path:<40} {seconds:>10.4f}")
+        return "\n".join(lines)
+
+
+def enable():
+    global active
+    active = Profiler()
+    return active
+
+
+def disable():
+    global active
+    active = None
+
+
+# Times the body of the with statement as one call of the named stage
+@contextmanager
+def stage(name):
+    if active is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        active.add_stage(name, time.perf_counter() - start)
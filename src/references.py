@@ -0,0 +1,59 @@
+from collector import BlockReplay, Collector
+from textnode import TextType
+
+# The reference collector of the running build, None unless pages are generated with a
+# dependency graph. Pages feed it the link and image TextNodes their blocks are parsed into
+# while they are generated, so the graph learns what a page references without reading it
+# again. Like linkcheck, this module is imported by markdown_blocks and can't import the
+# modules built on it.
+active = None
+
+REFERENCE_TYPES = {TextType.LINK: "link", TextType.IMAGE: "image"}
+
+
+# The links and images of every page generated by this build as [type, url] pairs, keyed by
+# markdown source. Nothing is cached between builds, the dependency graph records what they
+# resolve to.
+class ReferenceCollector(Collector):
+    def __init__(self):
+        super().__init__(None)
+        self.references = None
+        self.replay = BlockReplay()
+
+    # Records the links and images among the TextNodes of a block of the page being generated
+    def add_nodes(self, nodes):
+        self.replay.mark_parsed()
+        if self.references is None:
+            return
+        for node in nodes:
+            kind = REFERENCE_TYPES.get(node.text_type)
+            if kind is not None:
+                self.references.append([kind, node.url])
+
+    def converter(self, convert, render):
+        return self.replay.converter(convert, render, lambda: self.references)
+
+    def start_page(self):
+        self.references = []
+
+    def finish_page(self, from_path):
+        references, self.references = self.references, None
+        self.record(from_path, references)
+
+    # Returns the references of a page and forgets them
+    def take(self, from_path):
+        return self.pages.pop(from_path, [])
+
+    def __repr__(self):
+        return f"ReferenceCollector({len(self.pages)} pages)"
+
+
+def enable():
+    global active
+    active = ReferenceCollector()
+    return active
+
+
+def disable():
+    global active
+    active = None
@@ -0,0 +1,181 @@
+import json
+import os
+import re
+
+import writer
+from collector import BlockReplay, Collector
+
+# The search index of the running build, None unless --search was passed. Pages feed it the
+# TextNodes their blocks are parsed into while they are generated. Like blockcache, this module
+# is imported by markdown_blocks and can't import the modules built on it.
+active = None
+
+# Terms are sharded by their first characters, so the browser only fetches the shard of
+# each term typed, and a prefix search for "hobb" needs just the "ho" shard
+SHARD_PREFIX = 2
+
+# Directory of the index under the public directory
+SEARCH_DIR = "search"
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return WORD_PATTERN.findall(text.lower())
+
+
+def shard_key(term):
+    return term[:SHARD_PREFIX]
+
+
+# Inverted index of the site: every term with the pages it appears in and its word positions
+# there. The forward index of each page (term -> positions) is kept as well, so a page that
+# changes or goes away only touches the shards of the terms it had and has.
+class SearchIndex(Collector):
+    def __init__(self, dir_path_public):
+        super().__init__(dir_path_public)
+        # markdown source -> {"url", "title", "terms": {term: [positions]}}
+        self.pages = {}
+        # markdown source -> document id in the written index, stable across builds
+        self.ids = {}
+        # Shard keys whose terms or postings changed since the index was loaded, and whether
+        # the documents listed in docs.json did
+        self.dirty = set()
+        self.documents_changed = False
+        # Shard keys listed in docs.json
+        self.shards = []
+        self.words = None
+        self.replay = BlockReplay()
+
+    # Records the TextNodes of a block of the page being generated, as text_to_children parses them
+    def add_nodes(self, nodes):
+        self.replay.mark_parsed()
+        if self.words is None:
+            return
+        for node in nodes:
+            self.words.extend(tokenize(node.text))
+
+    def converter(self, convert, render):
+        return self.replay.converter(convert, render, lambda: self.words)
+
+    def start_page(self):
+        self.words = []
+
+    def finish_page(self, from_path, url, title):
+        terms = {}
+        for position, word in enumerate(self.words):
+            terms.setdefault(word, []).append(position)
+        self.words = None
+        self.record(from_path, {"url": url, "title": str(title), "terms": terms})
+
+    # Marks the shards of the terms whose postings differ from the page's previous entry
+    def put(self, from_path, page):
+        previous = self.pages.get(from_path)
+        if previous is not None and previous == page:
+            return
+        self.pages[from_path] = page
+        if previous is None or (previous["url"], previous["title"]) != (page["url"], page["title"]):
+            self.documents_changed = True
+        old_terms = previous["terms"] if previous is not None else {}
+        for term in set(page["terms"]) | set(old_terms):
+            if page["terms"].get(term) != old_terms.get(term):
+                self.dirty.add(shard_key(term))
+
+    def remove(self, from_path):
+        page = self.pages.pop(from_path)
+        self.ids.pop(from_path, None)
+        self.documents_changed = True
+        self.dirty.update(shard_key(term) for term in page["terms"])
+
+    # Gives new pages the lowest free document ids, existing pages keep theirs
+    def assign_ids(self):
+        used = set(self.ids.values())
+        next_id = 0
+        for from_path in sorted(self.pages):
+            if from_path in self.ids:
+                continue
+            while next_id in used:
+                next_id += 1
+            self.ids[from_path] = next_id
+            used.add(next_id)
+
+    def cache_key(self):
+        return {"public": self.dir_path_public, "prefix": SHARD_PREFIX}
+
+    def cache_state(self):
+        return {"ids": self.ids, "shards": self.shards}
+
+    def load_state(self, data):
+        self.ids = data["ids"]
+        self.shards = data["shards"]
+
+    # {shard key: {term: [[document id, first position, deltas...]]}} for the given shards
+    def postings(self, keys):
+        shards = {key: {} for key in keys}
+        for from_path, page in self.pages.items():
+            document = self.ids[from_path]
+            for term, positions in page["terms"].items():
+                shard = shards.get(shard_key(term))
+                if shard is None:
+                    continue
+                deltas = [positions[0]] + [b - a for a, b in zip(positions, positions[1:])]
+                shard.setdefault(term, []).append([document] + deltas)
+        for shard in shards.values():
+            for documents in shard.values():
+                documents.sort()
+        return shards
+
+    # Writes search/docs.json, listing the documents and shards, and search/<key>.json for every
+    # shard whose terms changed or that is missing on disk. Every file is recorded in the manifest
+    # so shards left without terms are removed as stale. Returns the paths written.
+    def write(self, manifest=None):
+        self.assign_ids()
+        directory = os.path.join(self.dir_path_public, SEARCH_DIR)
+        keys = sorted(set(shard_key(term) for page in self.pages.values() for term in page["terms"]))
+        pending = [key for key in keys if key in self.dirty or not os.path.exists(self.shard_path(key))]
+
+        written = []
+        for key, shard in self.postings(pending).items():
+            written.append(self.write_file(self.shard_path(key), shard))
+        docs_path = os.path.join(directory, "docs.json")
+        if self.documents_changed or keys != self.shards or not os.path.exists(docs_path):
+            documents = [None] * (max(self.ids.values()) + 1 if self.ids else 0)
+            for from_path, document in self.ids.items():
+                documents[document] = [self.pages[from_path]["url"], self.pages[from_path]["title"]]
+            written.append(self.write_file(docs_path, {"prefix": SHARD_PREFIX, "shards": keys, "docs": documents}))
+        self.dirty = set()
+        self.documents_changed = False
+        self.shards = keys
+
+        if manifest is not None:
+            for path in [docs_path] + [self.shard_path(key) for key in keys]:
+                manifest.record(f"search:{path}", None, path)
+        return written
+
+    def shard_path(self, key):
+        return os.path.join(self.dir_path_public, SEARCH_DIR, f"{key}.json")
+
+    def write_file(self, path, data):
+        content = json.dumps(data, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+        if writer.active is not None:
+            writer.active.write(path, content, path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as file:
+                file.write(content)
+        return path
+
+    def __repr__(self):
+        terms = set(term for page in self.pages.values() for term in page["terms"])
+        return f"SearchIndex({len(self.pages)} pages, {len(terms)} terms)"
+
+
+def enable(dir_path_public):
+    global active
+    active = SearchIndex(dir_path_public)
+    return active
+
+
+def disable():
+    global active
+    active = None
@@ -0,0 +1,205 @@
+import functools
+import os
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from contentindex import ContentIndex
+from copystatic import is_synced, transfer_file
+from discovery import scan_tree
+from generation import find_pages, generate_page
+from listings import LISTING_PAGE_SIZE, generate_listings
+from manifest import Manifest
+
+
+# Returns {path: (mtime_ns, size)} for every file under root, or for root itself if it is a file
+def scan_files(root):
+    if os.path.isfile(root):
+        stat = os.stat(root)
+        return {root: (stat.st_mtime_ns, stat.st_size)}
+    files = {}
+    for dir_path, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dir_path, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files[path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+# Compares two scan_files snapshots and returns (changed, removed) paths,
+# where changed includes files that were added
+def diff_files(old, new):
+    changed = [path for path, key in new.items() if old.get(path) != key]
+    removed = [path for path in old if path not in new]
+    return changed, removed
+
+
+# Maps a file under source_root to the matching path under dest_root
+def dest_for(path, source_root, dest_root):
+    return os.path.join(dest_root, os.path.relpath(path, source_root))
+
+
+# Removes dir_path and its parents below root for as long as they are empty, so the server
+# answers 404 for a removed page instead of listing the directory it left behind
+def remove_empty_dirs(dir_path, root):
+    root = os.path.abspath(root)
+    dir_path = os.path.abspath(dir_path)
+    while dir_path != root and dir_path.startswith(root + os.sep):
+        try:
+            os.rmdir(dir_path)
+        except OSError:
+            return
+        dir_path = os.path.dirname(dir_path)
+
+
+# Keeps public_dir in sync with the content, static files and template while the server runs.
+# The process stays alive between rebuilds, so the parsed template and imported modules stay warm
+# and a single edited page is rebuilt without touching the rest of the site. The listings of the
+# sections given are regenerated whenever a page is added, edited or removed, reading only the
+# pages that changed through the content index cache at content_index_path.
+class SiteWatcher():
+    def __init__(
+        self, dir_path_content, dir_path_static, template_path, dir_path_public, link="copy",
+        listings=(), listing_page_size=LISTING_PAGE_SIZE, content_index_path=None, manifest_path=None,
+    ):
+        self.dir_path_content = dir_path_content
+        self.dir_path_static = dir_path_static
+        self.template_path = template_path
+        self.dir_path_public = dir_path_public
+        self.link = link
+        self.listings = listings
+        self.listing_page_size = listing_page_size
+        self.content_index_path = content_index_path
+        self.manifest_path = manifest_path
+        self.snapshots = {}
+        # Listing pages of the last build or poll, as manifest entries keyed by "listing:<url>"
+        self.listing_entries = {}
+
+    # Content and static trees are rescanned against the previous snapshot, so each poll only
+    # lists the directories whose entries changed
+    def scan(self):
+        return {
+            self.dir_path_content: scan_tree(self.dir_path_content, self.snapshots.get(self.dir_path_content)),
+            self.dir_path_static: scan_tree(self.dir_path_static, self.snapshots.get(self.dir_path_static)),
+            self.template_path: scan_files(self.template_path),
+        }
+
+    # The listings written by the build the server was started after are taken from its
+    # manifest, so the first poll only rewrites the listing pages that change
+    def start(self):
+        self.snapshots = self.scan()
+        if self.listings and self.manifest_path is not None:
+            manifest = Manifest(self.manifest_path)
+            manifest.load()
+            self.listing_entries = {source: entry for source, entry in manifest.entries.items() if source.startswith("listing:")}
+
+    # Regenerates the listings, rewriting only the listing pages whose entries changed and
+    # removing the ones that are gone, such as the listing of a tag no page has anymore.
+    # Returns the paths written and the paths removed.
+    def update_listings(self, snapshot):
+        manifest = Manifest(None)
+        manifest.entries = self.listing_entries
+        pages = find_pages(self.dir_path_content, self.dir_path_public, snapshot)
+        index = ContentIndex().build(pages, self.dir_path_public, self.content_index_path)
+        written = generate_listings(index, self.listings, self.template_path, self.dir_path_public, manifest, self.listing_page_size)
+        removed = manifest.remove_stale()
+        self.listing_entries = manifest.current
+        return written, removed
+
+    def page_dest(self, from_path):
+        return os.path.splitext(dest_for(from_path, self.dir_path_content, self.dir_path_public))[0] + ".html"
+
+    # Rebuilds whatever changed since the last call and returns the number of outputs touched
+    def poll(self):
+        snapshots = self.scan()
+        touched = 0
+        # Outputs removed by this poll, whose directories go too once empty
+        removed_outputs = []
+
+        # Removed pages lose their output even when a template change rebuilds every page
+        changed, removed = snapshots[self.dir_path_content].diff(self.snapshots[self.dir_path_content])
+        for path in removed:
+            if path.endswith(".md") and os.path.exists(self.page_dest(path)):
+                os.remove(self.page_dest(path))
+                removed_outputs.append(self.page_dest(path))
+                touched += 1
+        pages = [(path, self.page_dest(path)) for path in changed if path.endswith(".md")]
+        template_changed, _ = diff_files(self.snapshots[self.template_path], snapshots[self.template_path])
+        if template_changed:
+            pages = find_pages(self.dir_path_content, self.dir_path_public, snapshots[self.dir_path_content])
+        for from_path, dest_path in pages:
+            try:
+                generate_page(from_path, self.template_path, dest_path)
+            except Exception as e:
+                print(f"Failed to generate {from_path}: {type(e).__name__}: {e}")
+            touched += 1
+        if self.listings and (pages or any(path.endswith(".md") for path in removed)):
+            written, gone = self.update_listings(snapshots[self.dir_path_content])
+            removed_outputs += gone
+            touched += len(written) + len(gone)
+
+        # Static files go through the transfer mode of the build. A hardlinked copy edited in
+        # place is already up to date, is_synced sees it shares the source's inode.
+        changed, removed = snapshots[self.dir_path_static].diff(self.snapshots[self.dir_path_static])
+        for path in changed:
+            dest_path = dest_for(path, self.dir_path_static, self.dir_path_public)
+            try:
+                if is_synced(path, os.stat(path), dest_path):
+                    continue
+                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+                mode = transfer_file(path, dest_path, self.link)
+            except OSError as e:
+                print(f"Failed to copy {path}: {type(e).__name__}: {e}")
+                continue
+            print(f" * {path} -> {dest_path} ({mode})")
+            touched += 1
+        for path in removed:
+            dest_path = dest_for(path, self.dir_path_static, self.dir_path_public)
+            try:
+                if os.path.exists(dest_path):
+                    os.remove(dest_path)
+                    removed_outputs.append(dest_path)
+                    touched += 1
+            except OSError as e:
+                print(f"Failed to remove {dest_path}: {type(e).__name__}: {e}")
+
+        for path in removed_outputs:
+            remove_empty_dirs(os.path.dirname(path), self.dir_path_public)
+
+        self.snapshots = snapshots
+        return touched
+
+
+# Serves dir_path_public over HTTP and rebuilds changed inputs every interval seconds until interrupted.
+# Static files are put in place with link, see copystatic.TRANSFER_MODES. The remaining
+# arguments keep the listings of the build up to date, see SiteWatcher.
+def serve(
+    dir_path_content, dir_path_static, template_path, dir_path_public, port=8888, interval=0.05, link="copy",
+    listings=(), listing_page_size=LISTING_PAGE_SIZE, content_index_path=None, manifest_path=None,
+):
+    watcher = SiteWatcher(
+        dir_path_content, dir_path_static, template_path, dir_path_public, link,
+        listings, listing_page_size, content_index_path, manifest_path,
+    )
+    watcher.start()
+
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=dir_path_public)
+    server = ThreadingHTTPServer(("", port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    print(f"Serving {dir_path_public} at http://localhost:{port}/, watching for changes...")
+
+    try:
+        while True:
+            time.sleep(interval)
+            start = time.perf_counter()
+            touched = watcher.poll()
+            if touched:
+                print(f"Rebuilt {touched} output(s) in {(time.perf_counter() - start) * 1000:.1f} ms")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
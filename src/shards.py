@@ -0,0 +1,85 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+
+from copystatic import SyncSummary, sync_files
+
+# Directory names of shard builds under the shards directory, "<index>-of-<count>"
+SHARD_DIR_PATTERN = re.compile(r"(\d+)-of-(\d+)")
+
+
+# Parses "i/N" as given to --shard into (i, N)
+def parse_shard(value):
+    match = re.fullmatch(r"(\d+)/(\d+)", value)
+    if match is None or not 0 <= int(match.group(1)) < int(match.group(2)):
+        raise argparse.ArgumentTypeError(f"expected i/N with 0 <= i < N, got {value!r}")
+    return int(match.group(1)), int(match.group(2))
+
+
+# The shard an input belongs to, from a hash of its path relative to its tree. The same path
+# lands in the same shard on every machine and every run, unlike the salted built-in hash().
+def shard_of(rel_path, count):
+    digest = hashlib.sha256(rel_path.replace(os.sep, "/").encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+
+# True when the input at rel_path is built by shard (index, count), or when there is no shard
+def in_shard(rel_path, shard):
+    return shard is None or shard_of(rel_path, shard[1]) == shard[0]
+
+
+# (public directory, cache directory) of the build of shard index of count
+def shard_dirs(dir_path_shards, index, count):
+    root = os.path.join(dir_path_shards, f"{index}-of-{count}")
+    return os.path.join(root, "public"), os.path.join(root, ".cache")
+
+
+# Returns the (index, count) of every shard build under dir_path_shards. They must all be of
+# the same count and none may be missing, or the merged site would silently lack pages.
+def find_shards(dir_path_shards):
+    if not os.path.isdir(dir_path_shards):
+        raise Exception(f"No shard builds found in {dir_path_shards}")
+    shards = []
+    for name in os.listdir(dir_path_shards):
+        match = SHARD_DIR_PATTERN.fullmatch(name)
+        if match is not None:
+            shards.append((int(match.group(1)), int(match.group(2))))
+    counts = set(count for _, count in shards)
+    if len(counts) != 1:
+        raise Exception(f"Expected the shard builds of a single shard count in {dir_path_shards}, found counts {sorted(counts)}")
+    count = counts.pop()
+    missing = sorted(set(range(count)) - set(index for index, _ in shards))
+    if missing:
+        raise Exception(f"Shard build(s) {', '.join(f'{index}/{count}' for index in missing)} missing from {dir_path_shards}")
+    return sorted(shards)
+
+
+# Combines the outputs of every shard build into dir_path_public the way static files are
+# synced, so unchanged files are skipped and link can hardlink instead of copying. With a
+# manifest every output is recorded and outputs no shard produced anymore are removed as stale.
+def merge_shards(dir_path_shards, dir_path_public, manifest=None, link="copy", write_if_changed=False):
+    summary = SyncSummary()
+    for index, count in find_shards(dir_path_shards):
+        dir_path_shard_public, _ = shard_dirs(dir_path_shards, index, count)
+        part = sync_files(dir_path_shard_public, dir_path_public, manifest, link, write_if_changed=write_if_changed)
+        summary.copied_files += part.copied_files
+        summary.copied_bytes += part.copied_bytes
+        summary.skipped_files += part.skipped_files
+        summary.skipped_bytes += part.skipped_bytes
+        summary.added += part.added
+        summary.modified += part.modified
+        summary.unchanged += part.unchanged
+    return summary
+
+
+# Yields the per-page entries the shard builds saved in their cache file name (e.g. the search
+# index's), for the merge to combine with the collector's merge method
+def read_shard_pages(dir_path_shards, name):
+    for index, count in find_shards(dir_path_shards):
+        _, dir_path_shard_cache = shard_dirs(dir_path_shards, index, count)
+        path = os.path.join(dir_path_shard_cache, name)
+        if os.path.exists(path):
+            with open(path, "r") as file:
+                yield json.load(file)["pages"]
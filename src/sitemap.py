@@ -0,0 +1,239 @@
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+
+import writer
+from collector import Collector
+from contentindex import page_url
+from frontmatter import read_metadata
+
+# The page collector of the running build, None unless --site-url was passed. generate_page
+# records the URL, title, date and mtime of every page it renders here, so the sitemap and
+# feeds are written without reading the markdown again.
+active = None
+
+# Most URLs a single sitemap file may list, larger sites get a sitemap index
+SITEMAP_MAX_URLS = 50000
+
+# Number of newest dated pages in the RSS and Atom feeds
+FEED_SIZE = 20
+
+
+# One rendered page as the sitemap and feeds see it
+class PageRecord():
+    def __init__(self, url, title, date="", mtime=0, author=""):
+        self.url = url
+        self.title = title
+        self.date = date
+        self.mtime = mtime
+        self.author = author
+
+    # The date from the front matter, or None when the page has none that parses
+    def published(self):
+        try:
+            published = datetime.fromisoformat(self.date)
+        except ValueError:
+            return None
+        if published.tzinfo is None:
+            published = published.replace(tzinfo=timezone.utc)
+        return published
+
+    def modified(self):
+        return datetime.fromtimestamp(self.mtime, timezone.utc)
+
+    def to_dict(self):
+        return {"url": self.url, "title": self.title, "date": self.date, "mtime": self.mtime, "author": self.author}
+
+    def __eq__(self, other):
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"PageRecord({self.url}, {self.title}, {self.date})"
+
+
+# Pages of the site keyed by markdown source. Pages rendered by this build are recorded as they
+# are generated, the ones an incremental build skipped keep the record saved by the last build.
+# author names the site in the Atom feed, see feed_author.
+class PageCollector(Collector):
+    def __init__(self, dir_path_public, site_url, author=None):
+        super().__init__(dir_path_public)
+        self.site_url = site_url.rstrip("/")
+        self.author = author
+        self.listings = []
+
+    def to_json(self, record):
+        return record.to_dict()
+
+    def from_json(self, data):
+        return PageRecord(**data)
+
+    def add(self, from_path, dest_path, title, date, mtime, author=""):
+        self.record(from_path, PageRecord(page_url(dest_path, self.dir_path_public), str(title), str(date), mtime, str(author)))
+
+    # Listing pages are rendered again every build, they are only listed in the sitemap
+    def add_listing(self, url):
+        self.listings.append(url)
+
+    # Drops pages that are no longer in the content tree and reads the few that have no
+    # record, e.g. pages an incremental build skipped before the collector was first enabled.
+    # Only their front matter and title are read, never the whole body.
+    def update(self, pages):
+        for from_path, dest_path in super().update(pages):
+            try:
+                metadata = read_metadata(from_path)
+            except Exception:
+                continue
+            self.add(
+                from_path, dest_path, metadata["title"], metadata.get("date", ""), os.stat(from_path).st_mtime,
+                metadata.get("author", ""),
+            )
+
+    def absolute(self, url):
+        return self.site_url + url
+
+    # Pages and listings in URL order, so the files only change when the site does
+    def sitemap_entries(self):
+        entries = [(record.url, record.modified()) for record in self.pages.values()]
+        entries += [(url, None) for url in self.listings]
+        return sorted(entries, key=lambda entry: entry[0])
+
+    # Newest dated pages first, ties broken by URL
+    def feed_entries(self, size=FEED_SIZE):
+        dated = [(record.published(), record) for record in self.pages.values()]
+        dated = sorted([entry for entry in dated if entry[0] is not None], key=lambda entry: entry[1].url)
+        return sorted(dated, key=lambda entry: entry[0], reverse=True)[:size]
+
+    def home(self):
+        for record in self.pages.values():
+            if record.url == "/":
+                return record
+        return None
+
+    # The feeds are named after the home page, or the site URL when there is none
+    def title(self):
+        home = self.home()
+        return home.title if home is not None else self.site_url
+
+    # Atom requires an author for the feed: the one given to the collector, else the author in
+    # the home page's front matter, else the feed's title
+    def feed_author(self):
+        if self.author:
+            return self.author
+        home = self.home()
+        if home is not None and home.author:
+            return home.author
+        return self.title()
+
+    # Writes sitemap.xml, split into sitemap-N.xml files under a sitemap index past
+    # max_urls, plus the RSS and Atom feeds. Returns the paths written.
+    def write(self, manifest=None, max_urls=SITEMAP_MAX_URLS):
+        title = self.title()
+        entries = self.sitemap_entries()
+        written = []
+        if len(entries) <= max_urls:
+            written.append(self.write_file("sitemap.xml", lambda write: write_urlset(entries, self.absolute, write), manifest))
+        else:
+            names = []
+            for number, start in enumerate(range(0, len(entries), max_urls), 1):
+                names.append(f"sitemap-{number}.xml")
+                chunk = entries[start:start + max_urls]
+                written.append(self.write_file(names[-1], lambda write: write_urlset(chunk, self.absolute, write), manifest))
+            written.append(self.write_file("sitemap.xml", lambda write: write_sitemap_index(names, self.absolute, write), manifest))
+        feed = self.feed_entries()
+        written.append(self.write_file("feed.xml", lambda write: write_rss(title, feed, self.absolute, write), manifest))
+        author = self.feed_author()
+        written.append(self.write_file("atom.xml", lambda write: write_atom(title, author, feed, self.absolute, write), manifest))
+        return written
+
+    # Streams one file to a temp file next to it and moves it in place, through the output
+    # writer when there is one so an unchanged file keeps its mtime
+    def write_file(self, name, produce, manifest=None):
+        dest_path = os.path.join(self.dir_path_public, name)
+        tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+        os.makedirs(self.dir_path_public, exist_ok=True)
+        with open(tmp_path, "w") as file:
+            produce(file.write)
+        if writer.active is not None:
+            writer.active.replace(tmp_path, dest_path)
+        else:
+            os.replace(tmp_path, dest_path)
+        if manifest is not None:
+            manifest.record(f"sitemap:{dest_path}", None, dest_path)
+        return dest_path
+
+    def __repr__(self):
+        return f"PageCollector({len(self.pages)} pages, {len(self.listings)} listings)"
+
+
+def escape_attribute(value):
+    return escape(value, {'"': "&quot;"})
+
+
+def w3c_datetime(moment):
+    return moment.replace(microsecond=0).isoformat()
+
+
+def write_urlset(entries, absolute, write):
+    write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    write('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+    for url, modified in entries:
+        lastmod = f"<lastmod>{w3c_datetime(modified)}</lastmod>" if modified is not None else ""
+        write(f"<url><loc>{escape(absolute(url))}</loc>{lastmod}</url>\n")
+    write("</urlset>\n")
+
+
+def write_sitemap_index(names, absolute, write):
+    write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    write('<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+    for name in names:
+        write(f"<sitemap><loc>{escape(absolute('/' + name))}</loc></sitemap>\n")
+    write("</sitemapindex>\n")
+
+
+# feed is [(published, record)] newest first, as returned by PageCollector.feed_entries
+def write_rss(title, feed, absolute, write):
+    write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    write('<rss version="2.0"><channel>\n')
+    write(f"<title>{escape(title)}</title><link>{escape(absolute('/'))}</link><description>{escape(title)}</description>\n")
+    for published, record in feed:
+        link = escape(absolute(record.url))
+        write(
+            f"<item><title>{escape(record.title)}</title><link>{link}</link><guid>{link}</guid>"
+            f"<pubDate>{format_datetime(published)}</pubDate></item>\n"
+        )
+    write("</channel></rss>\n")
+
+
+# The feed's updated time is the newest entry's rather than the build time, so a build
+# that changes no page leaves the feed byte for byte the same. Entries name their own author
+# when their front matter has one.
+def write_atom(title, author, feed, absolute, write):
+    updated = max((record.modified() for _, record in feed), default=datetime.fromtimestamp(0, timezone.utc))
+    write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    write('<feed xmlns="http://www.w3.org/2005/Atom">\n')
+    write(
+        f'<title>{escape(title)}</title><id>{escape(absolute("/"))}</id><link href="{escape_attribute(absolute("/"))}"/>'
+        f'<link rel="self" href="{escape_attribute(absolute("/atom.xml"))}"/><updated>{w3c_datetime(updated)}</updated>'
+        f"<author><name>{escape(author)}</name></author>\n"
+    )
+    for published, record in feed:
+        link = escape_attribute(absolute(record.url))
+        entry_author = f"<author><name>{escape(record.author)}</name></author>" if record.author else ""
+        write(
+            f'<entry><title>{escape(record.title)}</title><id>{link}</id><link href="{link}"/>'
+            f"<published>{w3c_datetime(published)}</published><updated>{w3c_datetime(record.modified())}</updated>"
+            f"{entry_author}</entry>\n"
+        )
+    write("</feed>\n")
+
+
+def enable(dir_path_public, site_url, author=None):
+    global active
+    active = PageCollector(dir_path_public, site_url, author)
+    return active
+
+
+def disable():
+    global active
+    active = None
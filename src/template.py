@@ -0,0 +1,133 @@
+import os
+import re
+
+# Matches placeholders such as {{ Title }}, {{ Content }} or {{ date }}
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*([A-Za-z_][\w.-]*)\s*\}\}")
+
+# Elements whose content keeps its whitespace when a template is minified
+PRESERVE_PATTERN = re.compile(r"<(pre|textarea|script|style)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+# Comments other than conditional comments are dropped by minification
+COMMENT_PATTERN = re.compile(r"<!--(?!\[if).*?-->", re.DOTALL)
+# Whitespace between two tags, capturing the first tag and the names of both
+TAG_GAP_PATTERN = re.compile(r"(<[!/]?([A-Za-z][\w-]*)[^>]*>)\s+(?=<[!/]?([A-Za-z][\w-]*))")
+# A tag, left as it is so attribute values keep their whitespace, or a run of whitespace in the text
+TEXT_WHITESPACE_PATTERN = re.compile(r"(<[^>]*>)|\s+")
+# Tags next to which whitespace never renders, so minification removes it instead of collapsing it
+BLOCK_TAGS = {
+    "doctype", "html", "head", "body", "meta", "link", "title", "base",
+    "article", "aside", "section", "nav", "header", "footer", "main", "div", "p", "hr", "br",
+    "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol", "li", "blockquote", "figure", "figcaption",
+    "table", "thead", "tbody", "tfoot", "tr", "th", "td", "form", "noscript",
+}
+
+# Parsed templates keyed by (path, minify), each stored with the (mtime, size) it was parsed from
+_template_cache = {}
+
+# Set by --minify: templates are minified once when loaded, so every page shares the result
+minify = False
+
+
+def collapse_whitespace(html):
+    def gap(match):
+        if match.group(2).lower() in BLOCK_TAGS or match.group(3).lower() in BLOCK_TAGS:
+            return match.group(1)
+        return match.group(1) + " "
+
+    html = COMMENT_PATTERN.sub("", html)
+    html = TAG_GAP_PATTERN.sub(gap, html)
+    return TEXT_WHITESPACE_PATTERN.sub(lambda match: match.group(1) or " ", html)
+
+
+# Removes the formatting whitespace of an HTML template: whitespace next to block level tags
+# goes, any other run of whitespace in the text becomes one space. Placeholders keep working, and the
+# content of <pre>, <textarea>, <script> and <style> elements is left as it is.
+def minify_html(html):
+    pieces = []
+    pos = 0
+    for match in PRESERVE_PATTERN.finditer(html):
+        pieces.append(collapse_whitespace(html[pos:match.start()]))
+        pieces.append(match.group())
+        pos = match.end()
+    pieces.append(collapse_whitespace(html[pos:]))
+
+    # Preserved elements count as block level too: drop whitespace between them and a tag
+    for i in range(1, len(pieces), 2):
+        if pieces[i - 1].rstrip().endswith(">"):
+            pieces[i - 1] = pieces[i - 1].rstrip()
+        if pieces[i + 1].lstrip().startswith("<"):
+            pieces[i + 1] = pieces[i + 1].lstrip()
+    return "".join(pieces).strip()
+
+
+# A template parsed once into literal segments and placeholder slots.
+# render() fills the slots from a context dict and joins everything in one go, so
+# the page is never copied by repeated str.replace calls.
+class Template():
+    def __init__(self, source):
+        self.parts = []
+        self.slots = []
+        pos = 0
+        for match in PLACEHOLDER_PATTERN.finditer(source):
+            self.parts.append(source[pos:match.start()])
+            self.slots.append((len(self.parts), match.group(1), match.group()))
+            self.parts.append(match.group())
+            pos = match.end()
+        self.parts.append(source[pos:])
+
+    # Names of all placeholders in the template, in order of appearance
+    def placeholders(self):
+        return [name for _, name, _ in self.slots]
+
+    # Placeholders missing from context render as empty strings, a page without a date leaves
+    # no {{ date }} behind. With keep_missing they are left in the output as written instead.
+    def render(self, context, keep_missing=False):
+        parts = self.parts.copy()
+        for index, name, raw in self.slots:
+            value = context.get(name)
+            if value is not None:
+                parts[index] = str(value)
+            elif not keep_missing:
+                parts[index] = ""
+        return "".join(parts)
+
+    # Streams the rendered page to write. A callable context value is called with write
+    # instead of being converted to a string, so large content can be streamed straight through.
+    # Missing placeholders are handled like in render.
+    def render_to(self, write, context, keep_missing=False):
+        slots = {index: (name, raw) for index, name, raw in self.slots}
+        for index, part in enumerate(self.parts):
+            if index not in slots:
+                write(part)
+                continue
+            name, raw = slots[index]
+            value = context.get(name)
+            if value is None:
+                if keep_missing:
+                    write(raw)
+            elif callable(value):
+                value(write)
+            else:
+                write(str(value))
+
+    def __eq__(self, other):
+        return self.parts == other.parts
+
+    def __repr__(self):
+        return f"Template({self.placeholders()})"
+
+
+# Returns the parsed template at path, parsing it again only when the file changed.
+# When the module's minify flag is set the template is minified before parsing.
+def load_template(path):
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _template_cache.get((path, minify))
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    with open(path, "r") as file:
+        source = file.read()
+    if minify:
+        source = minify_html(source)
+    template = Template(source)
+    _template_cache[(path, minify)] = (key, template)
+    return template
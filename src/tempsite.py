@@ -0,0 +1,21 @@
+import os
+import tempfile
+import unittest
+
+
+# Base of the tests that lay out a site in a temporary directory, self.root, removed after
+# every test. Subclasses calling super().setUp() can keep a tearDown of their own for the
+# modules they enable.
+class TempDirTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = self.tmp.name
+
+    # Writes text or bytes to a path relative to self.root, creating its directories
+    def write(self, path, data):
+        path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb" if isinstance(data, bytes) else "w") as file:
+            file.write(data)
+        return path
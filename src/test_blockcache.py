@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+
+import blockcache
+from blockcache import BlockCache
+from markdown_blocks import markdown_to_html_node
+
+#
+class TestBlockCache(unittest.TestCase):
+    def tearDown(self):
+        blockcache.disable()
+
+    def test_lru_bound(self):
+        cache = BlockCache(max_entries=2)
+        cache.put("a", "<p>a</p>")
+        cache.put("b", "<p>b</p>")
+        self.assertEqual(cache.get("a"), "<p>a</p>")
+        cache.put("c", "<p>c</p>")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "<p>a</p>")
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+    def test_cached_render_matches_uncached(self):
+        md = "# Title\n\nShared **disclaimer**\n\n- nav\n- [list](/x)\n\nShared **disclaimer**"
+        expected = markdown_to_html_node(md).to_html()
+        cache = blockcache.enable()
+        self.assertEqual(markdown_to_html_node(md).to_html(), expected)
+        self.assertEqual(markdown_to_html_node(md).to_html(), expected)
+        self.assertEqual((cache.hits, cache.misses), (5, 3))
+
+    def test_persist(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "blocks.json")
+            cache = BlockCache()
+            cache.put("para", "<p>para</p>")
+            cache.save(path)
+
+            loaded = BlockCache()
+            loaded.load(path)
+            self.assertEqual(loaded.get("para"), "<p>para</p>")
+
+    def test_persisted_cache_dropped_when_renderer_changes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "blocks.json")
+            with open(path, "w") as file:
+                file.write('{"version": "old", "entries": [["para", "<p>stale</p>"]]}')
+            cache = BlockCache()
+            cache.load(path)
+            self.assertIsNone(cache.get("para"))
+
+    def test_worker_changes_merge(self):
+        worker = BlockCache()
+        worker.track_changes()
+        worker.put("a", "<p>a</p>")
+        worker.get("a")
+        parent = BlockCache()
+        parent.merge(worker.take_changes())
+        self.assertEqual(parent.get("a"), "<p>a</p>")
+        self.assertEqual((parent.hits, parent.misses), (2, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import unittest
+
+from collector import BlockReplay, Collector
+from tempsite import TempDirTestCase
+
+#
+class TestBlockReplay(unittest.TestCase):
+    def setUp(self):
+        self.replay = BlockReplay(max_blocks=2)
+        self.items = []
+        self.cache = {}
+
+    # Stands in for text_to_children feeding a collector
+    def render(self, block):
+        self.replay.mark_parsed()
+        self.items.extend(block.split())
+        return block.upper()
+
+    # Stands in for the block cache's converter
+    def convert(self, block):
+        if block not in self.cache:
+            self.cache[block] = self.render(block)
+        return self.cache[block]
+
+    def test_cached_blocks_are_replayed(self):
+        convert = self.replay.converter(self.convert, self.render, lambda: self.items)
+        self.assertEqual(convert("a b"), "A B")
+        self.assertEqual(convert("a b"), "A B")
+        self.assertEqual(self.items, ["a", "b", "a", "b"])
+
+    def test_cached_blocks_never_seen_are_rendered(self):
+        self.cache["c d"] = "C D"
+        convert = self.replay.converter(self.convert, self.render, lambda: self.items)
+        convert("c d")
+        self.assertEqual(self.items, ["c", "d"])
+        self.assertEqual(self.replay.blocks["c d"], ["c", "d"])
+
+    def test_only_the_newest_blocks_are_kept(self):
+        convert = self.replay.converter(self.convert, self.render, lambda: self.items)
+        for block in ("a", "b", "c"):
+            convert(block)
+        self.assertEqual(list(self.replay.blocks), ["b", "c"])
+
+    def test_outside_a_page_nothing_is_recorded(self):
+        convert = self.replay.converter(self.convert, self.render, lambda: None)
+        convert("a b")
+        self.assertEqual(self.replay.blocks, {})
+
+
+#
+class TestCollector(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.collector = Collector(os.path.join(self.root, "public"))
+
+    def test_workers_hand_back_what_they_record(self):
+        self.collector.record("a.md", {"n": 1})
+        self.collector.track_changes()
+        self.collector.record("b.md", {"n": 2})
+        self.assertEqual(self.collector.take_changes(), {"b.md": {"n": 2}})
+        parent = Collector(self.collector.dir_path_public)
+        parent.merge({"b.md": {"n": 2}})
+        self.assertEqual(parent.pages, {"b.md": {"n": 2}})
+
+    def test_cache_round_trip(self):
+        self.collector.record("a.md", {"n": 1})
+        path = os.path.join(self.root, "cache", "pages.json")
+        self.collector.save(path)
+        loaded = Collector(self.collector.dir_path_public)
+        loaded.load(path)
+        self.assertEqual(loaded.pages, self.collector.pages)
+        # A cache saved for another public directory is ignored
+        other = Collector(os.path.join(self.root, "elsewhere"))
+        other.load(path)
+        self.assertEqual(other.pages, {})
+
+    def test_update(self):
+        public = self.collector.dir_path_public
+        os.makedirs(public)
+        with open(os.path.join(public, "b.html"), "w") as file:
+            file.write("b")
+        self.collector.record("a.md", {"n": 1})
+        pages = [("b.md", os.path.join(public, "b.html")), ("c.md", os.path.join(public, "c.html"))]
+        # a.md is gone, c.md has no output to read yet
+        self.assertEqual(self.collector.update(pages), [pages[0]])
+        self.assertEqual(self.collector.pages, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
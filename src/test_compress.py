@@ -0,0 +1,61 @@
+import gzip
+import os
+import unittest
+
+from compress import ENCODINGS, MIN_COMPRESS_SIZE, compress_build_outputs, compress_file, compress_outputs
+from manifest import Manifest
+from tempsite import TempDirTestCase
+
+#
+class TestCompress(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+
+    def test_compress_file(self):
+        path = self.write("index.html", "<p>hello</p>" * 100)
+        self.assertEqual(compress_file(path), [path + suffix for suffix in ENCODINGS])
+        with open(path, "rb") as file, gzip.open(path + ".gz") as compressed:
+            self.assertEqual(compressed.read(), file.read())
+
+        # Same input, same bytes, so an unchanged output never looks changed to a deploy
+        with open(path + ".gz", "rb") as file:
+            first = file.read()
+        compress_file(path)
+        with open(path + ".gz", "rb") as file:
+            self.assertEqual(file.read(), first)
+
+    def test_small_file_loses_its_siblings(self):
+        path = self.write("index.html", "x" * MIN_COMPRESS_SIZE)
+        compress_file(path)
+        self.write("index.html", "x")
+        self.assertEqual(compress_file(path), [])
+        self.assertFalse(os.path.exists(path + ".gz"))
+
+    def test_compress_outputs_skips_binary_files(self):
+        html = self.write("index.html", "<p>hello</p>" * 100)
+        png = self.write("image.png", "PNG" * 100)
+        summary = compress_outputs([html, png])
+        self.assertEqual(summary.files, 1)
+        self.assertEqual(summary.added, [html + suffix for suffix in ENCODINGS])
+        self.assertFalse(os.path.exists(png + ".gz"))
+
+    def test_build_outputs_compressed_once_and_removed_with_their_page(self):
+        page = self.write("page.html", "<p>page</p>" * 100)
+        other = self.write("other.html", "<p>other</p>" * 100)
+        manifest_path = os.path.join(self.root, "manifest.json")
+        manifest = Manifest(manifest_path)
+        manifest.record("page.md", "a", page)
+        manifest.record("other.md", "b", other)
+        self.assertEqual(compress_build_outputs(manifest, []).files, 2)
+        manifest.save()
+
+        manifest = Manifest(manifest_path)
+        manifest.load()
+        manifest.record("page.md", "a", page)
+        self.assertEqual(compress_build_outputs(manifest, []).files, 0)
+        self.assertEqual(sorted(manifest.remove_stale()), sorted([other] + [other + suffix for suffix in ENCODINGS]))
+        self.assertTrue(os.path.exists(page + ".gz"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import random
 import unittest
 
 from enum import Enum
@@ -119,6 +120,12 @@ class Test_Split_Nodes(unittest.TestCase):
                             for i in bold_indices))
         self.assertEqual(result[4].text_type, TextType.ITALIC)
 
+    def test_odd_delimiters_in_converted_nodes(self):
+        old_nodes = [TextNode("a*b", TextType.BOLD), TextNode("x *y* z", TextType.TEXT)]
+        result = split_nodes_delimiter(old_nodes, "*", TextType.ITALIC)
+        self.assertEqual([node.text for node in result], ["a*b", "x ", "y", " z"])
+        self.assertEqual(result[0].text_type, TextType.BOLD)
+
     def test_empty_delim_section(self):
         old_nodes = [TextNode("I am getting ** ** very tired of writing tests!", TextType.TEXT)]
         result = split_nodes_delimiter(old_nodes, "**", TextType.CODE)
@@ -225,5 +232,58 @@ class Text_Split_Image(unittest.TestCase):
             nodes,
         )
 
+class Test_Scan_Inline(unittest.TestCase):
+    def test_scan_matches_pipeline(self):
+        text = "This is **text** with an *italic* word and a `code block` and an ![image](https://i.imgur.com/zjjcJKZ.png) and a [link](https://boot.dev)"
+        self.assertListEqual(scan_inline(text), split_text_to_textnodes(text))
+
+    def test_scan_keeps_empty_text_between_spans(self):
+        self.assertListEqual(
+            [
+                TextNode("", TextType.TEXT),
+                TextNode("a", TextType.BOLD),
+                TextNode("", TextType.TEXT),
+                TextNode("b", TextType.CODE),
+                TextNode("", TextType.TEXT),
+            ],
+            scan_inline("**a**`b`"),
+        )
+
+    def test_scan_drops_empty_text_around_links(self):
+        self.assertListEqual(
+            [
+                TextNode("i", TextType.IMAGE, "s"),
+                TextNode("l", TextType.LINK, "u"),
+            ],
+            scan_inline("![i](s)[l](u)"),
+        )
+
+    def test_scan_falls_back_on_nested_markup(self):
+        for text in ["**a *b* c**", "*a **b** c*", "[a *b*](u)", "`a*b*`", "*unclosed"]:
+            with self.assertRaises(InlineScanFallback):
+                scan_inline(text)
+
+    def test_plain_text_fast_path(self):
+        for text in ["", "Just prose, with punctuation! (and parens)", "a ! b"]:
+            self.assertListEqual([TextNode(text, TextType.TEXT)], text_to_textnodes(text))
+            self.assertListEqual(split_text_to_textnodes(text), text_to_textnodes(text))
+
+    def test_unclosed_delimiter_still_raises(self):
+        with self.assertRaises(ValueError):
+            text_to_textnodes("I'm going to *break your function")
+
+    def test_text_to_textnodes_matches_pipeline_randomized(self):
+        pieces = ["a", "b c", " ", "*", "**", "`", "[", "]", "(", ")", "!", "[l](u)", "![i](s)", "](y)"]
+        rng = random.Random(42)
+        for _ in range(3000):
+            text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 12)))
+            try:
+                expected = split_text_to_textnodes(text)
+            except ValueError:
+                with self.assertRaises(ValueError):
+                    text_to_textnodes(text)
+                continue
+            self.assertListEqual(expected, text_to_textnodes(text), text)
+
 if __name__ == "__main__":
-    unittest.main()
\ No newline at end of file
+    unittest.main()
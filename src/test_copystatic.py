@@ -0,0 +1,90 @@
+import os
+import unittest
+
+from copystatic import sync_files, transfer_file
+from manifest import Manifest
+from tempsite import TempDirTestCase
+
+#
+class TestSyncFiles(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.root, "static")
+        self.public = os.path.join(self.root, "public")
+        self.write("static/index.css", "body {}")
+        self.write("static/images/a.png", "PNG" * 100)
+
+    def test_copies_then_skips(self):
+        summary = sync_files(self.static, self.public)
+        self.assertEqual((summary.copied_files, summary.copied_bytes), (2, 307))
+        with open(os.path.join(self.public, "images", "a.png")) as file:
+            self.assertEqual(file.read(), "PNG" * 100)
+
+        summary = sync_files(self.static, self.public)
+        self.assertEqual((summary.copied_files, summary.skipped_files, summary.skipped_bytes), (0, 2, 307))
+
+    def test_changed_file_is_copied(self):
+        sync_files(self.static, self.public)
+        self.write("static/index.css", "body { margin: 0 }")
+        summary = sync_files(self.static, self.public)
+        self.assertEqual(summary.copied_files, 1)
+
+    def test_verify_hash_catches_same_size_and_mtime(self):
+        sync_files(self.static, self.public)
+        dest = os.path.join(self.public, "index.css")
+        stat = os.stat(dest)
+        with open(dest, "w") as file:
+            file.write("body {x")
+        os.utime(dest, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        self.assertEqual(sync_files(self.static, self.public).copied_files, 0)
+        self.assertEqual(sync_files(self.static, self.public, verify_hash=True).copied_files, 1)
+
+    def test_write_if_changed_ignores_mtime(self):
+        sync_files(self.static, self.public)
+        dest = os.path.join(self.public, "index.css")
+        os.utime(os.path.join(self.static, "index.css"))
+        os.utime(dest, ns=(1_000_000_000, 1_000_000_000))
+        self.write("static/new.txt", "new")
+
+        summary = sync_files(self.static, self.public, write_if_changed=True)
+        self.assertEqual(os.stat(dest).st_mtime_ns, 1_000_000_000)
+        self.assertEqual(summary.added, [os.path.join(self.public, "new.txt")])
+        self.assertEqual(summary.modified, [])
+        self.assertEqual(len(summary.unchanged), 2)
+
+        self.write("static/index.css", "body {?")
+        summary = sync_files(self.static, self.public, write_if_changed=True)
+        self.assertEqual(summary.modified, [dest])
+
+    def test_hardlink(self):
+        sync_files(self.static, self.public, link="hardlink")
+        source = os.stat(os.path.join(self.static, "index.css"))
+        dest = os.stat(os.path.join(self.public, "index.css"))
+        self.assertEqual(source.st_ino, dest.st_ino)
+
+    def test_reflink_falls_back_to_copy(self):
+        dest = os.path.join(self.root, "copy.css")
+        mode = transfer_file(os.path.join(self.static, "index.css"), dest, "reflink")
+        self.assertIn(mode, ["reflink", "copy"])
+        with open(dest) as file:
+            self.assertEqual(file.read(), "body {}")
+
+    def test_stale_files_removed_through_manifest(self):
+        manifest_path = os.path.join(self.root, "manifest.json")
+        manifest = Manifest(manifest_path)
+        sync_files(self.static, self.public, manifest)
+        manifest.save()
+        page = self.write("public/page.html", "<p>generated</p>")
+        os.remove(os.path.join(self.static, "images", "a.png"))
+
+        manifest = Manifest(manifest_path)
+        manifest.load()
+        sync_files(self.static, self.public, manifest)
+        manifest.remove_stale()
+        self.assertFalse(os.path.exists(os.path.join(self.public, "images", "a.png")))
+        self.assertTrue(os.path.exists(page))
+
+
+if __name__ == "__main__":
+    unittest.main()
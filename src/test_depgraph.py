@@ -0,0 +1,115 @@
+import os
+import unittest
+
+import blockcache
+import images
+
+from depgraph import DependencyGraph, page_dependencies, resolve_reference
+from generation import generate_pages_recursive
+from tempsite import TempDirTestCase
+
+#
+class TestDependencyGraph(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.public = os.path.join(self.root, "public")
+        self.graph_path = os.path.join(self.root, "depgraph.json")
+        self.template = self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.write("content/index.md", "# Home\n\n[Tom](/blog/tom) and [Google](https://google.com)")
+        self.write("content/blog/tom/index.md", "# Tom\n\n![Tom](/images/tom.png)\n\n[Home](/)")
+        self.write("content/contact/index.md", "# Contact\n\nmail me")
+        self.write("static/images/tom.png", "PNG")
+
+    def tearDown(self):
+        images.disable()
+        blockcache.disable()
+
+    def build(self):
+        graph = DependencyGraph(self.graph_path, self.static)
+        graph.load()
+        generate_pages_recursive(self.content, self.template, self.public, None, 1, graph)
+        graph.save()
+        return graph
+
+    def rebuilt(self, graph):
+        return sorted(
+            os.path.relpath(output, self.public) for output, entry in graph.current.items() if entry["reasons"]
+        )
+
+    def test_resolve_reference(self):
+        resolve = lambda url, page="/blog/tom/": resolve_reference(url, page, self.content, self.static)
+        self.assertIsNone(resolve("https://google.com"))
+        self.assertIsNone(resolve("#top"))
+        self.assertEqual(resolve("/images/tom.png"), os.path.join(self.static, "images", "tom.png"))
+        self.assertEqual(resolve("/blog/tom"), os.path.join(self.content, "blog", "tom", "index.md"))
+        self.assertEqual(resolve("/"), os.path.join(self.content, "index.md"))
+        self.assertEqual(resolve("../../contact/"), os.path.join(self.content, "contact", "index.md"))
+        self.assertEqual(resolve("/images/missing.png"), os.path.join(self.static, "images", "missing.png"))
+        self.assertEqual(resolve("/blog/new-post"), os.path.join(self.content, "blog", "new-post", "index.md"))
+
+    def test_page_dependencies(self):
+        source = os.path.join(self.content, "blog", "tom", "index.md")
+        references = [["image", "/images/tom.png"], ["link", "/"], ["link", "https://google.com"]]
+        self.assertEqual(page_dependencies(source, "/blog/tom/", self.template, self.content, self.static, references), {
+            self.template: True,
+            source: True,
+            os.path.join(self.static, "images", "tom.png"): False,
+            os.path.join(self.content, "index.md"): False,
+        })
+        images.enable(self.static, self.public, os.path.join(self.root, "images"), os.path.join(self.root, "images.json"))
+        dependencies = page_dependencies(source, "/blog/tom/", self.template, self.content, self.static, references)
+        self.assertTrue(dependencies[os.path.join(self.static, "images", "tom.png")])
+
+    def test_references_are_collected_while_parsing(self):
+        # Blocks the block cache answers without parsing still add their references
+        blockcache.enable()
+        self.write("content/about/index.md", "# Tom\n\n![Tom](/images/tom.png)\n\n[Home](/)")
+        graph = self.build()
+        for page in ("about", os.path.join("blog", "tom")):
+            self.assertEqual(graph.current[os.path.join(self.public, page, "index.html")]["dependencies"], {
+                self.template: graph.fingerprint(self.template),
+                os.path.join(self.content, page, "index.md"): graph.fingerprint(os.path.join(self.content, page, "index.md")),
+                os.path.join(self.static, "images", "tom.png"): "exists",
+                os.path.join(self.content, "index.md"): "exists",
+            })
+
+    def test_minimal_rebuild_set(self):
+        self.assertEqual(len(self.rebuilt(self.build())), 3)
+        self.assertEqual(self.rebuilt(self.build()), [])
+
+        # Pages linking to an edited page only hold its URL
+        self.write("content/blog/tom/index.md", "# Tom\n\n![Tom](/images/tom.png)\n\n[Home](/) edited")
+        self.assertEqual(self.rebuilt(self.build()), [os.path.join("blog", "tom", "index.html")])
+        self.write("static/images/tom.png", "PNG2")
+        self.assertEqual(self.rebuilt(self.build()), [])
+
+        # A linked page that goes away is still a change, its edge records existence
+        os.remove(os.path.join(self.content, "index.md"))
+        self.assertEqual(self.rebuilt(self.build()), [os.path.join("blog", "tom", "index.html")])
+
+        self.write("template.html", "<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertEqual(len(self.rebuilt(self.build())), 2)
+
+    def test_image_dimensions_are_dependencies_with_images(self):
+        images.enable(self.static, self.public, os.path.join(self.root, "images"), os.path.join(self.root, "images.json"))
+        self.build()
+        self.write("static/images/tom.png", "PNG2")
+        self.assertEqual(self.rebuilt(self.build()), [os.path.join("blog", "tom", "index.html")])
+
+    def test_why_rebuild(self):
+        self.build()
+        os.remove(os.path.join(self.content, "index.md"))
+        graph = self.build()
+        graph.load()
+        lines = graph.explain("/blog/tom/", self.public)
+        self.assertIn("was regenerated in the last build because:", lines)
+        self.assertIn(f"  * {os.path.join(self.content, 'index.md')} was removed", lines)
+        self.assertIn(f"  * {os.path.join(self.static, 'images', 'tom.png')} (existence only)", lines)
+        lines = graph.explain(os.path.join(self.content, "contact", "index.md"), self.public)
+        self.assertIn("was not regenerated in the last build, none of its dependencies had changed", lines)
+        self.assertIn("run a build first", graph.explain("/nope/", self.public)[0])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import unittest
+from unittest import mock
+
+from discovery import TreeSnapshot, scan_tree
+from tempsite import TempDirTestCase
+
+#
+class TestScanTree(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.write("content/index.md", "# Home")
+        self.write("content/blog/tom/index.md", "# Tom")
+        self.write("content/blog/glorfindel/index.md", "# Glorfindel")
+        os.makedirs(os.path.join(self.content, "empty"))
+        self.age(self.content)
+
+    # Moves every mtime well into the past, so snapshots trust the listings
+    def age(self, root):
+        for dir_path, dir_names, file_names in os.walk(root):
+            for name in dir_names + file_names + [""]:
+                os.utime(os.path.join(dir_path, name), ns=(1_000_000_000, 1_000_000_000))
+
+    def test_scan(self):
+        snapshot = scan_tree(self.content)
+        self.assertEqual(sorted(snapshot.files), ["blog/glorfindel/index.md", "blog/tom/index.md", "index.md"])
+        self.assertEqual(snapshot.files["index.md"].st_size, 6)
+        self.assertEqual(sorted(snapshot.dirs), ["", "blog", "blog/glorfindel", "blog/tom", "empty"])
+        self.assertEqual(scan_tree(os.path.join(self.content, "missing")).files, {})
+
+    def test_unchanged_directories_are_not_listed_again(self):
+        previous = scan_tree(self.content)
+        self.write("content/blog/tom/extra.md", "# Extra")
+        os.utime(os.path.join(self.content, "blog", "tom", "extra.md"), ns=(1_000_000_000, 1_000_000_000))
+        with mock.patch("discovery.os.scandir", wraps=os.scandir) as scandir:
+            snapshot = scan_tree(self.content, previous)
+        self.assertEqual([call.args[0] for call in scandir.call_args_list], [os.path.join(self.content, "blog", "tom")])
+        self.assertIn("blog/tom/extra.md", snapshot.files)
+
+    def test_diff_and_unchanged_since(self):
+        previous = scan_tree(self.content)
+        self.write("content/index.md", "# Home, edited")
+        os.remove(os.path.join(self.content, "blog", "glorfindel", "index.md"))
+        snapshot = scan_tree(self.content, previous)
+        changed, removed = snapshot.diff(previous)
+        self.assertEqual(changed, [os.path.join(self.content, "index.md")])
+        self.assertEqual(removed, [os.path.join(self.content, "blog", "glorfindel", "index.md")])
+        self.assertEqual(snapshot.unchanged_since(previous), [os.path.join(self.content, "blog", "tom", "index.md")])
+
+    def test_save_and_load(self):
+        path = os.path.join(self.root, "tree.json")
+        snapshot = scan_tree(self.content)
+        snapshot.save(path)
+        loaded = TreeSnapshot.load(path, self.content)
+        self.assertEqual(loaded.files, snapshot.files)
+        self.assertEqual(loaded.dirs, snapshot.dirs)
+        self.assertIsNone(TreeSnapshot.load(path, "elsewhere"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import io
+import os
+import tempfile
+import unittest
+
+from frontmatter import *
+
+#
+class TestFrontMatter(unittest.TestCase):
+    def test_no_front_matter(self):
+        md = "# Title\n\nbody"
+        self.assertEqual(split_front_matter(md), ({}, md))
+
+    def test_yaml(self):
+        md = "---\ntitle: \"Why Tom Bombadil Was a Mistake\"\ndate: 2024-05-01\ntags: [tolkien, essays]\nauthors:\n  - Frodo\n  - Sam\n---\n# Heading\n\nbody"
+        metadata, body = split_front_matter(md)
+        self.assertEqual(metadata, {
+            "title": "Why Tom Bombadil Was a Mistake",
+            "date": "2024-05-01",
+            "tags": ["tolkien", "essays"],
+            "authors": ["Frodo", "Sam"],
+        })
+        self.assertEqual(body, "# Heading\n\nbody")
+
+    def test_toml(self):
+        md = "+++\ntitle = \"Majesty\"\ndate = 2024-05-01\ntags = [\"tolkien\"]\n+++\n# Heading"
+        metadata, body = split_front_matter(md)
+        self.assertEqual(metadata, {"title": "Majesty", "date": "2024-05-01", "tags": ["tolkien"]})
+        self.assertEqual(body, "# Heading")
+
+    def test_unclosed_fence_is_not_front_matter(self):
+        md = "---\ntitle: x\n\nbody"
+        self.assertEqual(split_front_matter(md), ({}, md))
+
+    def test_read_front_matter_leaves_body(self):
+        file = io.StringIO("---\ntitle: x\n---\n# Heading\n\nbody")
+        self.assertEqual(read_front_matter(file), {"title": "x"})
+        self.assertEqual(file.read(), "# Heading\n\nbody")
+
+    def test_read_front_matter_without_fence(self):
+        file = io.StringIO("# Heading\n\nbody")
+        self.assertEqual(read_front_matter(file), {})
+        self.assertEqual(file.read(), "# Heading\n\nbody")
+
+    def test_page_title(self):
+        self.assertEqual(page_title({"title": "Front"}, "# Heading"), "Front")
+        self.assertEqual(page_title({}, "# Heading"), "Heading")
+
+    def test_template_fields(self):
+        self.assertEqual(template_fields({"tags": ["a", "b"], "date": "2024"}), {"tags": "a, b", "date": "2024"})
+
+    def test_read_metadata(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with_front = os.path.join(tmp, "a.md")
+            without_front = os.path.join(tmp, "b.md")
+            with open(with_front, "w") as file:
+                file.write("---\ntags: [x]\n---\n\n# From heading\n\nbody")
+            with open(without_front, "w") as file:
+                file.write("intro\n# Plain\n\nbody")
+            self.assertEqual(read_metadata(with_front), {"tags": ["x"], "title": "From heading"})
+            self.assertEqual(read_metadata(without_front), {"title": "Plain"})
+
+
+if __name__ == "__main__":
+    unittest.main()
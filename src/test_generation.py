@@ -0,0 +1,145 @@
+import multiprocessing
+import os
+import unittest
+
+import generation
+import images
+import search
+import template
+import writer
+from generation import find_pages, generate_page, generate_pages_recursive
+from tempsite import TempDirTestCase
+
+#
+class TestGeneratePages(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.template = self.write("template.html", "<title>{{ Title }}</title>\n{{ Content }}\n")
+        self.content = os.path.join(self.root, "content")
+        for i in range(6):
+            self.write(f"content/blog/post{i}/index.md", f"# Post {i}\n\nSome **bold** text in post {i}\n\n- a\n- list")
+        self.write("content/index.md", "# Home\n\n[a link](/blog/post0)")
+
+    def read_tree(self, root):
+        files = {}
+        for dir_path, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dir_path, filename)
+                with open(path, "rb") as file:
+                    files[os.path.relpath(path, root)] = file.read()
+        return files
+
+    def test_find_pages(self):
+        public = os.path.join(self.root, "public")
+        pages = find_pages(self.content, public)
+        self.assertEqual(len(pages), 7)
+        self.assertIn((os.path.join(self.content, "index.md"), os.path.join(public, "index.html")), pages)
+
+    def test_parallel_matches_serial(self):
+        serial = os.path.join(self.root, "serial")
+        parallel = os.path.join(self.root, "parallel")
+        self.assertEqual(generate_pages_recursive(self.content, self.template, serial), [])
+        self.assertEqual(generate_pages_recursive(self.content, self.template, parallel, workers=3), [])
+        self.assertEqual(self.read_tree(serial), self.read_tree(parallel))
+
+    def test_spawned_workers_get_the_build_settings(self):
+        self.write("content/tom.md", "# Tom\n\n![Tom](/images/tom.png)")
+        serial = os.path.join(self.root, "serial")
+        spawned = os.path.join(self.root, "spawned")
+        template.minify = True
+        images.enable(self.root, serial, os.path.join(self.root, "cache"), os.path.join(self.root, "images.json"))
+        images.active.images["/images/tom.png"] = images.ImageInfo("/images/tom.png", 640, 480)
+        index = search.enable(serial)
+        method = multiprocessing.get_start_method()
+        # Spawned workers don't inherit module globals such as template.minify or images.active
+        multiprocessing.set_start_method("spawn", force=True)
+        try:
+            self.assertEqual(generate_pages_recursive(self.content, self.template, serial), [])
+            serial_pages = index.pages
+            index = search.enable(serial)
+            self.assertEqual(generate_pages_recursive(self.content, self.template, spawned, workers=2), [])
+        finally:
+            multiprocessing.set_start_method(method, force=True)
+            template.minify = False
+            images.disable()
+            search.disable()
+        self.assertEqual(self.read_tree(serial), self.read_tree(spawned))
+        self.assertNotIn(b"\n", self.read_tree(serial)["index.html"])
+        self.assertIn(b'width="640" height="480"', self.read_tree(serial)["tom.html"])
+        self.assertEqual(index.pages.keys(), serial_pages.keys())
+
+    def test_writer_pipeline_matches_direct_writes(self):
+        direct = os.path.join(self.root, "direct")
+        generate_pages_recursive(self.content, self.template, direct)
+        writer.enable(threads=2, max_pending=2)
+        try:
+            for workers in (1, 3):
+                piped = os.path.join(self.root, f"piped{workers}")
+                self.assertEqual(generate_pages_recursive(self.content, self.template, piped, workers=workers), [])
+                self.assertEqual(self.read_tree(direct), self.read_tree(piped))
+            self.assertEqual(len(writer.active.written), 14)
+        finally:
+            writer.disable()
+
+    def test_parallel_reports_failures(self):
+        bad = self.write("content/blog/bad/index.md", "no title here")
+        public = os.path.join(self.root, "public")
+        failures = generate_pages_recursive(self.content, self.template, public, workers=3)
+        self.assertEqual([from_path for from_path, _ in failures], [bad])
+        self.assertEqual(len(self.read_tree(public)), 7)
+
+    def test_serial_reports_failures(self):
+        bad = self.write("single/bad.md", "no title here")
+        public = os.path.join(self.root, "public")
+        for workers in (1, 4):
+            # A single page to generate never reaches the process pool
+            failures = generate_pages_recursive(os.path.dirname(bad), self.template, public, workers=workers)
+            self.assertEqual([from_path for from_path, _ in failures], [bad])
+        self.assertEqual(self.read_tree(public), {})
+
+    def test_streaming_matches_in_memory(self):
+        source = os.path.join(self.content, "blog", "post1", "index.md")
+        in_memory = os.path.join(self.root, "a.html")
+        streamed = os.path.join(self.root, "b.html")
+        generate_page(source, self.template, in_memory)
+        threshold = generation.STREAM_THRESHOLD
+        generation.STREAM_THRESHOLD = 0
+        try:
+            generate_page(source, self.template, streamed)
+        finally:
+            generation.STREAM_THRESHOLD = threshold
+        with open(in_memory) as a, open(streamed) as b:
+            self.assertEqual(a.read(), b.read())
+
+    def test_front_matter(self):
+        template = self.write("fields.html", "<title>{{ Title }}</title><p>{{ date }} {{ tags }}</p>{{ Content }}")
+        source = self.write("content/fm.md", "---\ntitle: From front matter\ndate: 2024-05-01\ntags: [a, b]\n---\n# Heading\n\nbody")
+        for threshold in [generation.STREAM_THRESHOLD, 0]:
+            dest = os.path.join(self.root, f"fm{threshold}.html")
+            generation.STREAM_THRESHOLD, saved = threshold, generation.STREAM_THRESHOLD
+            try:
+                generate_page(source, template, dest)
+            finally:
+                generation.STREAM_THRESHOLD = saved
+            with open(dest) as file:
+                self.assertEqual(
+                    file.read(),
+                    "<title>From front matter</title><p>2024-05-01 a, b</p><div><h1>Heading</h1><p>body</p></div>",
+                )
+
+    def test_fields_missing_without_front_matter(self):
+        template = self.write("fields.html", "<title>{{ Title }}</title><p>{{ date }}</p>{{ Content }}")
+        source = self.write("content/plain.md", "# Plain\n\nbody")
+        for threshold in [generation.STREAM_THRESHOLD, 0]:
+            dest = os.path.join(self.root, f"plain{threshold}.html")
+            generation.STREAM_THRESHOLD, saved = threshold, generation.STREAM_THRESHOLD
+            try:
+                generate_page(source, template, dest)
+            finally:
+                generation.STREAM_THRESHOLD = saved
+            with open(dest) as file:
+                self.assertEqual(file.read(), "<title>Plain</title><p></p><div><h1>Plain</h1><p>body</p></div>")
+
+
+if __name__ == "__main__":
+    unittest.main()
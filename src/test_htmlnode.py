@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from htmlnode import *
@@ -84,5 +85,34 @@ class TestParentNode(unittest.TestCase):
         )
         self.assertEqual(parent_a.to_html(), '<p><p><b>This is bold!</b>No tag here!</p><p><b>This is bold!</b>No tag here!</p></p>')
 
+    def test_props_to_html_keeps_order(self):
+        node = HTMLNode("img", "", None, {"src": "/a.png", "alt": "A", "width": "10"})
+        self.assertEqual(node.props_to_html(), ' src="/a.png" alt="A" width="10"')
+
+    def test_write_html_streams_to_file(self):
+        node = ParentNode(
+            "ul",
+            [
+                ParentNode("li", [LeafNode(None, "one "), LeafNode("a", "link", {"href": "/x"})]),
+                ParentNode("li", [ParentNode("p", [LeafNode("b", "two")])]),
+            ]
+        )
+        buffer = io.StringIO()
+        node.write_html(buffer.write)
+        self.assertEqual(buffer.getvalue(), '<ul><li>one <a href="/x">link</a></li><li><p><b>two</b></p></li></ul>')
+        self.assertEqual(node.to_html(), buffer.getvalue())
+
+    def test_nodes_have_no_instance_dict(self):
+        for node in [HTMLNode(), LeafNode("b", "x"), ParentNode("p", [])]:
+            self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_repr(self):
+        node = LeafNode("a", "link", {"href": "/x"})
+        self.assertEqual(repr(node), 'HTMLNode("a", "link", None, {\'href\': \'/x\'})')
+
+    def test_html_node_write_html_not_implemented(self):
+        with self.assertRaises(NotImplementedError):
+            HTMLNode("p", "text").to_html()
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,130 @@
+import os
+import struct
+import unittest
+import zlib
+
+import images
+from convertnodes import text_node_to_html_node
+from images import ImageCatalog, read_image_size
+from shards import shard_of
+from tempsite import TempDirTestCase
+from textnode import TextNode, TextType
+
+
+def png_bytes(width, height):
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", len(header)) + b"IHDR" + header + struct.pack(">I", zlib.crc32(b"IHDR" + header))
+
+
+# Stands in for PIL.Image: "encodes" a variant as a text file naming its size
+class FakeImage():
+    LANCZOS = 1
+    calls = 0
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.mode = "RGB"
+        self.info = {}
+
+    @classmethod
+    def open(cls, path):
+        return cls(*read_image_size(path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def resize(self, size, resample):
+        return FakeImage(*size)
+
+    def save(self, path, format, **options):
+        with open(path, "w") as file:
+            file.write(f"{format} {self.width}x{self.height}")
+
+#
+class TestImages(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.root, "static")
+        self.public = os.path.join(self.root, "public")
+        self.write("static/images/wide.png", png_bytes(1200, 600))
+        self.write("static/images/small.png", png_bytes(300, 200))
+        self.write("static/index.css", b"body {}")
+
+    def tearDown(self):
+        images.disable()
+        if hasattr(self, "pillow"):
+            images.Image = self.pillow
+
+    def catalog(self):
+        return ImageCatalog(self.static, self.public, os.path.join(self.root, "cache"), os.path.join(self.root, "images.json"))
+
+    def test_read_image_size(self):
+        self.assertEqual(read_image_size(os.path.join(self.static, "images", "wide.png")), (1200, 600))
+        gif = self.write("static/a.gif", b"GIF89a" + struct.pack("<HH", 16, 9) + b"\x00" * 8)
+        self.assertEqual(read_image_size(gif), (16, 9))
+        jpeg = self.write("static/a.jpg", b"\xff\xd8" + b"\xff\xe0\x00\x04\x00\x00" + b"\xff\xc0\x00\x11\x08" + struct.pack(">HH", 480, 640) + b"\x00" * 12)
+        self.assertEqual(read_image_size(jpeg), (640, 480))
+        webp = self.write("static/a.webp", b"RIFF\x00\x00\x00\x00WEBPVP8X" + b"\x00" * 8 + (99).to_bytes(3, "little") + (49).to_bytes(3, "little"))
+        self.assertEqual(read_image_size(webp), (100, 50))
+        self.assertIsNone(read_image_size(os.path.join(self.static, "index.css")))
+
+    def test_dimensions_without_pillow(self):
+        self.pillow, images.Image = images.Image, None
+        images.active = self.catalog()
+        summary = images.active.build()
+        self.assertEqual(summary.images, 2)
+        node = text_node_to_html_node(TextNode("wide", TextType.IMAGE, "/images/wide.png"))
+        self.assertEqual(node.to_html(), '<img src="/images/wide.png" alt="wide" width="1200" height="600"></img>')
+        node = text_node_to_html_node(TextNode("elsewhere", TextType.IMAGE, "https://example.com/a.png"))
+        self.assertEqual(node.to_html(), '<img src="https://example.com/a.png" alt="elsewhere"></img>')
+
+    def test_variants_are_cached_by_source_hash(self):
+        self.pillow, images.Image = images.Image, FakeImage
+        catalog = self.catalog()
+        summary = catalog.build(workers=2)
+        self.assertEqual((summary.generated, summary.cached, len(summary.added)), (4, 0, 4))
+        self.assertEqual(
+            catalog.props("/images/wide.png", "wide")["srcset"],
+            "/images/wide.png-480w.webp 480w, /images/wide.png-960w.webp 960w, /images/wide.png-1200w.webp 1200w",
+        )
+        with open(os.path.join(self.public, "images", "wide.png-480w.webp")) as file:
+            self.assertEqual(file.read(), "WEBP 480x240")
+
+        summary = self.catalog().build(workers=2)
+        self.assertEqual((summary.generated, summary.cached, len(summary.unchanged)), (0, 4, 4))
+
+        self.write("static/images/small.png", png_bytes(320, 200))
+        summary = self.catalog().build(workers=2)
+        self.assertEqual((summary.generated, summary.cached), (1, 3))
+
+    def test_variants_of_same_named_images_are_kept_apart(self):
+        self.pillow, images.Image = images.Image, FakeImage
+        self.write("static/images/wide.gif", png_bytes(800, 400))
+        catalog = self.catalog()
+        catalog.build()
+        self.assertEqual(catalog.props("/images/wide.gif", "wide")["srcset"], "/images/wide.gif-480w.webp 480w, /images/wide.gif-800w.webp 800w")
+        with open(os.path.join(self.public, "images", "wide.gif-800w.webp")) as file:
+            self.assertEqual(file.read(), "WEBP 800x400")
+        self.assertTrue(os.path.exists(os.path.join(self.public, "images", "wide.png-1200w.webp")))
+
+    def test_shards_only_place_their_own_variants(self):
+        self.pillow, images.Image = images.Image, FakeImage
+        shards = {rel: shard_of(os.path.join("images", rel), 3) for rel in ("wide.png", "small.png")}
+        for index in range(3):
+            catalog = self.catalog()
+            summary = catalog.build(shard=(index, 3))
+            # Every page of every shard renders the srcset of every image
+            self.assertEqual(len(catalog.props("/images/wide.png", "wide")["srcset"].split(", ")), 3)
+            self.assertEqual(len(catalog.props("/images/small.png", "small")["srcset"].split(", ")), 1)
+            placed = sorted(os.path.basename(path) for path in summary.added)
+            expected = sorted(path for path in ("wide.png-480w.webp", "wide.png-960w.webp", "wide.png-1200w.webp", "small.png-300w.webp")
+                              if shards[path.split("-")[0]] == index)
+            self.assertEqual(placed, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
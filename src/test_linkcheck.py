@@ -0,0 +1,92 @@
+import os
+import unittest
+
+import blockcache
+import linkcheck
+from generation import find_pages, generate_pages_recursive, index_pages
+from linkcheck import find_line, reference_candidates
+from tempsite import TempDirTestCase
+
+#
+class TestLinkCheck(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.public = os.path.join(self.root, "public")
+        self.template = self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.write("content/index.md", "# Home\n\n[Tom](/blog/tom) and [about](about.html)\n\n![logo](/images/logo.png)")
+        self.write("content/about.md", "# About\n\n[home](/) and [out](https://example.com)")
+        self.write("content/blog/tom/index.md", "# Tom\n\n[up](../../)\n\n[gone](/blog/bombadil)\n\n`[not a link](/nowhere)`")
+        self.checker = linkcheck.enable(self.public)
+
+    def tearDown(self):
+        linkcheck.disable()
+        blockcache.disable()
+
+    def outputs(self):
+        return [dest_path for _, dest_path in find_pages(self.content, self.public)] + [os.path.join(self.public, "images", "logo.png")]
+
+    def test_reference_candidates(self):
+        self.assertEqual(reference_candidates("/blog/tom", "/"), ["blog/tom", "blog/tom/index.html", "blog/tom.html"])
+        self.assertEqual(reference_candidates("../../", "/blog/tom/"), ["index.html"])
+        self.assertEqual(reference_candidates("tom.png#top", "/blog/"), ["blog/tom.png", "blog/tom.png/index.html", "blog/tom.png.html"])
+        self.assertEqual(reference_candidates("/a%20b.png", "/")[0], "a b.png")
+        self.assertIsNone(reference_candidates("https://example.com", "/"))
+        self.assertIsNone(reference_candidates("#section", "/"))
+
+    def test_find_line(self):
+        lines = ["# Title", "see /gone here", "[x](/gone)", "[y](/gone)"]
+        self.assertEqual(find_line(lines, "/gone"), 3)
+        self.assertEqual(find_line(lines, "/gone", 3), 4)
+        self.assertEqual(find_line(lines, "/missing"), None)
+
+    def test_references_are_collected_while_generating(self):
+        generate_pages_recursive(self.content, self.template, self.public)
+        page = self.checker.pages[os.path.join(self.content, "blog", "tom", "index.md")]
+        self.assertEqual(page["url"], "/blog/tom/")
+        # Code spans are not links
+        self.assertEqual(page["references"], [["link", "../../"], ["link", "/blog/bombadil"]])
+
+    def test_broken_references_are_reported_with_their_line(self):
+        generate_pages_recursive(self.content, self.template, self.public)
+        self.assertEqual(
+            self.checker.check(self.outputs()),
+            [(os.path.join(self.content, "blog", "tom", "index.md") + ":5", "broken link /blog/bombadil")],
+        )
+
+        os.remove(os.path.join(self.content, "about.md"))
+        self.checker.update(find_pages(self.content, self.public))
+        self.assertIn(
+            (os.path.join(self.content, "index.md") + ":3", "broken link about.html"),
+            self.checker.check(self.outputs()),
+        )
+
+    def test_block_cache_hits_are_checked(self):
+        self.write("content/copy.md", "# Tom\n\n[up](../../)\n\n[gone](/blog/bombadil)\n\n`[not a link](/nowhere)`")
+        blockcache.enable()
+        generate_pages_recursive(self.content, self.template, self.public)
+        self.assertGreater(blockcache.active.hits, 0)
+        pages = self.checker.pages
+        self.assertEqual(pages[os.path.join(self.content, "copy.md")]["references"], [["link", "../../"], ["link", "/blog/bombadil"]])
+
+    def test_parallel_workers_hand_back_their_pages(self):
+        generate_pages_recursive(self.content, self.template, self.public, workers=2)
+        self.assertEqual(len(self.checker.pages), 3)
+
+    def test_skipped_pages_keep_their_saved_references(self):
+        generate_pages_recursive(self.content, self.template, self.public)
+        cache_path = os.path.join(self.root, "links.json")
+        self.checker.save(cache_path)
+
+        checker = linkcheck.enable(self.public)
+        checker.load(cache_path)
+        self.assertEqual(checker.update(find_pages(self.content, self.public)), [])
+        self.assertEqual(checker.pages, self.checker.pages)
+
+        checker = linkcheck.enable(self.public)
+        index_pages(checker.update(find_pages(self.content, self.public)), self.public)
+        self.assertEqual(checker.pages, self.checker.pages)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import os
+import unittest
+
+from contentindex import ContentIndex, PageInfo, page_url, sort_pages
+from generation import find_pages
+from listings import generate_listings, listing_url, slugify, tag_slugs
+from manifest import Manifest
+from tempsite import TempDirTestCase
+
+#
+class TestContentIndex(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.public = os.path.join(self.root, "public")
+        self.template = self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.write("content/index.md", "# Home\n\nwelcome")
+        for i in range(5):
+            self.write(
+                f"content/blog/post{i}/index.md",
+                f"---\ndate: 2024-01-0{i + 1}\ntags: [{'even' if i % 2 == 0 else 'odd'}, all]\n---\n# Post {i}\n\none two three",
+            )
+
+    def read(self, path):
+        with open(os.path.join(self.public, path)) as file:
+            return file.read()
+
+    def build_index(self, cache_path=None):
+        return ContentIndex().build(find_pages(self.content, self.public), self.public, cache_path)
+
+    def test_page_url(self):
+        self.assertEqual(page_url(os.path.join(self.public, "blog", "tom", "index.html"), self.public), "/blog/tom/")
+        self.assertEqual(page_url(os.path.join(self.public, "index.html"), self.public), "/")
+        self.assertEqual(page_url(os.path.join(self.public, "about.html"), self.public), "/about.html")
+
+    def test_index(self):
+        index = self.build_index()
+        self.assertEqual([page.title for page in index.section("blog")], ["Post 4", "Post 3", "Post 2", "Post 1", "Post 0"])
+        self.assertEqual(index.section("blog")[0].word_count, 5)
+        self.assertEqual(sorted(index.tags()), ["all", "even", "odd"])
+        self.assertEqual(len(index.tags()["even"]), 3)
+
+    def test_sort_pages_undated_last(self):
+        pages = [PageInfo("a", "/a", "B"), PageInfo("b", "/b", "A"), PageInfo("c", "/c", "C", "2024")]
+        self.assertEqual([page.title for page in sort_pages(pages)], ["C", "A", "B"])
+
+    def test_index_cache(self):
+        cache_path = os.path.join(self.root, "index.json")
+        first = self.build_index(cache_path)
+        second = self.build_index(cache_path)
+        self.assertEqual(first.pages, second.pages)
+
+    def test_listing_pages(self):
+        written = generate_listings(self.build_index(), ["blog"], self.template, self.public, page_size=2)
+        self.assertEqual(len(written), 3 + 1 + 2 + 3)
+        first = self.read("blog/index.html")
+        self.assertTrue(first.startswith("<title>Blog</title>"))
+        self.assertIn('<a href="/blog/post4/">Post 4</a> 2024-01-05 (5 words)', first)
+        self.assertIn('<a href="/blog/page/2/">Older posts</a>', first)
+        last = self.read("blog/page/3/index.html")
+        self.assertIn("Post 0", last)
+        self.assertIn('<a href="/blog/page/2/">Newer posts</a>', last)
+        self.assertIn("Post 3", self.read(f"tags/{slugify('odd')}/index.html"))
+
+    def test_listing_url(self):
+        self.assertEqual(listing_url("/blog/", 1), "/blog/")
+        self.assertEqual(listing_url("/blog/", 3), "/blog/page/3/")
+
+    def test_edit_rebuilds_only_listing_pages_containing_post(self):
+        manifest_path = os.path.join(self.root, "manifest.json")
+        manifest = Manifest(manifest_path)
+        generate_listings(self.build_index(), ["blog"], self.template, self.public, manifest, page_size=2)
+        manifest.save()
+
+        self.write(
+            "content/blog/post0/index.md",
+            "---\ndate: 2024-01-01\ntags: [even, all]\n---\n# Post 0 renamed\n\none two three",
+        )
+        manifest = Manifest(manifest_path)
+        manifest.load()
+        written = generate_listings(self.build_index(), ["blog"], self.template, self.public, manifest, page_size=2)
+        rewritten = sorted(os.path.relpath(path, self.public) for path in written)
+        self.assertEqual(rewritten, [
+            os.path.join("blog", "page", "3", "index.html"),
+            os.path.join("tags", "all", "page", "3", "index.html"),
+            os.path.join("tags", "even", "page", "2", "index.html"),
+        ])
+
+    def test_tag_slugs(self):
+        self.assertEqual(slugify("Hello, World"), "hello-world")
+        self.assertEqual(slugify("été"), "été")
+        slugs = tag_slugs(["C", "C++", "++", "été"])
+        self.assertEqual((slugs["C"], slugs["été"]), ("c", "été"))
+        self.assertRegex(slugs["C++"], r"^c-[0-9a-f]{8}$")
+        self.assertRegex(slugs["++"], r"^[0-9a-f]{8}$")
+        self.assertEqual(tag_slugs(["C++", "Java"])["C++"], "c")
+
+    def test_clashing_tags_get_their_own_listings(self):
+        self.write("content/c.md", "---\ntags: [C, \"C++\", \"++\"]\n---\n# C\n\nc")
+        self.write("content/cpp.md", "---\ntags: [\"C++\"]\n---\n# Cpp\n\ncpp")
+        written = generate_listings(self.build_index(), [], self.template, self.public)
+        self.assertEqual(len(written), len(set(written)))
+        self.assertNotIn(os.path.join(self.public, "tags", "index.html"), written)
+        slugs = tag_slugs(["C", "C++", "++"])
+        self.assertNotIn("Cpp", self.read(f"tags/{slugs['C']}/index.html"))
+        self.assertIn("Cpp", self.read(f"tags/{slugs['C++']}/index.html"))
+        self.assertIn("Tagged ++", self.read(f"tags/{slugs['++']}/index.html"))
+
+    def test_section_with_own_index_page_is_skipped(self):
+        self.write("content/blog/index.md", "# My blog\n\nhand written")
+        written = generate_listings(self.build_index(), ["blog"], self.template, self.public)
+        self.assertFalse(any(path.endswith(os.path.join("blog", "index.html")) for path in written))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import contextlib
+import io
+import os
+import unittest
+
+import linkcheck
+import main
+from main import parse_arguments
+from tempsite import TempDirTestCase
+
+#
+class TestParseArguments(unittest.TestCase):
+    def test_shard_paths(self):
+        args, paths = parse_arguments(["build", "--shard", "1/3", "--write-if-changed", "--profile"])
+        self.assertEqual(paths.dir_path_public, os.path.join(main.dir_path_shards, "1-of-3", "public"))
+        self.assertEqual(args.write_if_changed, os.path.join(main.dir_path_shards, "1-of-3", ".cache", "changes.json"))
+        self.assertEqual(args.profile, os.path.join(main.dir_path_shards, "1-of-3", ".cache", "profile.json"))
+
+    def test_defaults(self):
+        args, paths = parse_arguments(["--write-if-changed", "out.json", "--workers", "0"])
+        self.assertEqual(paths.dir_path_public, main.dir_path_public)
+        self.assertEqual(args.write_if_changed, "out.json")
+        self.assertIsNone(args.profile)
+        self.assertGreaterEqual(args.workers, 1)
+
+    def test_invalid_combinations(self):
+        for argv in (["serve", "--shard", "0/2"], ["why-rebuild"]):
+            with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+                parse_arguments(argv)
+
+
+#
+class TestMain(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.write("content/index.md", "# Home\n\n[Tom](/blog/tom)")
+        self.write("content/blog/tom.md", "# Tom\n\nhello")
+        self.write("content/blog/sam.md", "# Sam\n\nhello")
+        self.write("static/style.css", "body {}")
+        cwd = os.getcwd()
+        os.chdir(self.root)
+        self.addCleanup(os.chdir, cwd)
+
+    def tearDown(self):
+        linkcheck.disable()
+
+    def run_main(self, *argv):
+        with contextlib.redirect_stdout(io.StringIO()):
+            main.main(list(argv))
+
+    def outputs(self, dir_path):
+        found = {}
+        for dir_path_walked, _, filenames in os.walk(dir_path):
+            for filename in filenames:
+                path = os.path.join(dir_path_walked, filename)
+                with open(path) as file:
+                    found[os.path.relpath(path, dir_path)] = file.read()
+        return found
+
+    def test_shard_builds_merge_into_the_full_site(self):
+        self.run_main("build", "--check-links")
+        full = self.outputs("public")
+        self.assertIn(os.path.join("blog", "tom.html"), full)
+        for index in range(2):
+            self.run_main("build", "--shard", f"{index}/2", "--check-links", "--write-if-changed")
+            self.assertTrue(os.path.exists(os.path.join("shards", f"{index}-of-2", ".cache", "changes.json")))
+        self.run_main("merge", "--check-links")
+        self.assertEqual(self.outputs("public"), full)
+
+
+if __name__ == "__main__":
+    unittest.main()
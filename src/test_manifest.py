@@ -0,0 +1,107 @@
+import json
+import os
+import unittest
+
+from manifest import Manifest, hash_file, hash_strings, write_changes
+from copystatic import sync_files
+from generation import generate_pages_recursive
+from tempsite import TempDirTestCase
+
+#
+class TestManifest(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.manifest_path = os.path.join(self.root, "cache", "manifest.json")
+
+    def test_hash_file(self):
+        path = self.write("a.txt", "hello")
+        self.assertEqual(hash_file(path), hash_file(path))
+        self.assertNotEqual(hash_file(path), hash_strings("hello"))
+
+    def test_round_trip(self):
+        output = self.write("out.html", "x")
+        manifest = Manifest(self.manifest_path)
+        manifest.record("in.md", "abc", output)
+        manifest.save()
+
+        loaded = Manifest(self.manifest_path)
+        loaded.load()
+        self.assertTrue(loaded.is_unchanged("in.md", "abc", output))
+        self.assertFalse(loaded.is_unchanged("in.md", "def", output))
+        self.assertFalse(loaded.is_unchanged("other.md", "abc", output))
+
+    def test_missing_output_is_changed(self):
+        manifest = Manifest(self.manifest_path)
+        manifest.entries = {"in.md": {"hash": "abc", "output": os.path.join(self.root, "gone.html")}}
+        self.assertFalse(manifest.is_unchanged("in.md", "abc", os.path.join(self.root, "gone.html")))
+
+    def test_remove_stale(self):
+        kept = self.write("kept.html", "x")
+        stale = self.write("stale.html", "x")
+        manifest = Manifest(self.manifest_path)
+        manifest.entries = {
+            "kept.md": {"hash": "1", "output": kept},
+            "stale.md": {"hash": "2", "output": stale},
+        }
+        manifest.record("kept.md", "1", kept)
+        self.assertEqual(manifest.remove_stale(), [stale])
+        self.assertTrue(os.path.exists(kept))
+        self.assertFalse(os.path.exists(stale))
+
+    def test_incremental_build(self):
+        template = self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.write("content/index.md", "# Home\n\nhello")
+        post = self.write("content/blog/post.md", "# Post\n\nworld")
+        self.write("static/style.css", "body {}")
+        content = os.path.join(self.root, "content")
+        static = os.path.join(self.root, "static")
+        public = os.path.join(self.root, "public")
+
+        manifest = Manifest(self.manifest_path)
+        sync_files(static, public, manifest)
+        generate_pages_recursive(content, template, public, manifest)
+        manifest.remove_stale()
+        manifest.save()
+
+        index_html = os.path.join(public, "index.html")
+        post_html = os.path.join(public, "blog", "post.html")
+        index_mtime = os.stat(index_html).st_mtime_ns
+        self.write("content/blog/post.md", "# Post\n\nchanged")
+        os.remove(os.path.join(self.root, "static", "style.css"))
+
+        manifest = Manifest(self.manifest_path)
+        manifest.load()
+        sync_files(static, public, manifest)
+        generate_pages_recursive(content, template, public, manifest)
+        manifest.remove_stale()
+        manifest.save()
+
+        self.assertEqual(os.stat(index_html).st_mtime_ns, index_mtime)
+        with open(post_html) as file:
+            self.assertIn("<p>changed</p>", file.read())
+        self.assertFalse(os.path.exists(os.path.join(public, "style.css")))
+
+    def test_remove_untracked(self):
+        public = os.path.join(self.root, "public")
+        kept = self.write("public/index.html", "kept")
+        self.write("public/old/page.html", "old")
+        manifest = Manifest(self.manifest_path)
+        manifest.record("index.md", "abc", kept)
+        self.assertEqual(manifest.remove_untracked(public), [os.path.join(public, "old", "page.html")])
+        self.assertEqual(os.listdir(public), ["index.html"])
+
+    def test_write_changes(self):
+        public = os.path.join(self.root, "public")
+        path = os.path.join(self.root, "changes.json")
+        changes = write_changes(
+            path, public, [os.path.join(public, "b", "new.html")], [os.path.join(public, "index.html")], [], 3
+        )
+        with open(path) as file:
+            self.assertEqual(json.load(file), changes)
+        self.assertEqual(changes["added"], ["b/new.html"])
+        self.assertEqual(changes["modified"], ["index.html"])
+        self.assertEqual(changes["unchanged"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
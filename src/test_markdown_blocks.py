@@ -1,3 +1,4 @@
+import io
 import unittest
 from markdown_blocks import *
 
@@ -160,6 +161,27 @@ this is paragraph text
             "<div><pre><code>This is a code block\n</code></pre><p>this is paragraph text</p></div>",
         )
 
+class TestStreamingBlocks(unittest.TestCase):
+    md = "\n# Title\n\n\n\nSome **bold**\ntext\n\n  \n\n- a\n- b\n\n```\ncode\n```\n\n\n> quote\n"
+
+    def test_iter_markdown_blocks_matches_split(self):
+        for read_size in range(1, len(self.md) + 2):
+            blocks = list(iter_markdown_blocks(io.StringIO(self.md), read_size))
+            self.assertEqual(blocks, markdown_to_blocks(self.md), read_size)
+
+    def test_write_markdown_html_matches_to_html(self):
+        chunks = []
+        write_markdown_html(io.StringIO(self.md), chunks.append)
+        self.assertEqual("".join(chunks), markdown_to_html_node(self.md).to_html())
+
+    def test_extract_title_from_file(self):
+        md = "\n   #   Leading whitespace\nbody\n# Second\n"
+        self.assertEqual(extract_title_from_file(io.StringIO(md)), extract_title(md))
+
+    def test_extract_title_from_file_no_h1(self):
+        with self.assertRaises(Exception):
+            extract_title_from_file(io.StringIO("## not h1\ntext"))
+
 class TestExtractMarkdown(unittest.TestCase):
     def test_extractTitle_valid(self):
         input = "# This is the header!\nThis is not a header!\nThis is also not a header!"
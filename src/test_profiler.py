@@ -0,0 +1,51 @@
+import json
+import os
+import tempfile
+import unittest
+
+import profiler
+from markdown_blocks import markdown_to_html_node
+
+#
+class TestProfiler(unittest.TestCase):
+    def tearDown(self):
+        profiler.disable()
+
+    def test_stage_is_noop_when_disabled(self):
+        with profiler.stage("read"):
+            pass
+        self.assertIsNone(profiler.active)
+
+    def test_stage_and_block_timing(self):
+        active = profiler.enable()
+        with profiler.stage("parse"):
+            markdown_to_html_node("# Title\n\nsome text\n\n- a\n- b\n\nmore text")
+        with profiler.stage("parse"):
+            pass
+        self.assertEqual(active.stages["parse"][1], 2)
+        self.assertEqual(active.blocks["paragraph"][1], 2)
+        self.assertEqual(active.blocks["heading"][1], 1)
+        self.assertEqual(active.blocks["unordered_list"][1], 1)
+
+    def test_merge_and_report(self):
+        active = profiler.enable()
+        active.add_page("a.md", 0.5)
+        worker = profiler.Profiler()
+        worker.add_stage("write", 0.25)
+        worker.add_page("b.md", 2.0)
+        active.merge(worker.to_dict())
+        self.assertEqual([path for path, _ in active.slowest_pages()], ["b.md", "a.md"])
+        self.assertIn("b.md", active.format_table(1))
+        self.assertNotIn("a.md", active.format_table(1))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "profile.json")
+            active.write_report(path)
+            with open(path) as file:
+                report = json.load(file)
+        self.assertEqual(report["stages"]["write"], {"seconds": 0.25, "calls": 1})
+        self.assertEqual(report["pages"][0], {"path": "b.md", "seconds": 2.0})
+
+
+if __name__ == "__main__":
+    unittest.main()
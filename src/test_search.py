@@ -0,0 +1,108 @@
+import json
+import os
+import unittest
+
+import blockcache
+import search
+from generation import find_pages, generate_pages_recursive, index_pages
+from manifest import Manifest
+from tempsite import TempDirTestCase
+
+#
+class TestSearchIndex(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.public = os.path.join(self.root, "public")
+        self.template = self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.write("content/index.md", "# Home\n\nThe **shire** and the [hobbits](/blog/hobbits)")
+        self.write("content/blog/hobbits/index.md", "# Hobbits\n\nHobbits live in the Shire\n\n- second breakfast")
+        self.index = search.enable(self.public)
+
+    def tearDown(self):
+        search.disable()
+        blockcache.disable()
+
+    def read(self, name):
+        with open(os.path.join(self.public, "search", name)) as file:
+            return json.load(file)
+
+    def test_tokenize(self):
+        self.assertEqual(search.tokenize("The Shire's hobbits, 2 of them"), ["the", "shire", "s", "hobbits", "2", "of", "them"])
+        self.assertEqual(search.shard_key("hobbits"), "ho")
+        self.assertEqual(search.shard_key("2"), "2")
+
+    def test_pages_are_indexed_while_generating(self):
+        generate_pages_recursive(self.content, self.template, self.public)
+        home = self.index.pages[os.path.join(self.content, "index.md")]
+        self.assertEqual(home["url"], "/")
+        self.assertEqual(home["terms"]["the"], [1, 4])
+        self.assertEqual(home["terms"]["hobbits"], [5])
+
+    def test_written_shards(self):
+        generate_pages_recursive(self.content, self.template, self.public)
+        manifest = Manifest(os.path.join(self.root, "manifest.json"))
+        self.index.write(manifest)
+
+        docs = self.read("docs.json")
+        self.assertEqual(docs["docs"], [["/blog/hobbits/", "Hobbits"], ["/", "Home"]])
+        self.assertIn("sh", docs["shards"])
+        # [document, first position, position deltas...]
+        self.assertEqual(self.read("th.json")["the"], [[0, 4], [1, 1, 3]])
+        self.assertEqual(self.read("sh.json")["shire"], [[0, 5], [1, 2]])
+        outputs = set(entry["output"] for entry in manifest.current.values())
+        self.assertEqual(outputs, set(self.index.shard_path(key) for key in docs["shards"]) | {os.path.join(self.public, "search", "docs.json")})
+
+    def test_block_cache_hits_are_indexed(self):
+        self.write("content/other.md", "# Hobbits\n\nHobbits live in the Shire\n\n- second breakfast")
+        blockcache.enable()
+        generate_pages_recursive(self.content, self.template, self.public)
+        self.assertGreater(blockcache.active.hits, 0)
+        pages = self.index.pages
+        self.assertEqual(pages[os.path.join(self.content, "other.md")]["terms"], pages[os.path.join(self.content, "blog", "hobbits", "index.md")]["terms"])
+
+    def test_parallel_workers_hand_back_their_pages(self):
+        generate_pages_recursive(self.content, self.template, self.public, workers=2)
+        self.assertEqual(len(self.index.pages), 2)
+
+    def test_only_changed_shards_are_rewritten(self):
+        generate_pages_recursive(self.content, self.template, self.public)
+        self.index.write()
+        cache_path = os.path.join(self.root, "search.json")
+        self.index.save(cache_path)
+
+        index = search.enable(self.public)
+        index.load(cache_path)
+        self.write("content/blog/hobbits/index.md", "# Hobbits\n\nHobbits live in the Shire\n\n- second breakfast\n- elevenses")
+        generate_pages_recursive(self.content, self.template, self.public)
+        # The new term's shard, and docs.json to list it
+        self.assertEqual([os.path.basename(path) for path in index.write()], ["el.json", "docs.json"])
+
+        self.write("content/blog/hobbits/index.md", "# Hobbits\n\nHobbits live in the Shire\n\n- elevenses\n- second breakfast")
+        generate_pages_recursive(self.content, self.template, self.public)
+        self.assertEqual([os.path.basename(path) for path in index.write()], ["br.json", "el.json", "se.json"])
+        self.assertEqual(index.write(), [])
+
+    def test_removed_pages_leave_the_index(self):
+        generate_pages_recursive(self.content, self.template, self.public)
+        self.index.write()
+        os.remove(os.path.join(self.content, "index.md"))
+        self.assertEqual(self.index.update(find_pages(self.content, self.public)), [])
+        manifest = Manifest(os.path.join(self.root, "manifest.json"))
+        self.index.write(manifest)
+        self.assertEqual(self.read("docs.json")["docs"], [["/blog/hobbits/", "Hobbits"]])
+        self.assertEqual(self.read("th.json")["the"], [[0, 4]])
+        # Shards only the removed page used are left for the manifest to remove as stale
+        self.assertNotIn("an", self.read("docs.json")["shards"])
+        self.assertNotIn(self.index.shard_path("an"), [entry["output"] for entry in manifest.current.values()])
+
+    def test_pages_without_an_entry_are_indexed(self):
+        generate_pages_recursive(self.content, self.template, self.public)
+        expected = self.index.pages
+        index = search.enable(self.public)
+        index_pages(index.update(find_pages(self.content, self.public)), self.public)
+        self.assertEqual(index.pages, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
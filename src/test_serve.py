@@ -0,0 +1,145 @@
+import os
+import unittest
+
+from contentindex import ContentIndex
+from copystatic import sync_files
+from generation import find_pages
+from listings import generate_listings
+from manifest import Manifest
+from serve import SiteWatcher, diff_files
+from tempsite import TempDirTestCase
+
+#
+class TestSiteWatcher(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.template = self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.write("content/index.md", "# Home\n\nhello")
+        self.write("content/blog/post.md", "# Post\n\nworld")
+        self.write("static/style.css", "body {}")
+        self.public = os.path.join(self.root, "public")
+        self.watcher = SiteWatcher(
+            os.path.join(self.root, "content"),
+            os.path.join(self.root, "static"),
+            self.template,
+            self.public,
+        )
+        self.watcher.start()
+
+    def read(self, path):
+        with open(os.path.join(self.public, path)) as file:
+            return file.read()
+
+    def test_diff_files(self):
+        changed, removed = diff_files({"a": (1, 1), "b": (1, 1)}, {"a": (2, 1), "c": (1, 1)})
+        self.assertEqual(changed, ["a", "c"])
+        self.assertEqual(removed, ["b"])
+
+    def test_no_changes(self):
+        self.assertEqual(self.watcher.poll(), 0)
+
+    def test_rebuilds_only_changed_page(self):
+        self.write("content/blog/post.md", "# Post\n\nedited")
+        self.assertEqual(self.watcher.poll(), 1)
+        self.assertIn("<p>edited</p>", self.read("blog/post.html"))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "index.html")))
+
+    def test_removed_page_deletes_output(self):
+        self.write("content/blog/post.md", "# Post\n\nedited")
+        self.watcher.poll()
+        os.remove(os.path.join(self.root, "content", "blog", "post.md"))
+        self.assertEqual(self.watcher.poll(), 1)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "post.html")))
+
+    def test_removed_page_deletes_empty_output_directories(self):
+        self.write("content/contact/index.md", "# Contact")
+        self.write("static/contact/map.png", "PNG")
+        self.watcher.poll()
+        os.remove(os.path.join(self.root, "content", "contact", "index.md"))
+        self.watcher.poll()
+        # The static file still lives there
+        self.assertTrue(os.path.isdir(os.path.join(self.public, "contact")))
+        os.remove(os.path.join(self.root, "static", "contact", "map.png"))
+        self.watcher.poll()
+        self.assertFalse(os.path.exists(os.path.join(self.public, "contact")))
+        self.assertTrue(os.path.isdir(self.public))
+
+    def test_template_change_rebuilds_all_pages(self):
+        self.write("template.html", "<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertEqual(self.watcher.poll(), 2)
+        self.assertTrue(self.read("index.html").startswith("<h1>Home</h1>"))
+
+    def test_removed_page_deletes_output_on_template_change(self):
+        self.write("content/blog/post.md", "# Post\n\nedited")
+        self.watcher.poll()
+        os.remove(os.path.join(self.root, "content", "blog", "post.md"))
+        self.write("template.html", "<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertEqual(self.watcher.poll(), 2)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "post.html")))
+        self.assertTrue(self.read("index.html").startswith("<h1>Home</h1>"))
+
+    def test_listings_follow_content_changes(self):
+        watcher = SiteWatcher(
+            self.watcher.dir_path_content, self.watcher.dir_path_static, self.template, self.public,
+            listings=["blog"], content_index_path=os.path.join(self.root, "cache", "content_index.json"),
+        )
+        watcher.start()
+        self.write("content/blog/post.md", "---\ntags: [hobbits]\n---\n# Post\n\nworld")
+        # The page, the blog listing and the new tag listing
+        self.assertEqual(watcher.poll(), 3)
+        self.assertIn('<a href="/blog/post.html">Post</a>', self.read("blog/index.html"))
+        self.assertIn('<a href="/blog/post.html">Post</a>', self.read("tags/hobbits/index.html"))
+
+        self.write("content/blog/new.md", "# New\n\nhello")
+        self.assertEqual(watcher.poll(), 2)
+        self.assertIn('<a href="/blog/new.html">New</a>', self.read("blog/index.html"))
+
+        os.remove(os.path.join(self.root, "content", "blog", "post.md"))
+        watcher.poll()
+        self.assertNotIn("/blog/post.html", self.read("blog/index.html"))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "tags")))
+
+    def test_listings_of_the_build_are_not_rewritten(self):
+        cache = os.path.join(self.root, "cache")
+        manifest = Manifest(os.path.join(cache, "manifest.json"))
+        index = ContentIndex().build(find_pages(self.watcher.dir_path_content, self.public), self.public)
+        generate_listings(index, ["blog"], self.template, self.public, manifest)
+        manifest.save()
+        watcher = SiteWatcher(
+            self.watcher.dir_path_content, self.watcher.dir_path_static, self.template, self.public,
+            listings=["blog"], content_index_path=os.path.join(cache, "content_index.json"), manifest_path=manifest.path,
+        )
+        watcher.start()
+        # Same title and word count, the listing shows the same entry
+        self.write("content/blog/post.md", "# Post\n\nearth")
+        self.assertEqual(watcher.poll(), 1)
+
+    def test_static_change_copies_file(self):
+        self.write("static/style.css", "body { color: red }")
+        self.assertEqual(self.watcher.poll(), 1)
+        self.assertEqual(self.read("style.css"), "body { color: red }")
+
+    def test_hardlinked_static_file_edited_in_place(self):
+        watcher = SiteWatcher(self.watcher.dir_path_content, self.watcher.dir_path_static, self.template, self.public, "hardlink")
+        sync_files(watcher.dir_path_static, self.public, link="hardlink")
+        watcher.start()
+        with open(os.path.join(self.root, "static", "style.css"), "a") as file:
+            file.write(" p {}")
+        # The public copy is the same file, there is nothing left to transfer
+        self.assertEqual(watcher.poll(), 0)
+        self.assertEqual(self.read("style.css"), "body {} p {}")
+        self.write("static/new.css", "a {}")
+        self.assertEqual(watcher.poll(), 1)
+        self.assertTrue(os.path.samefile(os.path.join(self.root, "static", "new.css"), os.path.join(self.public, "new.css")))
+
+    def test_static_errors_are_reported(self):
+        os.makedirs(os.path.join(self.public, "style.css"))
+        self.write("static/style.css", "body { color: red }")
+        self.write("content/index.md", "# Home\n\nedited")
+        # The page is still rebuilt and the watcher keeps going
+        self.assertEqual(self.watcher.poll(), 1)
+        self.assertIn("<p>edited</p>", self.read("index.html"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import argparse
+import os
+import unittest
+
+from generation import find_pages, generate_pages_recursive
+from shards import find_shards, merge_shards, parse_shard, shard_dirs, shard_of
+from tempsite import TempDirTestCase
+
+#
+class TestShards(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.shards = os.path.join(self.root, "shards")
+        self.template = self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        for name in ("index", "about", "blog/tom", "blog/hobbits/index", "blog/bombadil", "contact"):
+            self.write(f"content/{name}.md", f"# {name}\n\nAbout {name}")
+
+    def outputs(self, dir_path):
+        found = {}
+        for root, _, files in os.walk(dir_path):
+            for name in files:
+                path = os.path.join(root, name)
+                with open(path, "r") as file:
+                    found[os.path.relpath(path, dir_path)] = file.read()
+        return found
+
+    def build_shards(self, count):
+        for index in range(count):
+            dir_path_public, _ = shard_dirs(self.shards, index, count)
+            generate_pages_recursive(self.content, self.template, dir_path_public, shard=(index, count))
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("0/3"), (0, 3))
+        self.assertEqual(parse_shard("2/3"), (2, 3))
+        for value in ("3/3", "1", "-1/3", "a/b", "0/0"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_shard(value)
+
+    def test_shards_partition_the_pages(self):
+        self.assertEqual(shard_of("blog/tom.md", 4), shard_of("blog/tom.md", 4))
+        self.assertEqual(shard_of(os.path.join("blog", "tom.md"), 4), shard_of("blog/tom.md", 4))
+        every = find_pages(self.content, os.path.join(self.root, "public"))
+        sharded = []
+        for index in range(3):
+            sharded.extend(find_pages(self.content, os.path.join(self.root, "public"), shard=(index, 3)))
+        self.assertEqual(sorted(sharded), sorted(every))
+
+    def test_missing_shards_are_refused(self):
+        with self.assertRaises(Exception):
+            find_shards(self.shards)
+        self.build_shards(3)
+        self.assertEqual(find_shards(self.shards), [(0, 3), (1, 3), (2, 3)])
+        os.rename(os.path.join(self.shards, "1-of-3"), os.path.join(self.root, "moved"))
+        with self.assertRaisesRegex(Exception, "1/3"):
+            find_shards(self.shards)
+        os.makedirs(os.path.join(self.shards, "1-of-2"))
+        with self.assertRaises(Exception):
+            find_shards(self.shards)
+
+    def test_merged_shards_match_a_full_build(self):
+        dir_path_full = os.path.join(self.root, "full")
+        generate_pages_recursive(self.content, self.template, dir_path_full)
+        self.build_shards(3)
+        dir_path_public = os.path.join(self.root, "public")
+        summary = merge_shards(self.shards, dir_path_public)
+        self.assertEqual(summary.copied_files, 6)
+        self.assertEqual(self.outputs(dir_path_public), self.outputs(dir_path_full))
+
+        # Merging again copies nothing when nothing changed
+        summary = merge_shards(self.shards, dir_path_public, write_if_changed=True)
+        self.assertEqual((summary.copied_files, summary.skipped_files), (0, 6))
+
+
+if __name__ == "__main__":
+    unittest.main()
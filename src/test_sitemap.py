@@ -0,0 +1,130 @@
+import os
+import unittest
+import xml.etree.ElementTree as ElementTree
+
+import sitemap
+from generation import find_pages, generate_pages_recursive
+from manifest import Manifest
+from tempsite import TempDirTestCase
+
+SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+
+#
+class TestSitemap(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.public = os.path.join(self.root, "public")
+        self.template = self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.write("content/index.md", "# Home & away\n\nwelcome")
+        for i in range(3):
+            self.write(f"content/blog/post{i}/index.md", f"---\ndate: 2024-01-0{i + 1}\n---\n# Post {i}\n\ntext")
+        self.collector = sitemap.enable(self.public, "https://example.com/")
+
+    def tearDown(self):
+        sitemap.disable()
+
+    def parse(self, name):
+        return ElementTree.parse(os.path.join(self.public, name)).getroot()
+
+    def test_pages_are_recorded_while_generating(self):
+        generate_pages_recursive(self.content, self.template, self.public)
+        self.assertEqual(
+            sorted(record.url for record in self.collector.pages.values()),
+            ["/", "/blog/post0/", "/blog/post1/", "/blog/post2/"],
+        )
+        record = self.collector.pages[os.path.join(self.content, "blog", "post1", "index.md")]
+        self.assertEqual((record.title, record.date), ("Post 1", "2024-01-02"))
+
+    def test_parallel_workers_hand_back_their_pages(self):
+        generate_pages_recursive(self.content, self.template, self.public, workers=2)
+        self.assertEqual(len(self.collector.pages), 4)
+
+    def test_sitemap_and_feeds(self):
+        generate_pages_recursive(self.content, self.template, self.public)
+        self.collector.add_listing("/tags/all/")
+        manifest = Manifest(os.path.join(self.root, "manifest.json"))
+        written = self.collector.write(manifest)
+        self.assertEqual([os.path.basename(path) for path in written], ["sitemap.xml", "feed.xml", "atom.xml"])
+        self.assertEqual(set(entry["output"] for entry in manifest.current.values()), set(written))
+
+        urls = self.parse("sitemap.xml").findall(f"{SITEMAP_NS}url")
+        self.assertEqual(
+            [url.find(f"{SITEMAP_NS}loc").text for url in urls],
+            ["https://example.com/", "https://example.com/blog/post0/", "https://example.com/blog/post1/",
+             "https://example.com/blog/post2/", "https://example.com/tags/all/"],
+        )
+        self.assertIsNotNone(urls[0].find(f"{SITEMAP_NS}lastmod"))
+        self.assertIsNone(urls[-1].find(f"{SITEMAP_NS}lastmod"))
+
+        # Only dated pages, newest first, named after the home page
+        channel = self.parse("feed.xml").find("channel")
+        self.assertEqual(channel.find("title").text, "Home & away")
+        self.assertEqual([item.find("title").text for item in channel.findall("item")], ["Post 2", "Post 1", "Post 0"])
+        self.assertEqual(channel.find("item/pubDate").text, "Wed, 03 Jan 2024 00:00:00 +0000")
+        entries = self.parse("atom.xml").findall(f"{ATOM_NS}entry")
+        self.assertEqual([entry.find(f"{ATOM_NS}id").text for entry in entries][0], "https://example.com/blog/post2/")
+
+        # Nothing changed, nothing differs
+        with open(os.path.join(self.public, "atom.xml")) as file:
+            atom = file.read()
+        self.collector.write()
+        with open(os.path.join(self.public, "atom.xml")) as file:
+            self.assertEqual(file.read(), atom)
+
+    def test_atom_authors(self):
+        self.write("content/blog/post1/index.md", "---\ndate: 2024-01-02\nauthor: Frodo\n---\n# Post 1\n\ntext")
+        generate_pages_recursive(self.content, self.template, self.public)
+        self.collector.write()
+        feed = self.parse("atom.xml")
+        # Without a feed author the site's title stands in
+        self.assertEqual(feed.find(f"{ATOM_NS}author/{ATOM_NS}name").text, "Home & away")
+        authors = [entry.find(f"{ATOM_NS}author/{ATOM_NS}name") for entry in feed.findall(f"{ATOM_NS}entry")]
+        self.assertEqual([author.text if author is not None else None for author in authors], [None, "Frodo", None])
+
+        self.write("content/index.md", "---\nauthor: Bilbo\n---\n# Home & away\n\nwelcome")
+        generate_pages_recursive(self.content, self.template, self.public)
+        self.collector.write()
+        self.assertEqual(self.parse("atom.xml").find(f"{ATOM_NS}author/{ATOM_NS}name").text, "Bilbo")
+        self.collector.author = "Sam"
+        self.collector.write()
+        self.assertEqual(self.parse("atom.xml").find(f"{ATOM_NS}author/{ATOM_NS}name").text, "Sam")
+
+    def test_large_sitemap_is_split_under_an_index(self):
+        generate_pages_recursive(self.content, self.template, self.public)
+        written = self.collector.write(max_urls=3)
+        self.assertEqual(
+            [os.path.basename(path) for path in written],
+            ["sitemap-1.xml", "sitemap-2.xml", "sitemap.xml", "feed.xml", "atom.xml"],
+        )
+        self.assertEqual(len(self.parse("sitemap-1.xml").findall(f"{SITEMAP_NS}url")), 3)
+        self.assertEqual(len(self.parse("sitemap-2.xml").findall(f"{SITEMAP_NS}url")), 1)
+        self.assertEqual(
+            [loc.text for loc in self.parse("sitemap.xml").iter(f"{SITEMAP_NS}loc")],
+            ["https://example.com/sitemap-1.xml", "https://example.com/sitemap-2.xml"],
+        )
+
+    def test_skipped_pages_keep_their_saved_record(self):
+        generate_pages_recursive(self.content, self.template, self.public)
+        cache_path = os.path.join(self.root, "pages.json")
+        self.collector.save(cache_path)
+
+        # The next build renders nothing, the records come from the cache
+        collector = sitemap.enable(self.public, "https://example.com")
+        collector.load(cache_path)
+        os.remove(os.path.join(self.content, "blog", "post0", "index.md"))
+        collector.update(find_pages(self.content, self.public))
+        self.assertEqual(sorted(record.url for record in collector.pages.values()), ["/", "/blog/post1/", "/blog/post2/"])
+        post1 = os.path.join(self.content, "blog", "post1", "index.md")
+        self.assertEqual(collector.pages[post1], self.collector.pages[post1])
+
+    def test_pages_without_a_record_are_read(self):
+        generate_pages_recursive(self.content, self.template, self.public)
+        collector = sitemap.enable(self.public, "https://example.com")
+        collector.update(find_pages(self.content, self.public))
+        self.assertEqual(collector.pages, self.collector.pages)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+
+import template
+from template import Template, load_template, minify_html
+
+#
+class TestTemplate(unittest.TestCase):
+    def test_render(self):
+        template = Template("<title> {{ Title }} </title>\n<body>{{ Content }}</body>")
+        self.assertEqual(
+            template.render({"Title": "Home", "Content": "<p>hi</p>"}),
+            "<title> Home </title>\n<body><p>hi</p></body>",
+        )
+
+    def test_placeholders(self):
+        template = Template("{{ Title }}{{date}}{{ Content }}{{ Title }}")
+        self.assertEqual(template.placeholders(), ["Title", "date", "Content", "Title"])
+
+    def test_missing_placeholder_renders_empty(self):
+        template = Template("<p>{{ author }}</p>{{ Content }}")
+        self.assertEqual(template.render({"Content": "x"}), "<p></p>x")
+        written = []
+        template.render_to(written.append, {"Content": "x"})
+        self.assertEqual("".join(written), "<p></p>x")
+
+    def test_missing_placeholder_kept_on_request(self):
+        template = Template("<p>{{ author }}</p>{{ Content }}")
+        self.assertEqual(template.render({"Content": "x"}, keep_missing=True), "<p>{{ author }}</p>x")
+        written = []
+        template.render_to(written.append, {"Content": "x"}, keep_missing=True)
+        self.assertEqual("".join(written), "<p>{{ author }}</p>x")
+
+    def test_no_placeholders(self):
+        template = Template("<html></html>")
+        self.assertEqual(template.render({"Title": "x"}), "<html></html>")
+
+    def test_values_not_reparsed(self):
+        template = Template("{{ Title }}|{{ Content }}")
+        self.assertEqual(template.render({"Title": "{{ Content }}", "Content": "c"}), "{{ Content }}|c")
+
+    def test_load_template_cached_until_changed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, "w") as file:
+                file.write("<b>{{ Title }}</b>")
+            first = load_template(path)
+            self.assertIs(load_template(path), first)
+
+            with open(path, "w") as file:
+                file.write("<i>{{ Title }}</i> changed")
+            second = load_template(path)
+            self.assertIsNot(second, first)
+            self.assertEqual(second.render({"Title": "x"}), "<i>x</i> changed")
+
+    def test_minify_html(self):
+        source = (
+            "<!DOCTYPE html>\n<html>\n  <head>\n    <title> {{ Title }} </title>\n  </head>\n"
+            "  <!-- layout -->\n  <body>\n    <p>a <b>b</b>\n      <i>c</i></p>\n"
+            "    <pre>  keep\n    this</pre>\n  </body>\n</html>\n"
+        )
+        self.assertEqual(
+            minify_html(source),
+            "<!DOCTYPE html><html><head><title> {{ Title }} </title></head><body>"
+            "<p>a <b>b</b> <i>c</i></p><pre>  keep\n    this</pre></body></html>",
+        )
+
+    def test_minify_keeps_attribute_whitespace(self):
+        source = '<p title="a   b">\n  x   y\n  <input value="  two  spaces" pattern="a b">\n</p>'
+        self.assertEqual(minify_html(source), '<p title="a   b"> x y <input value="  two  spaces" pattern="a b"></p>')
+
+    def test_load_template_minified(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, "w") as file:
+                file.write("<body>\n  <article>\n    {{ Content }}\n  </article>\n</body>\n")
+            template.minify = True
+            try:
+                minified = load_template(path)
+            finally:
+                template.minify = False
+            self.assertEqual(minified.render({"Content": "<p>x</p>"}), "<body><article> <p>x</p> </article></body>")
+            self.assertEqual(load_template(path).render({"Content": "x"}), "<body>\n  <article>\n    x\n  </article>\n</body>\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
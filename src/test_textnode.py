@@ -29,6 +29,13 @@ class TestTextNode(unittest.TestCase):
         node2 = TextNode("This is a text node", TextType.CODE, "https://boot.dev")
         self.assertNotEqual(node, node2)
 
+    def test_repr(self):
+        node = TextNode("This is a text node", TextType.LINK, "https://github.com")
+        self.assertEqual(repr(node), "TextNode(This is a text node, link, https://github.com)")
+
+    def test_no_instance_dict(self):
+        self.assertFalse(hasattr(TextNode("x", TextType.TEXT), "__dict__"))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,76 @@
+import os
+import unittest
+
+import writer
+from writer import OutputWriter, has_content, write_atomic
+from tempsite import TempDirTestCase
+
+#
+class TestOutputWriter(TempDirTestCase):
+    def tearDown(self):
+        writer.disable()
+
+    def read(self, path):
+        with open(path, "r") as file:
+            return file.read()
+
+    def test_write_atomic(self):
+        path = os.path.join(self.root, "page.html")
+        write_atomic(path, b"<p>one</p>")
+        write_atomic(path, b"<p>two</p>")
+        self.assertEqual(self.read(path), "<p>two</p>")
+        self.assertEqual(os.listdir(self.root), ["page.html"])
+        self.assertTrue(has_content(path, b"<p>two</p>"))
+        self.assertFalse(has_content(path, b"<p>one</p>"))
+        self.assertFalse(has_content(os.path.join(self.root, "missing.html"), b""))
+
+    def test_writes_everything_queued(self):
+        output = OutputWriter(threads=3, max_pending=2)
+        for i in range(50):
+            output.write(os.path.join(self.root, f"dir{i % 7}", f"page{i}.html"), f"<p>{i}</p>", f"page{i}.md")
+        self.assertEqual(output.close(), [])
+        for i in range(50):
+            self.assertEqual(self.read(os.path.join(self.root, f"dir{i % 7}", f"page{i}.html")), f"<p>{i}</p>")
+        self.assertEqual(len(output.written), 50)
+
+    def test_unchanged_keeps_mtime(self):
+        path = os.path.join(self.root, "page.html")
+        write_atomic(path, "<p>same</p>".encode())
+        os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+        output = OutputWriter(threads=1)
+        output.write(path, "<p>same</p>")
+        output.flush()
+        self.assertEqual(os.stat(path).st_mtime_ns, 1_000_000_000)
+        self.assertEqual(output.unchanged, [path])
+        output.write(path, "<p>changed</p>")
+        output.close()
+        self.assertNotEqual(os.stat(path).st_mtime_ns, 1_000_000_000)
+        self.assertEqual(output.written, [path])
+
+    def test_replace_streamed_output(self):
+        path = os.path.join(self.root, "page.html")
+        write_atomic(path, b"<p>same</p>")
+        os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+        output = OutputWriter(threads=0)
+        write_atomic(path + ".tmp", b"<p>same</p>")
+        output.replace(path + ".tmp", path)
+        self.assertEqual(os.stat(path).st_mtime_ns, 1_000_000_000)
+        write_atomic(path + ".tmp", b"<p>new</p>")
+        output.replace(path + ".tmp", path)
+        self.assertEqual(self.read(path), "<p>new</p>")
+        self.assertEqual(os.listdir(self.root), ["page.html"])
+        self.assertEqual((output.unchanged, output.written, output.added), ([path], [path], []))
+
+    def test_failures_name_the_source(self):
+        blocker = os.path.join(self.root, "blocker")
+        write_atomic(blocker, b"a file, not a directory")
+        output = OutputWriter(threads=2)
+        output.write(os.path.join(blocker, "page.html"), "<p>x</p>", "page.md")
+        output.write(os.path.join(self.root, "ok.html"), "<p>ok</p>", "ok.md")
+        failures = output.close()
+        self.assertEqual([source for source, _ in failures], ["page.md"])
+        self.assertEqual(output.written, [os.path.join(self.root, "ok.html")])
+
+
+if __name__ == "__main__":
+    unittest.main()
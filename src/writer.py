@@ -0,0 +1,164 @@
+import filecmp
+import os
+import queue
+import tempfile
+import threading
+
+# The output writer of the running build, None unless --writer-threads or --write-if-changed
+# was passed. Pages are then written in the background while the next ones are being parsed.
+active = None
+
+# Marks the end of the queue for one writer thread
+STOP = object()
+
+
+# True when the file at path already holds exactly content
+def has_content(path, content):
+    try:
+        if os.path.getsize(path) != len(content):
+            return False
+        with open(path, "rb") as file:
+            return file.read() == content
+    except FileNotFoundError:
+        return False
+
+
+# Replaces path with content in one step: readers see the old file or the new one, never
+# a partly written one. The temp file lives next to path so the rename stays on one filesystem.
+def write_atomic(path, content):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(content)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+# Pool of threads writing rendered outputs from a bounded queue. Files whose content is
+# unchanged are left alone so they keep their mtime, which keeps rsync and CDN uploads small.
+# The queue bound keeps parsing from running arbitrarily far ahead of the disk. With no
+# threads, outputs are compared and written straight away by the caller.
+class OutputWriter():
+    def __init__(self, threads=4, max_pending=64):
+        self.threads = threads
+        self.max_pending = max_pending
+        self.queue = queue.Queue(max_pending)
+        self.lock = threading.Lock()
+        self.directories = set()
+        self.written = []
+        self.added = []
+        self.unchanged = []
+        self.failures = []
+        self.workers = []
+        for _ in range(threads):
+            worker = threading.Thread(target=self.run, daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    # Queues content (str or bytes) for dest_path, blocking while the queue is full.
+    # source names the input the output was built from in failure reports.
+    def write(self, dest_path, content, source=None):
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        item = (dest_path, content, source or dest_path)
+        if self.workers:
+            self.queue.put(item)
+        else:
+            self.process(item)
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is STOP:
+                self.queue.task_done()
+                return
+            self.process(item)
+            self.queue.task_done()
+
+    def process(self, item):
+        dest_path, content, source = item
+        try:
+            self.make_directory(dest_path)
+            existed = os.path.exists(dest_path)
+            changed = not has_content(dest_path, content)
+            if changed:
+                write_atomic(dest_path, content)
+        except Exception as e:
+            with self.lock:
+                self.failures.append((source, f"{type(e).__name__}: {e}"))
+            return
+        self.track(dest_path, existed, changed)
+
+    def make_directory(self, dest_path):
+        directory = os.path.dirname(dest_path)
+        if directory not in self.directories:
+            os.makedirs(directory or ".", exist_ok=True)
+            with self.lock:
+                self.directories.add(directory)
+
+    def track(self, dest_path, existed, changed):
+        with self.lock:
+            if not changed:
+                self.unchanged.append(dest_path)
+                return
+            self.written.append(dest_path)
+            if not existed:
+                self.added.append(dest_path)
+
+    # Moves a finished temp file over dest_path unless dest_path already has the same content,
+    # for outputs that are streamed to disk rather than rendered in memory. Runs in the caller.
+    def replace(self, tmp_path, dest_path):
+        existed = os.path.exists(dest_path)
+        changed = not existed or not filecmp.cmp(tmp_path, dest_path, shallow=False)
+        if changed:
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, dest_path)
+        else:
+            os.unlink(tmp_path)
+        self.track(dest_path, existed, changed)
+
+    # Waits until everything queued so far is on disk and returns the outputs that failed
+    # to write since the last flush as (source, error) pairs
+    def flush(self):
+        self.queue.join()
+        with self.lock:
+            failures, self.failures = self.failures, []
+        return failures
+
+    # Flushes and stops the threads, the writer can't be used afterwards
+    def close(self):
+        failures = self.flush()
+        for _ in self.workers:
+            self.queue.put(STOP)
+        for worker in self.workers:
+            worker.join()
+        self.workers = []
+        return failures
+
+    # What a worker process hands back to the parent, see merge
+    def results(self):
+        return {"written": self.written, "added": self.added, "unchanged": self.unchanged}
+
+    def merge(self, results):
+        self.written += results["written"]
+        self.added += results["added"]
+        self.unchanged += results["unchanged"]
+
+    def __repr__(self):
+        return f"OutputWriter({len(self.written)} written, {len(self.unchanged)} unchanged)"
+
+
+def enable(threads=4, max_pending=64):
+    global active
+    active = OutputWriter(threads, max_pending)
+    return active
+
+
+def disable():
+    global active
+    if active is not None:
+        active.close()
+    active = None